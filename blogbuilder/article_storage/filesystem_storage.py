@@ -1,21 +1,24 @@
 import json
 import logging
 import os
+import shutil
+import tempfile
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
 
 from blogbuilder.article import Article
 from blogbuilder.article_storage.articlestorage import ArticleStorage
+from blogbuilder.directory_index import DirectoryIndex
 
 
 class FilesystemStorage(ArticleStorage):
-    def __init__(self, storage_dir: Path):
+    def __init__(self, storage_dir: Path, manifest_path: Optional[Path] = None):
         self._storage_dir = storage_dir
+        self._index = DirectoryIndex(storage_dir, manifest_path, suffix='.json')
         self._log = logging.getLogger(self.__class__.__name__)
 
     def contains(self, article_id: str) -> bool:
-        article_path = self._id_to_path(article_id)
-        return article_path.exists()
+        return self._index.contains(self._id_to_path(article_id).name)
 
     def _id_to_path(self, article_id):
         article_path = self._storage_dir / (article_id + '.json')
@@ -27,8 +30,17 @@ class FilesystemStorage(ArticleStorage):
         return Article.from_dict(d)
 
     def put(self, article: Article) -> None:
-        with open(self._id_to_path(article.id_), 'w') as f:
-            json.dump(article.to_dict(), f)
+        # written aside and moved in place, so that concurrent readers never see a partially written article
+        article_path = self._id_to_path(article.id_)
+        with tempfile.NamedTemporaryFile(delete=False, mode='w', dir=self._storage_dir, suffix='.tmp') as ntf:
+            try:
+                json.dump(article.to_dict(), ntf)
+                ntf.flush()
+                shutil.move(ntf.name, article_path)
+            except:
+                os.remove(ntf.name)
+                raise
+        self._index.add(article_path.name)
 
     def get_all(self) -> Iterable[Article]:
         for fn in os.listdir(self._storage_dir):
@@ -0,0 +1 @@
+from .simhash import SimHashIndex, simhash, hamming_distance
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict
+
+from blogbuilder.relevance.bm25 import tokenize
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+MIN_TOKENS = 30
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str) -> Optional[int]:
+    # Word 3-shingles vote on every bit of the fingerprint, so pages differing only in navigation, dates or a few
+    # sentences end up a few bits apart. Texts too short for a meaningful fingerprint get none.
+    tokens = tokenize(text)
+    if len(tokens) < MIN_TOKENS:
+        return None
+    weights = [0] * FINGERPRINT_BITS
+    for i in range(len(tokens) - SHINGLE_SIZE + 1):
+        shingle_hash = _hash_shingle(' '.join(tokens[i:i + SHINGLE_SIZE]))
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if shingle_hash >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    # Fingerprints of the summarized pages, appended to a JSONL file. Lookups split a fingerprint into
+    # max_distance + 1 blocks: two fingerprints within max_distance bits have at least one identical block, so only
+    # the entries sharing a block are compared.
+    def __init__(self, path: Path, max_distance: int = 3) -> None:
+        self._path = path
+        self._max_distance = max_distance
+        self._block_bits = FINGERPRINT_BITS // (max_distance + 1)
+        self._blocks: List[Dict[int, List[dict]]] = [dict() for _ in range(max_distance + 1)]
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(self.__class__.__name__)
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+            self._log.info(f'Loaded {sum(len(e) for e in self._blocks[0].values())} fingerprints from {path}')
+
+    def find_near_duplicate(self, fingerprint: int, scope: str = '') -> Optional[dict]:
+        with self._lock:
+            for block, entries in zip(self._block_values(fingerprint), self._blocks):
+                for entry in entries.get(block, []):
+                    if entry['scope'] == scope and \
+                            hamming_distance(entry['fingerprint'], fingerprint) <= self._max_distance:
+                        return entry
+        return None
+
+    def add(self, fingerprint: int, url: str, scope: str = '') -> None:
+        entry = {'fingerprint': fingerprint, 'url': url, 'scope': scope}
+        with self._lock:
+            self._index(entry)
+            with open(self._path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def _block_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self._block_bits) - 1
+        return [fingerprint >> (i * self._block_bits) & mask for i in range(self._max_distance + 1)]
+
+    def _index(self, entry: dict) -> None:
+        for block, entries in zip(self._block_values(entry['fingerprint']), self._blocks):
+            entries.setdefault(block, []).append(entry)
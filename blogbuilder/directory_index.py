@@ -0,0 +1,61 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Set
+
+
+class DirectoryIndex:
+    # Names of the files in a directory, listed once and then kept up to date by add(), so that existence checks are
+    # set lookups. With a manifest the names are read from it instead of listing the directory, unless the directory
+    # was modified after the manifest (i.e. files were added or removed by hand), in which case it is rebuilt.
+    def __init__(self, dir_: Path, manifest_path: Optional[Path] = None, suffix: str = '') -> None:
+        self._dir = dir_
+        self._manifest_path = manifest_path
+        self._suffix = suffix
+        self._names: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    def contains(self, name: str) -> bool:
+        with self._lock:
+            return name in self._loaded_names()
+
+    def add(self, name: str) -> None:
+        with self._lock:
+            names = self._loaded_names()
+            if name in names:
+                return
+            names.add(name)
+            if self._manifest_path:
+                with open(self._manifest_path, 'a') as f:
+                    f.write(name + '\n')
+
+    def _loaded_names(self) -> Set[str]:
+        if self._names is None:
+            if self._is_manifest_up_to_date():
+                with open(self._manifest_path) as f:
+                    self._names = {line.rstrip('\n') for line in f if line.strip()}
+                self._log.info(f'Loaded {len(self._names)} names of {self._dir} from {self._manifest_path}')
+            else:
+                self._names = {fn for fn in os.listdir(self._dir) if fn.endswith(self._suffix)}
+                self._log.info(f'Listed {len(self._names)} files in {self._dir}')
+                if self._manifest_path:
+                    self._write_manifest()
+        return self._names
+
+    def _is_manifest_up_to_date(self) -> bool:
+        return self._manifest_path is not None and self._manifest_path.exists() and \
+            self._manifest_path.stat().st_mtime >= os.stat(self._dir).st_mtime
+
+    def _write_manifest(self) -> None:
+        with tempfile.NamedTemporaryFile(delete=False, mode='w', dir=self._manifest_path.parent) as ntf:
+            try:
+                ntf.writelines(name + '\n' for name in sorted(self._names))
+                ntf.flush()
+                shutil.move(ntf.name, self._manifest_path)
+            except:
+                os.remove(ntf.name)
+                raise
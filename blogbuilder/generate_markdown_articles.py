@@ -1,9 +1,12 @@
 import logging
 import os
 import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Set, Deque
 
 import jinja2
 from blogbuilder.article_storage.articlestorage import ArticleStorage
@@ -42,10 +45,42 @@ def _remove_last_line(text: Optional[str]) -> Optional[str]:
         return ''
 
 
+class PendingRawArticles:
+    # Raw articles without a markdown article yet. The raw articles directory is listed once and then again only when
+    # its mtime changes (i.e. the raw articles generator added files in the meantime), the markdown articles are looked
+    # up in the storage's index, so taking the next file does not touch the disk. The index is a snapshot of the output
+    # directory kept up to date by this process only, so only one generator may run per output directory: articles
+    # written by another one are not noticed and get generated again.
+    def __init__(self, raw_articles_dir: str, output_storage: ArticleStorage) -> None:
+        self._raw_articles_dir = raw_articles_dir
+        self._output_storage = output_storage
+        self._listed_mtime: Optional[int] = None
+        self._seen: Set[str] = set()
+        self._pending: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    def take(self) -> Optional[str]:
+        with self._lock:
+            if not self._pending:
+                self._refresh()
+            return self._pending.popleft() if self._pending else None
+
+    def _refresh(self) -> None:
+        mtime = os.stat(self._raw_articles_dir).st_mtime_ns
+        if mtime == self._listed_mtime:
+            return
+        self._listed_mtime = mtime
+        new_filenames = [fn for fn in os.listdir(self._raw_articles_dir) if fn not in self._seen]
+        self._seen.update(new_filenames)
+        self._pending.extend(fn for fn in new_filenames if not self._output_storage.contains(fn))
+        self._log.info(f'Found {len(new_filenames)} new raw articles, {len(self._pending)} of them pending')
+
+
 class GenerateMarkdownArticle:
     def __init__(self, raw_articles_dir: str, output_storage: ArticleStorage,
                  llm: LLM, max_number_of_articles: int, max_retries_per_article: int,
-                 max_llm_payload: int) -> None:
+                 max_llm_payload: int, workers: int = 1) -> None:
         self.output_storage = output_storage
         self._max_retries_per_article = max_retries_per_article
         self._max_number_of_articles = max_number_of_articles
@@ -54,29 +89,60 @@ class GenerateMarkdownArticle:
         self._log = logging.getLogger(self.__class__.__name__)
         self._articles_processed_counter = 0
         self._max_llm_payload = max_llm_payload
+        self._pending = PendingRawArticles(raw_articles_dir, output_storage)
+        self._workers = workers
+        self._counter_lock = threading.Lock()
+        self._articles_in_progress = 0
+        self._stopping = threading.Event()
 
     def invoke(self) -> None:
         self._log.info(f'Generating blog articles from {self._raw_articles_dir}')
         self._articles_processed_counter = 0
+        self._stopping.clear()
 
-        while True:
-            counter_before_run = self._articles_processed_counter
-            self.do_invoke()
-            if self._articles_processed_counter == counter_before_run:
-                self._log.info(f'No new articles generated, stopping')
-                break
-
-    def do_invoke(self):
-        for filename in os.listdir(self._raw_articles_dir):
-            if self.output_storage.contains(filename):
-                self._log.debug(f'Skipping {filename} as it already exists')
-                continue
-
-            self.process_input_file(filename)
-            self._articles_processed_counter += 1
-            if self._articles_processed_counter >= self._max_number_of_articles:
-                self._log.info(f'Generated {self._articles_processed_counter} articles, stopping')
-                break
+        if self._workers > 1:
+            # every worker keeps its own LLM round trips going, so the inference server always has requests queued
+            executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='markdown-article')
+            futures = [executor.submit(self._work) for _ in range(self._workers)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self._log.warning('Stopping, waiting for the articles in progress')
+                self._stopping.set()
+                raise
+            finally:
+                executor.shutdown(wait=True)
+        else:
+            self._work()
+        self._log.info(f'Generated {self._articles_processed_counter} articles, stopping')
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            filename = self._take()
+            if filename is None:
+                return
+            try:
+                self.process_input_file(filename)
+            except:
+                # the other workers finish the articles they are on, as a single worker would have stopped here
+                self._stopping.set()
+                raise
+            finally:
+                with self._counter_lock:
+                    self._articles_in_progress -= 1
+            with self._counter_lock:
+                self._articles_processed_counter += 1
+
+    def _take(self) -> Optional[str]:
+        # articles in progress count against the limit too, so that no more than the maximum gets generated
+        with self._counter_lock:
+            if self._articles_processed_counter + self._articles_in_progress >= self._max_number_of_articles:
+                return None
+            filename = self._pending.take()
+            if filename is not None:
+                self._articles_in_progress += 1
+            return filename
 
     def process_input_file(self, filename):
         with open(os.path.join(self._raw_articles_dir, filename), 'r') as f:
@@ -2,18 +2,49 @@ import json
 import logging
 import os
 import re
+import threading
+import time
 import traceback
+from contextlib import nullcontext
+from dataclasses import dataclass
 from hashlib import md5
 from pathlib import Path
 from subprocess import check_output
-from typing import List, Callable
+from typing import List, Callable, Optional, Iterable, Tuple, Dict, TypeVar
 
 import backoff as backoff
-import requests
 from tqdm import tqdm
 
+from blogbuilder.dedup import SimHashIndex, simhash
+from blogbuilder.directory_index import DirectoryIndex
 from blogbuilder.llm import LLM
+from blogbuilder.llm.adaptive import CircuitOpenError
+from blogbuilder.llm.budget import WorkBudget
+from blogbuilder.obtaincontent.pdf_pool import PdfExtractionError
+from blogbuilder.obtaincontent.readability_pool import ReadabilityWorkerError
+from blogbuilder.pipeline import StagedPipeline, PipelineStage
+from blogbuilder.run_plan import RunPlan
+from blogbuilder.tracing import Tracer, Trace, span, set_outcome, activate
+from blogbuilder.work_claims import WorkClaims
+from blogbuilder.wse.result import SearchResult
+from blogbuilder.yield_scheduler import YieldScheduler
 from s8er.cache import Cache
+from s8er.domain_health import DomainHealth, DomainSkippedError
+from s8er.fetch import UnsuitableContentError, CachingFetcher
+
+T = TypeVar('T')
+
+PIPELINE_STAGES = ('search', 'fetch', 'classify', 'summarize')
+RELATEDNESS_LEVELS = ('CANNOT_PROCESS', 'UNRELATED', 'SOMEWHAT_RELATED', 'STRONGLY_RELATED', 'FULLY_RELATED')
+CLAIMED_ELSEWHERE_POLL_SECONDS = 10.0
+
+
+def _extract_relatedness_from_llm_output(llm_output: str) -> str:
+    output = llm_output.strip().upper().replace('\\', '').replace('_', '').replace(' ', '')
+    for level in RELATEDNESS_LEVELS:
+        if output.startswith(level.replace('_', '')):
+            return level
+    raise ValueError(f'Unexpected output: "{output}"')
 
 
 def _extract_int_from_llm_output(llm_output: str) -> int:
@@ -42,28 +73,59 @@ def _sanitize_filename(s: str) -> str:
 
 
 class PersistSummaryToFile(PersistSummary):
-    def __init__(self, output_dir: str) -> None:
+    def __init__(self, output_dir: str, manifest_path: Optional[Path] = None) -> None:
         self._output_dir = output_dir
+        self._index = DirectoryIndex(Path(output_dir), manifest_path)
 
     def persist(self, query: str, url: str, summary: str) -> None:
-        with open(self._output_filepath(query, url), 'w') as f:
+        output_filepath = self._output_filepath(query, url)
+        with open(output_filepath, 'w') as f:
             f.write(summary)
+        self._index.add(output_filepath.name)
 
     def exists(self, query: str, url: str) -> bool:
-        return self._output_filepath(query, url).exists()
+        return self._index.contains(self._output_filepath(query, url).name)
 
     def _output_filepath(self, query: str, url: str) -> Path:
         return Path(self._output_dir) / _sanitize_filename(
             query + '-' + url[:50] + md5(url.encode('utf-8')).hexdigest())
 
 
+@dataclass
+class PageToProcess:
+    query: str
+    url: str
+    content: str
+    fingerprint: Optional[int] = None
+    trace: Optional[Trace] = None
+
+
 class GenerateRawArticlesUseCase:
     def __init__(self, topic_generator_func: Callable[[], List[str]],
                  llm: LLM, persist_summary: PersistSummary,
-                 websearch_func: Callable[[str], List[str]],
+                 websearch_func: Callable[[str], List[SearchResult]],
                  download_timeout: int,
                  check_cache: Cache[bool],
                  max_llm_payload: int,
+                 cascade_llm: Optional[LLM] = None,
+                 cascade_max_llm_payload: Optional[int] = None,
+                 cascade_min_relatedness: str = 'SOMEWHAT_RELATED',
+                 cascade_id: str = '',
+                 relevance_prefilter_func: Optional[Callable[[str, str, str], bool]] = None,
+                 search_all_func: Optional[Callable[[List[str]], Iterable[Tuple[str, List[SearchResult]]]]] = None,
+                 snippet_filter_func: Optional[Callable[[str, SearchResult], bool]] = None,
+                 fetcher: Optional[CachingFetcher] = None,
+                 prefetch_workers: int = 0,
+                 domain_health: Optional[DomainHealth] = None,
+                 near_duplicate_index: Optional[SimHashIndex] = None,
+                 near_duplicate_scope: str = 'query',
+                 pipeline_workers: Optional[Dict[str, int]] = None,
+                 pipeline_queue_size: int = 32,
+                 run_plan: Optional[RunPlan] = None,
+                 yield_scheduler: Optional[YieldScheduler] = None,
+                 budget: Optional[WorkBudget] = None,
+                 work_claims: Optional[WorkClaims] = None,
+                 tracer: Optional[Tracer] = None,
                  ) -> None:
         self._topic_generator_func = topic_generator_func
         self._llm = llm
@@ -73,18 +135,271 @@ class GenerateRawArticlesUseCase:
         self._download_timeout = download_timeout
         self._check_cache = check_cache
         self._max_llm_payload = max_llm_payload
+        self._cascade_enabled = cascade_llm is not None or cascade_max_llm_payload is not None
+        self._cascade_llm = cascade_llm or llm
+        self._cascade_max_llm_payload = cascade_max_llm_payload or max_llm_payload
+        self._cascade_min_relatedness = cascade_min_relatedness
+        self._cascade_cache_prefix = 'CHECK-CASCADE-' + md5(cascade_id.encode('utf-8')).hexdigest() + '-'
+        self._relevance_prefilter_func = relevance_prefilter_func
+        self._search_all_func = search_all_func or self._search_all_sequentially
+        self._snippet_filter_func = snippet_filter_func
+        self._fetcher = fetcher or CachingFetcher(store=None, timeout=download_timeout)
+        self._prefetch_workers = prefetch_workers
+        self._domain_health = domain_health
+        self._near_duplicate_index = near_duplicate_index
+        self._near_duplicate_scope = near_duplicate_scope
+        self._pipeline_workers = pipeline_workers
+        self._pipeline_queue_size = pipeline_queue_size
+        self._run_plan = run_plan
+        self._yield_scheduler = yield_scheduler
+        self._budget = budget
+        self._work_claims = work_claims
+        self._claimed_elsewhere = set()
+        self._claimed_elsewhere_lock = threading.Lock()
+        self._tracer = tracer
 
     def invoke(self) -> None:
         queries = self._topic_generator_func()
+        if self._pipeline_workers:
+            self._invoke_pipeline(queries)
+        elif self._yield_scheduler:
+            self._invoke_by_yield(queries)
+        else:
+            for query, search_results in self._search_all_func(queries):
+                if self._is_budget_exhausted():
+                    break
+                try:
+                    urls = self._select_urls(query, search_results)
+                    self._prefetch(query, urls)
+                    for url in tqdm(urls):
+                        if self._is_budget_exhausted():
+                            break
+                        self._waiting_for_open_circuit(lambda: self._process_url(query, url), f'{url}-{query}')()
+                except Exception:
+                    traceback.print_exc()
+        if self._work_claims:
+            self._process_claimed_elsewhere()
+        if self._run_plan and not self._is_budget_exhausted():
+            self._run_plan.complete()
+
+    def _process_claimed_elsewhere(self) -> None:
+        # The pairs other workers held are picked up once given up (failed) or once the lease expired (the worker
+        # crashed), and waited for otherwise: the plan is completed only when none of its pairs is pending anymore.
+        while not self._is_budget_exhausted():
+            with self._claimed_elsewhere_lock:
+                pending, self._claimed_elsewhere = self._claimed_elsewhere, set()
+            if not pending:
+                return
+            for query, url in sorted(pending):
+                if self._is_budget_exhausted():
+                    return
+                try:
+                    # pairs still held by another worker are claimed_elsewhere again
+                    self._waiting_for_open_circuit(lambda: self._process_url(query, url), f'{url}-{query}')()
+                except Exception:
+                    traceback.print_exc()
+            if self._claimed_elsewhere:
+                self._log.info(f'Waiting for {len(self._claimed_elsewhere)} URL-queries claimed by other workers')
+                time.sleep(CLAIMED_ELSEWHERE_POLL_SECONDS)
+
+    def _invoke_by_yield(self, queries: List[str]) -> None:
+        # all the searches are done first, so that the pages of the most promising topics and domains get processed
+        # before the budget runs out, whichever query they came from
+        pending = []
+        for query, search_results in self._search_all_func(queries):
+            try:
+                pending += [(query, url) for url in self._select_urls(query, search_results)
+                            if not self._persist_summary.exists(query=query, url=url) and
+                            not self._is_done(query, url)]
+            except Exception:
+                traceback.print_exc()
+        for query, url in tqdm(self._yield_scheduler.order(pending), total=len(pending)):
+            try:
+                self._waiting_for_open_circuit(lambda: self._process_url(query, url), f'{url}-{query}')()
+            except Exception:
+                traceback.print_exc()
+
+    def _waiting_for_open_circuit(self, func: Callable[[], T], description: str) -> Callable[[], T]:
+        # an open circuit means the LLM endpoint is down for a while: rather than skipping the rest of the work, the
+        # same piece of work is tried again once the circuit lets a trial request through
+        def _inner() -> T:
+            while True:
+                try:
+                    return func()
+                except CircuitOpenError as e:
+                    if self._is_budget_exhausted():
+                        raise
+                    self._log.warning(f'LLM endpoint circuit is open, retrying in {e.retry_after:.1f}s: {description}')
+                    time.sleep(e.retry_after)
+
+        return _inner
+
+    def _is_budget_exhausted(self) -> bool:
+        if self._budget and self._budget.exhausted():
+            self._log.info(f'Budget exhausted after {self._budget.llm_calls} LLM calls, stopping')
+            return True
+        return False
+
+    def _invoke_pipeline(self, queries: List[str]) -> None:
+        # the same steps as above, but every one of them has its own workers, so downloads of the next pages
+        # overlap with the LLM calls on the previous ones
+        def _search(query: str) -> Iterable[Tuple[str, str]]:
+            if self._is_budget_exhausted():
+                return
+            for url in self._select_urls(query, self._websearch_func(query)):
+                if self._persist_summary.exists(query=query, url=url) or self._is_done(query, url):
+                    self._log.info(f'Skipping URL-query: {url}-{query}')
+                elif self._claim(query, url):
+                    yield query, url
+
+        # a page moves between threads, so its trace travels with it and is activated by every stage
+        def _fetch(query_url: Tuple[str, str]) -> Iterable[PageToProcess]:
+            trace = self._tracer.start(*query_url) if self._tracer else None
+            page = self._run_traced(trace, self._with_retries(lambda: self._obtain_page(*query_url), query_url[1]),
+                                    last_stage=lambda page: page is None)
+            if not page:
+                self._mark_done(*query_url)
+                return []
+            page.trace = trace
+            return [page]
+
+        # the budget is checked before every LLM stage, as the pages already queued would use it up further; the
+        # pages dropped are left for a resumed run
+        def _is_budget_exhausted_for(page: PageToProcess) -> bool:
+            if not self._is_budget_exhausted():
+                return False
+            pipeline.stop()
+            self._release(page.query, page.url)
+            self._finish_trace(page.trace)
+            return True
+
+        def _classify(page: PageToProcess) -> Iterable[PageToProcess]:
+            if _is_budget_exhausted_for(page):
+                return []
+            is_page_related = self._waiting_for_open_circuit(
+                self._with_retries(lambda: self._is_page_related(page), page.url), page.url)
+            if self._run_traced(page.trace, is_page_related, last_stage=lambda related: not related):
+                return [page]
+            self._mark_done(page.query, page.url)
+            return []
+
+        def _summarize(page: PageToProcess) -> None:
+            if _is_budget_exhausted_for(page):
+                return
+            summarize_and_persist = self._waiting_for_open_circuit(
+                self._with_retries(lambda: self._summarize_and_persist(page), page.url), page.url)
+            self._run_traced(page.trace, summarize_and_persist, last_stage=lambda _: True)
+            self._mark_done(page.query, page.url)
+
+        # a page failing a stage is dropped by the pipeline, its claim is released so that another worker can try
+        def _releasing_claim_on_error(stage_func: Callable, query_url_of: Callable[..., Tuple[str, str]]) -> Callable:
+            def _stage(item):
+                try:
+                    return stage_func(item)
+                except:
+                    self._release(*query_url_of(item))
+                    raise
+
+            return _stage
+
+        stage_funcs = {
+            'search': _search,
+            'fetch': _releasing_claim_on_error(_fetch, lambda query_url: query_url),
+            'classify': _releasing_claim_on_error(_classify, lambda page: (page.query, page.url)),
+            'summarize': _releasing_claim_on_error(_summarize, lambda page: (page.query, page.url)),
+        }
+        pipeline = StagedPipeline(
+            [PipelineStage(name, stage_funcs[name], self._pipeline_workers.get(name, 1)) for name in PIPELINE_STAGES],
+            queue_size=self._pipeline_queue_size)
+        pipeline.run(queries)
+
+    def _run_traced(self, trace: Optional[Trace], func: Callable[[], T], last_stage: Callable[[T], bool]) -> T:
+        try:
+            with activate(trace):
+                result = func()
+        except:
+            self._finish_trace(trace)
+            raise
+        if last_stage(result):
+            self._finish_trace(trace)
+        return result
+
+    def _finish_trace(self, trace: Optional[Trace]) -> None:
+        if trace:
+            self._tracer.finish(trace)
+
+    def _select_urls(self, query: str, search_results: List[SearchResult]) -> List[str]:
+        urls = []
+        for search_result in search_results:
+            if self._passes_snippet_filter(query, search_result):
+                urls.append(search_result.url)
+            else:
+                self._log.info(f'Skipping URL-query (based on search snippet): {search_result.url}-{query}')
+        return self._order_by_domain_health(query, urls)
+
+    def _order_by_domain_health(self, query: str, urls: List[str]) -> List[str]:
+        if not self._domain_health:
+            return urls
+        healthy_urls = []
+        for url in urls:
+            if self._domain_health.should_skip(url):
+                self._log.info(f'Skipping URL-query (based on domain health): {url}-{query}')
+            else:
+                healthy_urls.append(url)
+        return sorted(healthy_urls, key=self._domain_health.priority, reverse=True)
+
+    def _prefetch(self, query: str, urls: List[str]) -> None:
+        # the pages of a query are downloaded concurrently up front, so that their network latencies overlap
+        if self._prefetch_workers > 0:
+            self._fetcher.prefetch([url for url in urls
+                                    if not self._persist_summary.exists(query=query, url=url) and
+                                    not self._was_rated_unrelated(query, url)], self._prefetch_workers)
+
+    def _passes_snippet_filter(self, query: str, search_result: SearchResult) -> bool:
+        return not self._snippet_filter_func or self._snippet_filter_func(query, search_result)
+
+    def _search_all_sequentially(self, queries: List[str]) -> Iterable[Tuple[str, List[SearchResult]]]:
         for query in queries:
             try:
-                urls = self._websearch_func(query)
-                for url in tqdm(urls):
-                    self._process_url(query, url)
-            except:
+                yield query, self._websearch_func(query)
+            except Exception:
                 traceback.print_exc()
 
     def _check_if_page_is_related_to_phrase(self, page_html: str, query: str) -> bool:
+        relatedness = self._rate_page_relatedness(page_html, query, self._llm)
+        return RELATEDNESS_LEVELS.index(relatedness) >= RELATEDNESS_LEVELS.index('STRONGLY_RELATED')
+
+    def _check_and_record_relatedness(self, page_html: str, query: str, url: str) -> bool:
+        related = self._check_if_page_is_related_to_phrase(page_html, query)
+        if self._domain_health:
+            self._domain_health.record_relatedness(url, related)
+        if self._yield_scheduler:
+            self._yield_scheduler.record_relatedness(query, related)
+        return related
+
+    def _was_rated_unrelated(self, query: str, url: str) -> bool:
+        # pages rated as related still need their content, their summary may have failed on the previous run
+        check_cache_key = f'{query}-{url}'
+        return self._check_cache.exists(check_cache_key, 'CHECK-') and \
+            not self._check_cache.get_raw(check_cache_key, lambda: True, 'CHECK-')
+
+    def _passes_relevance_prefilter(self, query: str, url: str, page_content: str) -> bool:
+        if not self._relevance_prefilter_func or self._check_cache.exists(f'{query}-{url}', 'CHECK-'):
+            return True
+        return self._relevance_prefilter_func(query, url, page_content)
+
+    def _passes_cascade_check(self, check_cache_key: str, page_html: str, query: str) -> bool:
+        if not self._cascade_enabled or self._check_cache.exists(check_cache_key, 'CHECK-'):
+            return True
+        relatedness = self._check_cache.get_raw(
+            check_cache_key,
+            lambda: self._rate_page_relatedness(page_html[:self._cascade_max_llm_payload], query, self._cascade_llm),
+            self._cascade_cache_prefix)
+        passed = RELATEDNESS_LEVELS.index(relatedness) >= RELATEDNESS_LEVELS.index(self._cascade_min_relatedness)
+        self._log.info(f'Cascade check rated the page as {relatedness} (passed: {passed}): {check_cache_key}')
+        return passed
+
+    def _rate_page_relatedness(self, page_html: str, query: str, llm: LLM) -> str:
         def _backoff_handler(details: dict):
             self._log.warning(f'Backing off: {query}')
 
@@ -92,18 +407,12 @@ class GenerateRawArticlesUseCase:
             self._log.error(f'Giving up: {query}')
 
         @backoff.on_exception(backoff.expo, Exception, max_tries=3,
+                              giveup=lambda e: isinstance(e, CircuitOpenError),
                               on_backoff=_backoff_handler, on_giveup=_giveup_handler)
-        def _inner_check() -> bool:
+        def _inner_check() -> str:
             self._log.info(f'Checking if the page (len: {len(page_html)}) is related to the phrase: {query}')
             llm_query = self._generate_prompt_to_check_if_content_is_related(query, page_html)
-            output = self._llm(llm_query).strip().upper().replace('\\', '').replace('_', '').replace(' ', '')
-            if not output.startswith('CANNOTPROCESS') and \
-                    not output.startswith('UNRELATED') and \
-                    not output.startswith('SOMEWHATRELATED') and \
-                    not output.startswith('STRONGLYRELATED') and \
-                    not output.startswith('FULLYRELATED'):
-                raise ValueError(f'Unexpected output: "{output}"')
-            return output.startswith('STRONGLYRELATED') or output.startswith('FULLYRELATED')
+            return _extract_relatedness_from_llm_output(llm(llm_query))
 
         return _inner_check()
 
@@ -160,44 +469,134 @@ f{page_html[:self._max_llm_payload]}"""
     def _process_url(self, query: str, url: str) -> None:
         if self._persist_summary.exists(query=query, url=url):
             self._log.info(f'Skipping URL-query: {url}-{query}')
-        else:
-            self._do_process_url(query, url)
+        elif self._is_done(query, url):
+            self._log.info(f'Skipping URL-query (based on run journal): {url}-{query}')
+        elif self._claim(query, url):
+            try:
+                with self._tracer.trace(query, url) if self._tracer else nullcontext():
+                    self._do_process_url(query, url)
+            except:
+                self._release(query, url)
+                raise
+            self._mark_done(query, url)
+
+    def _is_done(self, query: str, url: str) -> bool:
+        return (self._run_plan is not None and self._run_plan.is_done(query, url)) or \
+            (self._work_claims is not None and self._work_claims.is_done(query, url))
+
+    def _mark_done(self, query: str, url: str) -> None:
+        if self._run_plan:
+            self._run_plan.mark_done(query, url)
+        if self._work_claims:
+            self._work_claims.mark_done(query, url)
+
+    def _claim(self, query: str, url: str) -> bool:
+        if self._work_claims is None or self._work_claims.claim(query, url):
+            return True
+        if not self._work_claims.is_done(query, url):
+            with self._claimed_elsewhere_lock:
+                self._claimed_elsewhere.add((query, url))
+        return False
+
+    def _release(self, query: str, url: str) -> None:
+        # another worker may succeed where this one failed, i.e. after a network hiccup
+        if self._work_claims:
+            self._work_claims.release(query, url)
 
     def _do_process_url(self, query: str, url: str) -> None:
+        def _inner_process_url() -> None:
+            page = self._obtain_page(query, url)
+            if page and self._is_page_related(page):
+                self._summarize_and_persist(page)
+
+        self._with_retries(_inner_process_url, url)()
+
+    def _with_retries(self, func: Callable[[], T], description: str) -> Callable[[], T]:
         def _backoff_handler(details: dict):
-            self._log.warning(f'Backing off: {url}')
+            self._log.warning(f'Backing off: {description}')
 
         def _giveup_handler(details: dict):
-            self._log.error(f'Giving up: {url}')
+            self._log.error(f'Giving up: {description}')
 
-        @backoff.on_exception(
+        return backoff.on_exception(
             backoff.expo, Exception,
+            # retrying the same document would only crash or hang a worker again
+            giveup=lambda e: isinstance(e, (CircuitOpenError, UnsuitableContentError, DomainSkippedError,
+                                            PdfExtractionError, ReadabilityWorkerError)),
             on_backoff=_backoff_handler,
             on_giveup=_giveup_handler,
-            max_tries=3)
-        def _inner_process_url() -> None:
-            check_cache_key = f'{query}-{url}'
-            if not self._check_cache.exists(check_cache_key):
-                self._log.info(f'About to obtain content for topic: {query} from URL: {url}')
-                page_content = self._obtain_content_from_url(url)
-                if page_content and page_content.strip() and self._check_cache.get_raw(
-                        check_cache_key,
-                        lambda: self._check_if_page_is_related_to_phrase(page_content, query),
-                        'CHECK-'):
-                    summary = self._summarize_the_page_for_me(page_content, query)
-                    self._persist_summary.persist(query=query, url=url, summary=summary)
-                else:
-                    self._log.info(f'Skipping URL-query: {url}-{query}')
-            else:
-                self._log.info(f'Skipping URL-query (based on check cache): {url}-{query}')
-
-        _inner_process_url()
+            max_tries=3)(func)
+
+    def _obtain_page(self, query: str, url: str) -> Optional[PageToProcess]:
+        if self._was_rated_unrelated(query, url):
+            self._log.info(f'Skipping URL-query (based on check cache): {url}-{query}')
+            set_outcome('checked_before')
+            return None
+        self._log.info(f'About to obtain content for topic: {query} from URL: {url}')
+        with span('obtain_content'):
+            page_content = self._obtain_content_from_url(url)
+        if self._domain_health:
+            self._domain_health.record_extraction(url, page_content)
+        fingerprint = self._fingerprint(page_content)
+        if self._is_near_duplicate(query, url, fingerprint):
+            set_outcome('near_duplicate')
+            return None
+        if not page_content or not page_content.strip():
+            self._log.info(f'Skipping URL-query: {url}-{query}')
+            set_outcome('empty')
+            return None
+        return PageToProcess(query=query, url=url, content=page_content, fingerprint=fingerprint)
+
+    def _is_page_related(self, page: PageToProcess) -> bool:
+        check_cache_key = f'{page.query}-{page.url}'
+        with span('prefilter'):
+            passed = self._passes_relevance_prefilter(page.query, page.url, page.content)
+        if passed:
+            with span('cascade'):
+                passed = self._passes_cascade_check(check_cache_key, page.content, page.query)
+        if passed:
+            with span('relatedness'):
+                passed = self._check_cache.get_raw(
+                    check_cache_key,
+                    lambda: self._check_and_record_relatedness(page.content, page.query, page.url),
+                    'CHECK-')
+        if passed:
+            return True
+        self._log.info(f'Skipping URL-query: {page.url}-{page.query}')
+        set_outcome('unrelated')
+        return False
+
+    def _summarize_and_persist(self, page: PageToProcess) -> None:
+        with span('summarize'):
+            summary = self._summarize_the_page_for_me(page.content, page.query)
+        self._persist_summary.persist(query=page.query, url=page.url, summary=summary)
+        self._remember_summarized(page.query, page.url, page.fingerprint)
+        set_outcome('summarized')
 
     def _obtain_content_from_url(self, url: str) -> str:
-        r = requests.get(url, timeout=self._download_timeout)
-        r.raise_for_status()
-        page_content = r.text
-        return page_content
+        with span('download'):
+            return self._fetcher.fetch(url).text
+
+    def _fingerprint(self, page_content: Optional[str]) -> Optional[int]:
+        if not self._near_duplicate_index or not page_content:
+            return None
+        # only the part of the page that makes it into the prompts matters
+        return simhash(page_content[:self._max_llm_payload])
+
+    def _near_duplicate_scope_of(self, query: str) -> str:
+        return query if self._near_duplicate_scope == 'query' else ''
+
+    def _is_near_duplicate(self, query: str, url: str, fingerprint: Optional[int]) -> bool:
+        if fingerprint is None:
+            return False
+        duplicate = self._near_duplicate_index.find_near_duplicate(fingerprint, self._near_duplicate_scope_of(query))
+        if duplicate:
+            self._log.info(f'Skipping URL-query (near-duplicate of {duplicate["url"]}): {url}-{query}')
+        return duplicate is not None
+
+    def _remember_summarized(self, query: str, url: str, fingerprint: Optional[int]) -> None:
+        if fingerprint is not None:
+            self._near_duplicate_index.add(fingerprint, url, self._near_duplicate_scope_of(query))
 
 
 class GenerateRawArticles2UseCase(GenerateRawArticlesUseCase):
@@ -210,19 +609,23 @@ class GenerateRawArticles2UseCase(GenerateRawArticlesUseCase):
 
     def _summarize_the_page_for_me(self, page_html: str, topic: str) -> str:
         self._log.info(f'Summarizing the page. Length: {len(page_html)}. Topic: {topic}')
-        llm_query = f"""
-Please rewrite the following article in a way that it looks like a media article about the following topic: "{topic}". Generate just the article text without formatting. Here is the article content that you should rewrite:
-
-f{page_html[:self._max_llm_payload]}"""
+        llm_query = self._page_content_prompt_prefix(page_html) + f"""
+Please rewrite the page above in a way that it looks like a media article about the following topic: "{topic}". Generate just the article text without formatting.
+"""
         return self._llm(llm_query)
 
-    def _generate_prompt_to_check_if_content_is_related(self, topic: str, content: str) -> str:
+    def _page_content_prompt_prefix(self, content: str) -> str:
+        # Both prompts on the same page start with exactly this text, so an LLM server caching prompt prefixes
+        # (as Ollama does for the loaded model) processes only the suffix of the second prompt
         return f"""
 Here is the content of the page:
 ===
 {content[:self._max_llm_payload]}
 ===
+"""
 
+    def _generate_prompt_to_check_if_content_is_related(self, topic: str, content: str) -> str:
+        return self._page_content_prompt_prefix(content) + f"""
 I want to create a blog about financial crime compliance.
 
 Please check the content of the page above and evaluate how much it is related to the topic: {topic}. I am looking for one of the answers:
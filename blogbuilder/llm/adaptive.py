@@ -0,0 +1,143 @@
+import logging
+import threading
+from timeit import default_timer as timer
+from typing import Callable, Optional
+
+from blogbuilder.llm import LLM
+
+
+HALF_OPEN_RETRY_AFTER = 1.0
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        # seconds until the circuit lets a trial request through
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimit:
+    # AIMD: the limit of in-flight requests grows by one per "limit" successful requests completing while the limit
+    # is in full use (up to max_limit) and is cut by decrease_factor on every error or request slower than
+    # target_latency
+    def __init__(self, initial_limit: int, max_limit: int, target_latency: Optional[float] = None,
+                 min_limit: int = 1, decrease_factor: float = 0.5) -> None:
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._target_latency = target_latency
+        self._decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, failed: bool) -> None:
+        with self._condition:
+            # a success below the limit says nothing about whether the endpoint copes with more
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            limit_before = int(self._limit)
+            if failed or (self._target_latency is not None and latency > self._target_latency):
+                self._limit = max(float(self._min_limit), self._limit * self._decrease_factor)
+            elif saturated:
+                self._limit = min(float(self._max_limit), self._limit + 1.0 / self._limit)
+            if int(self._limit) != limit_before:
+                self._log.info(f'LLM concurrency limit changed: {limit_before} -> {int(self._limit)}')
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = timer) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CircuitBreaker.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == CircuitBreaker.CLOSED:
+                return
+            if self._state == CircuitBreaker.OPEN:
+                open_for = self._clock() - self._opened_at
+                if open_for < self._reset_timeout:
+                    raise CircuitOpenError('LLM endpoint circuit is open', self._reset_timeout - open_for)
+                self._log.info('LLM endpoint circuit is half-open, letting a trial request through')
+                self._state = CircuitBreaker.HALF_OPEN
+                self._trial_in_progress = False
+            if self._trial_in_progress:
+                raise CircuitOpenError('LLM endpoint circuit is half-open and a trial request is in progress',
+                                       HALF_OPEN_RETRY_AFTER)
+            self._trial_in_progress = True
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self._state != CircuitBreaker.CLOSED:
+                self._log.info('LLM endpoint circuit is closed again')
+            self._state = CircuitBreaker.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_progress = False
+            if self._state == CircuitBreaker.HALF_OPEN or \
+                    self._consecutive_failures >= self._failure_threshold:
+                if self._state != CircuitBreaker.OPEN:
+                    self._log.warning(
+                        f'Opening LLM endpoint circuit after {self._consecutive_failures} consecutive failures')
+                self._state = CircuitBreaker.OPEN
+                self._opened_at = self._clock()
+
+
+class AdaptiveLLM(LLM):
+    def __init__(self, llm: LLM, concurrency_limit: AdaptiveConcurrencyLimit,
+                 circuit_breaker: Optional[CircuitBreaker]) -> None:
+        self._llm = llm
+        self._concurrency_limit = concurrency_limit
+        self._circuit_breaker = circuit_breaker
+
+    def __call__(self, input_str) -> str:
+        if self._circuit_breaker:
+            self._circuit_breaker.before_call()
+        self._concurrency_limit.acquire()
+        start = timer()
+        try:
+            output = self._llm(input_str)
+        except:
+            self._concurrency_limit.release(timer() - start, failed=True)
+            if self._circuit_breaker:
+                self._circuit_breaker.on_failure()
+            raise
+        self._concurrency_limit.release(timer() - start, failed=False)
+        if self._circuit_breaker:
+            self._circuit_breaker.on_success()
+        return output
@@ -0,0 +1,41 @@
+import threading
+import time
+from typing import Optional, Callable
+
+from blogbuilder.llm import LLM
+
+
+class WorkBudget:
+    # Limits a run by the number of LLM calls and/or by wall clock time. Work already started is finished, the
+    # budget is only checked before taking the next unit of work.
+    def __init__(self, max_llm_calls: Optional[int] = None, max_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self._max_llm_calls = max_llm_calls
+        self._max_seconds = max_seconds
+        self._clock = clock
+        self._started_at = clock()
+        self._llm_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def llm_calls(self) -> int:
+        return self._llm_calls
+
+    def count_llm_call(self) -> None:
+        with self._lock:
+            self._llm_calls += 1
+
+    def exhausted(self) -> bool:
+        if self._max_llm_calls is not None and self._llm_calls >= self._max_llm_calls:
+            return True
+        return self._max_seconds is not None and self._clock() - self._started_at >= self._max_seconds
+
+
+class BudgetedLLM(LLM):
+    def __init__(self, llm: LLM, budget: WorkBudget) -> None:
+        self._llm = llm
+        self._budget = budget
+
+    def __call__(self, input_str) -> str:
+        self._budget.count_llm_call()
+        return self._llm(input_str)
@@ -1,24 +1,44 @@
 import json
 import logging
-from datetime import date
+import os
+from datetime import date, timedelta
 from pathlib import Path
-from typing import TextIO, Optional, List
+from typing import TextIO, Optional, List, Callable, Dict
 
 import click
 import yaml
 
 from blogbuilder.article_storage.filesystem_storage import FilesystemStorage
+from blogbuilder.dedup import SimHashIndex
 from blogbuilder.generate_docusaurus_articles import GenerateDocusaurusArticlesUseCase, SanitizeOperations
 from blogbuilder.generate_hugo_articles import GenerateHugoArticlesUseCase
 from blogbuilder.generate_markdown_articles import GenerateMarkdownArticle
 from blogbuilder.generate_raw_articles_use_case import GenerateRawArticlesUseCase, PersistSummaryToFile, \
-    GenerateRawArticles2UseCase
+    GenerateRawArticles2UseCase, RELATEDNESS_LEVELS, PIPELINE_STAGES
 from blogbuilder.llm import OpenAILLM, LLM, LocalLLM, OllamaLLM, LoggedLLM
-from blogbuilder.obtaincontent import obtain_content_from_url_func
+from blogbuilder.llm.adaptive import AdaptiveLLM, AdaptiveConcurrencyLimit, CircuitBreaker
+from blogbuilder.llm.budget import WorkBudget, BudgetedLLM
+from blogbuilder.obtaincontent import obtain_content_from_url_func, cached_obtain_content_func, \
+    extract_article_using_readability, is_supported_content_type
+from blogbuilder.obtaincontent.benchmark import benchmark_extractors, format_benchmark_results
+from blogbuilder.obtaincontent.pdf_pool import PdfExtractionPool, extract_pdf_text
+from blogbuilder.obtaincontent.readability_pool import ReadabilityWorkerPool
+from blogbuilder.obtaincontent.text_density import extract_article_text as text_density_extract_article_text
+from blogbuilder.run_plan import RunPlan
+from blogbuilder.tracing import Tracer, read_traces, profile_report, format_profile_report
+from blogbuilder.work_claims import WorkClaims, CLAIMS_DB_FILENAME
+from blogbuilder.yield_scheduler import YieldScheduler, TopicYieldStats
+from blogbuilder.relevance import BM25Scorer, relevance_create_prefilter_func, relevance_create_snippet_filter_func, \
+    relevance_document_frequencies, relevance_save_document_frequencies, relevance_load_document_frequencies
 from s8er.cache import FilesystemCache
+from s8er.domain_health import DomainHealth, normalize_host
+from s8er.fetch import CachingFetcher, HttpCacheStore
+from s8er.fetch_engine import FetchEngine, set_default_engine as s8er_set_default_fetch_engine
 from s8er.llm import CachedOpenAI
-from .wse import wse_create_cache, wse_google, wse_ddgs_create_func
-from .topicgenerator import llm_topic_generator_create_func, per_region_topic_generator_create_func
+from .wse import SearchResult, wse_create_cache, wse_google_create_func, wse_ddgs_create_func, wse_migrate_legacy_cache_entries, wse_create_rate_limited_func, \
+    wse_create_fan_out_func, wse_engine_bucket, wse_create_merged_search_func
+from .topicgenerator import llm_topic_generator_create_func, per_region_topic_generator_create_func, \
+    per_region_topic_template
 
 
 def build_openai_llm(cache_dir: str) -> LLM:
@@ -49,35 +69,182 @@ def cli(debug: bool):
                         format='%(asctime)s:%(levelname)s:%(name)s:%(message)s')
 
 
+WEB_SEARCH_MAX_RESULTS = {
+    'google': 10,
+    'ddg': 20,
+}
+
 WEB_SEARCH_ENGINE_MAP = {
-    'google': wse_google,
-    'ddg': wse_ddgs_create_func(20),
+    'google': wse_google_create_func(WEB_SEARCH_MAX_RESULTS['google']),
+    'ddg': wse_ddgs_create_func(WEB_SEARCH_MAX_RESULTS['ddg']),
 }
 
+WEB_SEARCH_QUERIES_PER_MINUTE = {
+    'google': 10,
+    'ddg': 20,
+}
+
+
+MERGED_WEB_SEARCH_ENGINE = 'merged'
+DOMAIN_HEALTH_DB_FILENAME = 'domain-health.sqlite3'
+TOPIC_YIELD_DB_FILENAME = 'topic-yield.sqlite3'
+SIMHASH_INDEX_FILENAME = 'simhash-index.jsonl'
+RUN_PLAN_DIRNAME = 'run-plan'
+DOMAIN_HEALTH_SORT_KEYS = ('host', 'requests', 'success_rate', 'average_latency', 'extraction_yield',
+                           'relatedness_rate')
+
+
+def build_websearch_func(wse: str, queries_per_minute: Optional[float], burst: int,
+                         merged_engines: Optional[List[str]] = None, merged_quorum: Optional[int] = None,
+                         merged_deadline: float = 30.0) -> Callable[[str], List[SearchResult]]:
+    if wse == MERGED_WEB_SEARCH_ENGINE:
+        merged_engines = merged_engines or list(WEB_SEARCH_ENGINE_MAP.keys())
+        return wse_create_merged_search_func(
+            {engine: build_websearch_func(engine, queries_per_minute, burst) for engine in merged_engines},
+            quorum=merged_quorum or len(merged_engines), deadline=merged_deadline)
+
+    return wse_create_rate_limited_func(
+        WEB_SEARCH_ENGINE_MAP[wse],
+        wse_engine_bucket(wse, queries_per_minute or WEB_SEARCH_QUERIES_PER_MINUTE[wse], burst))
+
+
+ARTICLE_EXTRACTORS = ('readability', 'text-density')
+
+
+def build_extract_article_func(extractor: str, readability_workers: int,
+                               readability_worker_max_rss_mb: int) -> Callable[[str], str]:
+    if extractor == 'text-density':
+        return text_density_extract_article_text
+    if readability_workers > 0:
+        return ReadabilityWorkerPool(size=readability_workers, cwd=Path(os.getcwd()) / 'extract-article',
+                                     max_rss_mb=readability_worker_max_rss_mb)
+    return extract_article_using_readability
+
 
 @cli.command('generate-raw-articles')
 @click.option('--llm-endpoint')
 @click.option('--ollama-endpoint')
 @click.option('--ollama-extra-args')
 @click.option('--llm-log-file', type=click.Path(dir_okay=False, file_okay=True))
+@click.option('--llm-max-concurrency', default=4)
+@click.option('--llm-target-latency', type=float)
+@click.option('--llm-circuit-breaker-failures', default=5)
+@click.option('--llm-circuit-breaker-reset-timeout', default=60.0)
 @click.option('--cache-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
 @click.option('--output-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
 @click.option('--download-timeout', default=10)
-@click.option('--wse', default='google', type=click.Choice(list(WEB_SEARCH_ENGINE_MAP.keys())))
+@click.option('--wse', default='google',
+              type=click.Choice(list(WEB_SEARCH_ENGINE_MAP.keys()) + [MERGED_WEB_SEARCH_ENGINE]))
+@click.option('--wse-merged-engines', default=','.join(WEB_SEARCH_ENGINE_MAP.keys()))
+@click.option('--wse-merged-quorum', type=int)
+@click.option('--wse-merged-deadline', default=30.0)
+@click.option('--wse-queries-per-minute', type=float)
+@click.option('--wse-burst', default=3)
+@click.option('--search-workers', default=1)
 @click.option('--topic-generator', default='per_country_llm', type=click.Choice(['llm', 'per_country_llm']))
 @click.option('--topic-generator-max-search-queries', default=30)
 @click.option('--max-llm-payload', default=12000)
 @click.option('--sample-countries-count', default=5)
 @click.option('--version', type=click.Choice(['v1', 'v2']), default='v2')
+@click.option('--cascade-llm-endpoint')
+@click.option('--cascade-ollama-endpoint')
+@click.option('--cascade-ollama-extra-args')
+@click.option('--cascade-max-llm-payload', type=int)
+@click.option('--cascade-min-relatedness', default='SOMEWHAT_RELATED', type=click.Choice(RELATEDNESS_LEVELS[1:]))
+@click.option('--prefilter-min-score', type=float)
+@click.option('--prefilter-scores-file', type=click.Path(dir_okay=False, file_okay=True))
+@click.option('--prefilter-idf-file', type=click.Path(dir_okay=False, file_okay=True, exists=True))
+@click.option('--snippet-filter-min-score', type=float)
+@click.option('--content-store/--no-content-store', default=True)
+@click.option('--extractor', default='readability', type=click.Choice(ARTICLE_EXTRACTORS))
+@click.option('--readability-workers', default=2)
+@click.option('--readability-worker-max-rss-mb', default=1024)
+@click.option('--http-cache/--no-http-cache', default=True)
+@click.option('--http-cache-freshness-hours', default=168.0)
+@click.option('--max-download-mb', default=20.0)
+@click.option('--max-pdf-pages', default=50)
+@click.option('--pdf-workers', default=2)
+@click.option('--pdf-timeout', default=60.0)
+@click.option('--fetch-max-concurrency', default=16)
+@click.option('--fetch-max-per-host', default=2)
+@click.option('--fetch-politeness-delay', default=1.0)
+@click.option('--prefetch/--no-prefetch', default=True)
+@click.option('--domain-health/--no-domain-health', 'use_domain_health', default=True)
+@click.option('--domain-health-min-requests', default=5)
+@click.option('--domain-health-min-success-rate', default=0.2)
+@click.option('--domain-health-min-extraction-yield', default=0.2)
+@click.option('--domain-health-half-life-days', default=7.0)
+@click.option('--domain-health-probe-interval-minutes', default=60.0)
+@click.option('--near-duplicate-index/--no-near-duplicate-index', default=True)
+@click.option('--near-duplicate-max-distance', default=3)
+@click.option('--near-duplicate-scope', default='query', type=click.Choice(['query', 'global']))
+@click.option('--pipeline-workers')
+@click.option('--pipeline-queue-size', default=32)
+@click.option('--run-plan-dir', type=click.Path(dir_okay=True, file_okay=False))
+@click.option('--resume', is_flag=True)
+@click.option('--output-manifest', type=click.Path(dir_okay=False, file_okay=True))
+@click.option('--schedule-by-yield', is_flag=True)
+@click.option('--budget-llm-calls', type=int)
+@click.option('--budget-minutes', type=float)
+@click.option('--work-claims', is_flag=True)
+@click.option('--worker-id')
+@click.option('--work-lease-minutes', default=30.0)
+@click.option('--trace-file', type=click.Path(dir_okay=False, file_okay=True))
 def cli_generate_raw_articles(llm_endpoint: str, ollama_endpoint: str, ollama_extra_args: str,
                               cache_dir: str, output_dir: str, download_timeout: int,
                               wse: str, topic_generator: str, max_llm_payload: int,
                               topic_generator_max_search_queries: int, sample_countries_count: int,
-                              version: str, llm_log_file: Optional[str]):
+                              version: str, llm_log_file: Optional[str],
+                              llm_max_concurrency: int, llm_target_latency: Optional[float],
+                              llm_circuit_breaker_failures: int, llm_circuit_breaker_reset_timeout: float,
+                              cascade_llm_endpoint: Optional[str], cascade_ollama_endpoint: Optional[str],
+                              cascade_ollama_extra_args: Optional[str], cascade_max_llm_payload: Optional[int],
+                              cascade_min_relatedness: str, prefilter_min_score: Optional[float],
+                              prefilter_scores_file: Optional[str], prefilter_idf_file: Optional[str],
+                              wse_queries_per_minute: Optional[float],
+                              wse_burst: int, search_workers: int, wse_merged_engines: str,
+                              wse_merged_quorum: Optional[int], wse_merged_deadline: float,
+                              snippet_filter_min_score: Optional[float], content_store: bool,
+                              extractor: str, readability_workers: int, readability_worker_max_rss_mb: int,
+                              http_cache: bool, http_cache_freshness_hours: float, max_download_mb: float,
+                              max_pdf_pages: int, pdf_workers: int, pdf_timeout: float,
+                              fetch_max_concurrency: int, fetch_max_per_host: int, fetch_politeness_delay: float,
+                              prefetch: bool, use_domain_health: bool, domain_health_min_requests: int,
+                              domain_health_min_success_rate: float, domain_health_min_extraction_yield: float,
+                              domain_health_half_life_days: float, domain_health_probe_interval_minutes: float,
+                              near_duplicate_index: bool, near_duplicate_max_distance: int,
+                              near_duplicate_scope: str, pipeline_workers: Optional[str], pipeline_queue_size: int,
+                              run_plan_dir: Optional[str], resume: bool, output_manifest: Optional[str],
+                              schedule_by_yield: bool, budget_llm_calls: Optional[int],
+                              budget_minutes: Optional[float], work_claims: bool, worker_id: Optional[str],
+                              work_lease_minutes: float, trace_file: Optional[str]):
+    if schedule_by_yield and pipeline_workers:
+        raise click.UsageError('--schedule-by-yield cannot be combined with --pipeline-workers')
     llm = build_llm_from_args(llm_endpoint=llm_endpoint,
                               ollama_endpoint=ollama_endpoint,
                               ollama_extra_args=ollama_extra_args,
-                              llm_log_file=llm_log_file)
+                              llm_log_file=llm_log_file,
+                              llm_max_concurrency=llm_max_concurrency,
+                              llm_target_latency=llm_target_latency,
+                              llm_circuit_breaker_failures=llm_circuit_breaker_failures,
+                              llm_circuit_breaker_reset_timeout=llm_circuit_breaker_reset_timeout)
+
+    cascade_llm = None
+    if cascade_llm_endpoint or cascade_ollama_endpoint:
+        cascade_llm = build_llm_from_args(llm_endpoint=cascade_llm_endpoint,
+                                          ollama_endpoint=cascade_ollama_endpoint,
+                                          ollama_extra_args=cascade_ollama_extra_args,
+                                          llm_log_file=llm_log_file,
+                                          llm_max_concurrency=llm_max_concurrency,
+                                          llm_target_latency=llm_target_latency,
+                                          llm_circuit_breaker_failures=llm_circuit_breaker_failures,
+                                          llm_circuit_breaker_reset_timeout=llm_circuit_breaker_reset_timeout)
+    cascade_id = json.dumps({
+        'llm-endpoint': cascade_llm_endpoint,
+        'ollama-endpoint': cascade_ollama_endpoint,
+        'ollama-extra-args': json.loads(cascade_ollama_extra_args or '{}'),
+        'max-llm-payload': cascade_max_llm_payload,
+    }, sort_keys=True)
 
     if topic_generator == 'llm':
         topic_generator_func = llm_topic_generator_create_func(
@@ -90,25 +257,142 @@ def cli_generate_raw_articles(llm_endpoint: str, ollama_endpoint: str, ollama_ex
     else:
         raise ValueError(f'Unknown topic generator: {topic_generator}')
 
+    kwargs = dict()
     cache = FilesystemCache(Path(cache_dir))
-    cache_func = wse_create_cache(websearch_func=WEB_SEARCH_ENGINE_MAP[wse], cache=cache)
+    merged_engines = wse_merged_engines.split(',')
+    cache_func = wse_create_cache(
+        websearch_func=build_websearch_func(
+            wse, wse_queries_per_minute, wse_burst, merged_engines=merged_engines,
+            merged_quorum=wse_merged_quorum, merged_deadline=wse_merged_deadline),
+        cache=cache,
+        engine=wse if wse != MERGED_WEB_SEARCH_ENGINE else f'{wse}:{",".join(sorted(merged_engines))}',
+        max_results=WEB_SEARCH_MAX_RESULTS.get(wse))
+
+    # written on every run, so that an interrupted one can be continued with --resume
+    run_plan_path = Path(run_plan_dir) if run_plan_dir else Path(cache_dir) / RUN_PLAN_DIRNAME
+    run_plan = RunPlan(run_plan_path, resume=resume, shared=work_claims)
+    topic_generator_func = run_plan.create_topic_generator_func(topic_generator_func)
+    cache_func = run_plan.create_search_func(cache_func)
+    kwargs['run_plan'] = run_plan
+    if work_claims:
+        # the workers sharing a plan (all but the first one started with --resume) split its query/URL pairs
+        kwargs['work_claims'] = WorkClaims(run_plan_path / CLAIMS_DB_FILENAME, plan_id=run_plan.plan_id,
+                                           worker_id=worker_id, lease_seconds=work_lease_minutes * 60)
+    if trace_file:
+        tracer = Tracer(Path(trace_file))
+        cache_func = tracer.create_search_func(cache_func)
+        kwargs['tracer'] = tracer
+    if search_workers > 1:
+        kwargs['search_all_func'] = wse_create_fan_out_func(cache_func, search_workers)
+
+    bm25_scorer = BM25Scorer(
+        background=relevance_load_document_frequencies(Path(prefilter_idf_file)) if prefilter_idf_file else None)
+    relevance_prefilter_func = None
+    if prefilter_min_score is not None or prefilter_scores_file:
+        # with the scores file only, the scores are recorded (i.e. for tuning the threshold) but nothing is skipped
+        relevance_prefilter_func = relevance_create_prefilter_func(
+            bm25_scorer, min_score=prefilter_min_score or 0.0,
+            scores_log_path=Path(prefilter_scores_file) if prefilter_scores_file else None)
+
+    if snippet_filter_min_score is not None:
+        kwargs['snippet_filter_func'] = relevance_create_snippet_filter_func(
+            bm25_scorer, min_score=snippet_filter_min_score,
+            scores_log_path=Path(prefilter_scores_file) if prefilter_scores_file else None)
+
+    if pipeline_workers:
+        kwargs['pipeline_workers'] = parse_pipeline_workers(pipeline_workers)
+        kwargs['pipeline_queue_size'] = pipeline_queue_size
+
+    if near_duplicate_index:
+        kwargs['near_duplicate_index'] = SimHashIndex(
+            Path(cache_dir) / SIMHASH_INDEX_FILENAME, max_distance=near_duplicate_max_distance)
+        kwargs['near_duplicate_scope'] = near_duplicate_scope
+
+    domain_health = None
+    if use_domain_health:
+        domain_health = DomainHealth(Path(cache_dir) / DOMAIN_HEALTH_DB_FILENAME,
+                                     min_requests=domain_health_min_requests,
+                                     min_success_rate=domain_health_min_success_rate,
+                                     min_extraction_yield=domain_health_min_extraction_yield,
+                                     half_life_seconds=domain_health_half_life_days * 24 * 3600,
+                                     probe_interval_seconds=domain_health_probe_interval_minutes * 60)
+        kwargs['domain_health'] = domain_health
+    fetch_engine = FetchEngine(max_concurrency=fetch_max_concurrency, max_per_host=fetch_max_per_host,
+                               politeness_delay=fetch_politeness_delay, domain_health=domain_health)
+    s8er_set_default_fetch_engine(fetch_engine)
+    freshness = timedelta(hours=http_cache_freshness_hours)
+    fetcher = CachingFetcher(HttpCacheStore(Path(cache_dir) / 'http') if http_cache else None,
+                             timeout=download_timeout, freshness=freshness,
+                             max_bytes=int(max_download_mb * 1024 * 1024),
+                             accept_content_type=is_supported_content_type, engine=fetch_engine)
+    kwargs['fetcher'] = fetcher
+    # prefetched pages are picked up from the HTTP cache, without it they would be downloaded twice. Prefetching
+    # happens before the traces of the pages start, with it the download spans would only time reads from the cache.
+    if http_cache and prefetch and trace_file:
+        logging.getLogger(__name__).warning('Prefetching is turned off, as --trace-file is set')
+    kwargs['prefetch_workers'] = fetch_max_concurrency if http_cache and prefetch and not trace_file else 0
+
+    if budget_llm_calls is not None or budget_minutes is not None:
+        # topic generation is not counted, the budget is meant for processing the pages
+        budget = WorkBudget(max_llm_calls=budget_llm_calls,
+                            max_seconds=budget_minutes * 60 if budget_minutes is not None else None)
+        llm = BudgetedLLM(llm, budget)
+        cascade_llm = BudgetedLLM(cascade_llm, budget) if cascade_llm else None
+        kwargs['budget'] = budget
+    if schedule_by_yield:
+        kwargs['yield_scheduler'] = YieldScheduler(
+            TopicYieldStats(Path(cache_dir) / TOPIC_YIELD_DB_FILENAME, per_region_topic_template),
+            domain_health=domain_health, budget=kwargs.get('budget'))
 
-    kwargs = dict()
     if version == 'v2':
         use_case_class = GenerateRawArticles2UseCase
-        kwargs['obtain_content_func'] = obtain_content_from_url_func(timeout=download_timeout)
+        obtain_content_func = obtain_content_from_url_func(
+            timeout=download_timeout,
+            extract_article_func=build_extract_article_func(
+                extractor, readability_workers, readability_worker_max_rss_mb),
+            fetcher=fetcher,
+            extracted_cache=cache,
+            extractor_id=extractor,
+            max_pdf_pages=max_pdf_pages,
+            extract_pdf_func=PdfExtractionPool(pdf_workers, timeout=pdf_timeout) if pdf_workers > 0 else
+            extract_pdf_text)
+        if content_store:
+            # past the freshness window the page is revalidated, which is cheap when it has not changed
+            obtain_content_func = cached_obtain_content_func(
+                obtain_content_func, cache, max_age=freshness if http_cache else None,
+                extraction_id=f'{extractor}-pdf{max_pdf_pages or ""}')
+        kwargs['obtain_content_func'] = obtain_content_func
     else:
         use_case_class = GenerateRawArticlesUseCase
 
     use_case = use_case_class(
-        llm=llm, persist_summary=PersistSummaryToFile(output_dir),
+        llm=llm, persist_summary=PersistSummaryToFile(
+            output_dir, manifest_path=Path(output_manifest) if output_manifest else None),
         websearch_func=cache_func, download_timeout=download_timeout, topic_generator_func=topic_generator_func,
-        check_cache=cache, max_llm_payload=max_llm_payload, **kwargs)
+        check_cache=cache, max_llm_payload=max_llm_payload,
+        cascade_llm=cascade_llm, cascade_max_llm_payload=cascade_max_llm_payload,
+        cascade_min_relatedness=cascade_min_relatedness, cascade_id=cascade_id,
+        relevance_prefilter_func=relevance_prefilter_func, **kwargs)
     use_case.invoke()
 
 
+def parse_pipeline_workers(pipeline_workers: str) -> Dict[str, int]:
+    # i.e. "fetch=8,summarize=2", the stages not mentioned get one worker
+    workers = {}
+    for entry in pipeline_workers.split(','):
+        stage, _, count = entry.partition('=')
+        if stage.strip() not in PIPELINE_STAGES or not count.strip().isdigit() or int(count) < 1:
+            raise click.BadParameter(f'Expected <stage>=<workers> with a stage out of {", ".join(PIPELINE_STAGES)}, '
+                                     f'got: {entry}', param_hint='--pipeline-workers')
+        workers[stage.strip()] = int(count)
+    return workers
+
+
 def build_llm_from_args(llm_endpoint: Optional[str], ollama_endpoint: Optional[str],
-                        ollama_extra_args: Optional[str], llm_log_file: Optional[str]) -> LLM:
+                        ollama_extra_args: Optional[str], llm_log_file: Optional[str],
+                        llm_max_concurrency: int = 4, llm_target_latency: Optional[float] = None,
+                        llm_circuit_breaker_failures: int = 5,
+                        llm_circuit_breaker_reset_timeout: float = 60.0) -> LLM:
     if llm_endpoint and ollama_endpoint:
         raise ValueError('Only one of --llm-endpoint or --ollama-endpoint can be specified')
     if not llm_endpoint and not ollama_endpoint:
@@ -119,11 +403,105 @@ def build_llm_from_args(llm_endpoint: Optional[str], ollama_endpoint: Optional[s
         ollama_extra_args = ollama_extra_args or '{}'
         llm = build_ollama_endpoint(ollama_endpoint, json.loads(ollama_extra_args))
 
+    llm = AdaptiveLLM(
+        llm,
+        concurrency_limit=AdaptiveConcurrencyLimit(
+            initial_limit=1, max_limit=llm_max_concurrency, target_latency=llm_target_latency),
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=llm_circuit_breaker_failures,
+            reset_timeout=llm_circuit_breaker_reset_timeout) if llm_circuit_breaker_failures > 0 else None)
+
     if llm_log_file:
         llm = LoggedLLM(llm, Path(llm_log_file), [])
     return llm
 
 
+@cli.command('benchmark-extractors')
+@click.option('--html-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
+@click.option('--readability-workers', default=2)
+def cli_benchmark_extractors(html_dir: str, readability_workers: int):
+    results = benchmark_extractors(Path(html_dir), {
+        'readability-subprocess': extract_article_using_readability,
+        'readability-pool': build_extract_article_func('readability', readability_workers, 1024),
+        'text-density': text_density_extract_article_text,
+    })
+    click.echo(format_benchmark_results(results))
+
+
+@cli.command('build-prefilter-idf')
+@click.option('--text-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
+@click.option('--output-file', required=True, type=click.Path(dir_okay=False, file_okay=True))
+def cli_build_prefilter_idf(text_dir: str, output_file: str):
+    # i.e. from the raw articles of past runs, for --prefilter-idf-file
+    def _texts():
+        for fn in sorted(os.listdir(text_dir)):
+            with open(Path(text_dir) / fn, errors='replace') as f:
+                yield f.read()
+
+    frequencies = relevance_document_frequencies(_texts())
+    relevance_save_document_frequencies(Path(output_file), frequencies)
+    click.echo(f'Collected document frequencies of {len(frequencies["document_frequencies"])} terms from '
+               f'{frequencies["documents_count"]} documents')
+
+
+@cli.group('domain-health')
+def cli_domain_health():
+    pass
+
+
+@cli_domain_health.command('list')
+@click.option('--cache-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
+@click.option('--sort', default='requests', type=click.Choice(DOMAIN_HEALTH_SORT_KEYS))
+@click.option('--limit', type=int)
+@click.option('--json', 'as_json', is_flag=True)
+def cli_domain_health_list(cache_dir: str, sort: str, limit: Optional[int], as_json: bool):
+    domain_health = DomainHealth(Path(cache_dir) / DOMAIN_HEALTH_DB_FILENAME)
+    rows = sorted((stats.to_dict() for stats in domain_health.all_stats()),
+                  key=lambda row: (row[sort] is not None, row[sort]), reverse=sort != 'host')[:limit]
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+
+    def _format_rate(value: Optional[float]) -> str:
+        return f'{value:.2f}' if value is not None else '-'
+
+    click.echo(f'{"host":<40}{"requests":>9}{"success":>9}{"blocked":>9}{"latency":>9}{"yield":>7}{"related":>9}'
+               f'  override')
+    for row in rows:
+        click.echo(f'{row["host"][:39]:<40}{row["requests"]:>9.1f}{_format_rate(row["success_rate"]):>9}'
+                   f'{row["blocked"]:>9.1f}{_format_rate(row["average_latency"]):>9}'
+                   f'{_format_rate(row["extraction_yield"]):>7}{_format_rate(row["relatedness_rate"]):>9}'
+                   f'  {row["override"] or ""}')
+
+
+@cli_domain_health.command('override')
+@click.option('--cache-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
+@click.argument('HOST')
+@click.argument('OVERRIDE', type=click.Choice(['skip', 'allow', 'auto']))
+def cli_domain_health_override(cache_dir: str, host: str, override: str):
+    DomainHealth(Path(cache_dir) / DOMAIN_HEALTH_DB_FILENAME).set_override(
+        normalize_host(host), None if override == 'auto' else override)
+
+
+@cli.command('profile-report')
+@click.option('--trace-file', required=True, type=click.Path(dir_okay=False, file_okay=True, exists=True))
+@click.option('--json', 'as_json', is_flag=True)
+def cli_profile_report(trace_file: str, as_json: bool):
+    report = profile_report(read_traces(Path(trace_file)))
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        click.echo(format_profile_report(report))
+
+
+@cli.command('migrate-websearch-cache')
+@click.option('--cache-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
+@click.option('--engine', required=True, type=click.Choice(list(WEB_SEARCH_ENGINE_MAP.keys())))
+def cli_migrate_websearch_cache(cache_dir: str, engine: str):
+    wse_migrate_legacy_cache_entries(FilesystemCache(Path(cache_dir)), engine=engine,
+                                     max_results=WEB_SEARCH_MAX_RESULTS[engine])
+
+
 @cli.command('generate-markdown-articles')
 @click.option('--raw-articles-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
 @click.option('--output-dir', required=True, type=click.Path(dir_okay=True, exists=True, file_okay=False))
@@ -131,22 +509,39 @@ def build_llm_from_args(llm_endpoint: Optional[str], ollama_endpoint: Optional[s
 @click.option('--ollama-endpoint')
 @click.option('--ollama-extra-args')
 @click.option('--llm-log-file', type=click.Path(dir_okay=False, file_okay=True))
+@click.option('--llm-max-concurrency', default=4)
+@click.option('--llm-target-latency', type=float)
+@click.option('--llm-circuit-breaker-failures', default=5)
+@click.option('--llm-circuit-breaker-reset-timeout', default=60.0)
 @click.option('--max-number-of-articles', default=10)
 @click.option('--max-retries-per-article', default=3)
 @click.option('--max-llm-payload', default=12000)
+@click.option('--output-manifest', type=click.Path(dir_okay=False, file_okay=True))
+@click.option('--workers', default=1)
 def cli_generate_markdown_articles(
         raw_articles_dir: str, output_dir: str, llm_endpoint: str,
         ollama_endpoint: str, ollama_extra_args: str,
         max_number_of_articles: int, max_retries_per_article: int,
-        max_llm_payload: int, llm_log_file: Optional[str]):
+        max_llm_payload: int, llm_log_file: Optional[str],
+        llm_max_concurrency: int, llm_target_latency: Optional[float],
+        llm_circuit_breaker_failures: int, llm_circuit_breaker_reset_timeout: float,
+        output_manifest: Optional[str], workers: int):
     llm = build_llm_from_args(llm_endpoint=llm_endpoint,
                               ollama_endpoint=ollama_endpoint,
                               ollama_extra_args=ollama_extra_args,
-                              llm_log_file=llm_log_file)
+                              llm_log_file=llm_log_file,
+                              llm_max_concurrency=llm_max_concurrency,
+                              llm_target_latency=llm_target_latency,
+                              llm_circuit_breaker_failures=llm_circuit_breaker_failures,
+                              llm_circuit_breaker_reset_timeout=llm_circuit_breaker_reset_timeout)
+    # one process per output directory, more throughput comes from --workers
     GenerateMarkdownArticle(
-        raw_articles_dir=raw_articles_dir, output_storage=FilesystemStorage(Path(output_dir)),
+        raw_articles_dir=raw_articles_dir,
+        output_storage=FilesystemStorage(Path(output_dir),
+                                         manifest_path=Path(output_manifest) if output_manifest else None),
         llm=llm, max_number_of_articles=max_number_of_articles,
-        max_retries_per_article=max_retries_per_article, max_llm_payload=max_llm_payload).invoke()
+        max_retries_per_article=max_retries_per_article, max_llm_payload=max_llm_payload,
+        workers=workers).invoke()
 
 
 @cli.command('generate-docusaurus-articles')
@@ -1,32 +1,107 @@
-import io
 import os
 import tempfile
 from pathlib import Path
 from subprocess import check_output
 
-import pypdf
-import requests
+from datetime import datetime, timedelta
 
-from typing import Callable
+from typing import Callable, Optional
 
+from blogbuilder.obtaincontent.pdf_pool import extract_pdf_text, PdfExtractionError
+from blogbuilder.obtaincontent.readability_pool import ReadabilityWorkerError
+from blogbuilder.tracing import span
+from blogbuilder.util import canonicalize_url
+from s8er.cache import Cache
+from s8er.fetch import CachingFetcher, FetchResponse
 
-def obtain_content_from_url_func(timeout: int) -> Callable[[str], str]:
-    def _extract_article_using_readibility(article_text: str) -> str:
-        with tempfile.NamedTemporaryFile(mode='w') as f:
-            f.write(article_text)
-            f.flush()
-            url = f.name
-            return check_output(['node', 'extract-article.js', '--url', url], text=True,
-                                cwd=Path(os.getcwd()) / 'extract-article')
+CONTENT_CACHE_PREFIX = 'CONTENT-'
+EXTRACTED_CACHE_PREFIX = 'EXTRACTED-'
+FAILED_EXTRACTION_CACHE_PREFIX = 'EXTRACTION-FAILED-'
+PDF_CONTENT_TYPES = ('application/pdf', 'application/octet-stream')
+SUPPORTED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain') + PDF_CONTENT_TYPES
+DEFAULT_MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+# a page yielding no text is most likely a transient failure (a consent wall, a truncated download, ...)
+EMPTY_CONTENT_MAX_AGE = timedelta(days=1)
+FAILED_EXTRACTION_MAX_AGE = timedelta(hours=6)
 
-    def _obtain_content_from_url(url: str) -> str:
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
 
-        if r.headers.get('content-type') in ['application/pdf', 'application/octet-stream']:
-            reader = pypdf.PdfReader(io.BytesIO(r.content))
-            return '\n'.join([page.extract_text() for page in reader.pages])
+def is_supported_content_type(content_type: Optional[str]) -> bool:
+    return content_type is None or content_type in SUPPORTED_CONTENT_TYPES
+
+
+def extract_article_using_readability(article_text: str) -> str:
+    with tempfile.NamedTemporaryFile(mode='w') as f:
+        f.write(article_text)
+        f.flush()
+        url = f.name
+        return check_output(['node', 'extract-article.js', '--url', url], text=True,
+                            cwd=Path(os.getcwd()) / 'extract-article')
+
+
+def obtain_content_from_url_func(timeout: int,
+                                 extract_article_func: Callable[[str], str] = extract_article_using_readability,
+                                 fetcher: Optional[CachingFetcher] = None,
+                                 extracted_cache: Optional[Cache[str]] = None,
+                                 extractor_id: str = '',
+                                 max_pdf_pages: Optional[int] = None,
+                                 extract_pdf_func: Callable[[bytes, Optional[int]], str] = extract_pdf_text
+                                 ) -> Callable[[str], str]:
+    fetcher = fetcher or CachingFetcher(store=None, timeout=timeout, max_bytes=DEFAULT_MAX_DOWNLOAD_BYTES,
+                                        accept_content_type=is_supported_content_type)
+
+    def _extract_content(response: FetchResponse) -> str:
+        if response.content_type in PDF_CONTENT_TYPES:
+            with span('pdf'):
+                return extract_pdf_func(response.content, max_pdf_pages)
         else:
-            return _extract_article_using_readibility(r.text)
+            with span('extract'):
+                return extract_article_func(response.text)
+
+    def _obtain_content_from_url(url: str) -> str:
+        with span('download'):
+            response = fetcher.fetch(url)
+        if not extracted_cache:
+            return _extract_content(response)
+        if response.content_type in PDF_CONTENT_TYPES:
+            extraction_id = f'pdf{max_pdf_pages or ""}'
+        else:
+            extraction_id = extractor_id
+        error_class = PdfExtractionError if response.content_type in PDF_CONTENT_TYPES else ReadabilityWorkerError
+        # a document that crashed or hung a worker most likely does so again, so the failure is kept per body hash
+        # for a while; not for good, as the worker may just as well have been starved by a busy machine
+        failed_prefix_key = FAILED_EXTRACTION_CACHE_PREFIX + extraction_id + '-'
+        if extracted_cache.exists(response.content_hash, prefix_key=failed_prefix_key):
+            failure = extracted_cache.get(response.content_hash, lambda: '', prefix_key=failed_prefix_key)
+            if datetime.utcnow() - failure.metadata.created_at <= FAILED_EXTRACTION_MAX_AGE:
+                raise error_class('Extraction failed before: ' + failure.payload)
+        # extracted text is kept per body hash, so it is reused as long as the document has not changed
+        try:
+            return extracted_cache.get_raw(response.content_hash, lambda: _extract_content(response),
+                                           prefix_key=EXTRACTED_CACHE_PREFIX + extraction_id + '-')
+        except (PdfExtractionError, ReadabilityWorkerError) as e:
+            message = str(e)
+            # max_age of zero, so that an expired failure gets replaced
+            extracted_cache.get_raw(response.content_hash, lambda: message, prefix_key=failed_prefix_key,
+                                    max_age=timedelta(0))
+            raise
+
+    return _obtain_content_from_url
+
+
+def cached_obtain_content_func(obtain_content_func: Callable[[str], str], cache: Cache[str],
+                               max_age: Optional[timedelta] = None, extraction_id: str = '') -> Callable[[str], str]:
+    # Extracted content is stored per canonical URL, so a page is downloaded and extracted once no matter how many
+    # queries (and runs) point at it. The key includes how the content was extracted, so changing the extractor or the
+    # PDF page cap does not serve text produced by the previous settings.
+    prefix_key = CONTENT_CACHE_PREFIX + (extraction_id + '-' if extraction_id else '')
+    empty_max_age = min(max_age, EMPTY_CONTENT_MAX_AGE) if max_age is not None else EMPTY_CONTENT_MAX_AGE
+
+    def _obtain_content_from_url(url: str) -> str:
+        key = canonicalize_url(url)
+        content = cache.get_raw(key, lambda: obtain_content_func(url), prefix_key=prefix_key, max_age=max_age)
+        if not content.strip():
+            content = cache.get_raw(key, lambda: obtain_content_func(url), prefix_key=prefix_key,
+                                    max_age=empty_max_age)
+        return content
 
     return _obtain_content_from_url
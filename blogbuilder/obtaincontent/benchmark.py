@@ -0,0 +1,50 @@
+import logging
+import os
+import statistics
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Callable, Dict
+
+
+def benchmark_extractors(html_dir: Path, extractors: Dict[str, Callable[[str], str]]) -> Dict[str, dict]:
+    log = logging.getLogger(__name__)
+    documents = {}
+    for filename in sorted(os.listdir(html_dir)):
+        if filename.endswith('.html') or filename.endswith('.htm'):
+            with open(html_dir / filename, encoding='utf-8', errors='replace') as f:
+                documents[filename] = f.read()
+    log.info(f'Benchmarking {len(extractors)} extractors on {len(documents)} HTML documents from {html_dir}')
+
+    results = {}
+    for name, extract_func in extractors.items():
+        durations = []
+        output_lengths = []
+        failures = 0
+        for filename, html in documents.items():
+            start = timer()
+            try:
+                output_lengths.append(len(extract_func(html).strip()))
+            except Exception:
+                log.exception(f'{name} failed on {filename}')
+                failures += 1
+            durations.append(timer() - start)
+        results[name] = {
+            'documents': len(documents),
+            'failures': failures,
+            'total_seconds': sum(durations),
+            'mean_ms': statistics.mean(durations) * 1000 if durations else 0.0,
+            'median_ms': statistics.median(durations) * 1000 if durations else 0.0,
+            'mean_output_length': statistics.mean(output_lengths) if output_lengths else 0.0,
+            'empty_outputs': sum(1 for length in output_lengths if length == 0),
+        }
+    return results
+
+
+def format_benchmark_results(results: Dict[str, dict]) -> str:
+    lines = [f'{"extractor":<24}{"docs":>6}{"failed":>8}{"empty":>7}{"total s":>10}{"mean ms":>10}'
+             f'{"median ms":>11}{"mean length":>13}']
+    for name, result in results.items():
+        lines.append(f'{name:<24}{result["documents"]:>6}{result["failures"]:>8}{result["empty_outputs"]:>7}'
+                     f'{result["total_seconds"]:>10.2f}{result["mean_ms"]:>10.1f}{result["median_ms"]:>11.1f}'
+                     f'{result["mean_output_length"]:>13.0f}')
+    return '\n'.join(lines)
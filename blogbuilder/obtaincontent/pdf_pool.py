@@ -0,0 +1,92 @@
+import io
+import itertools
+import multiprocessing
+from typing import Optional, Callable
+
+import pypdf
+
+from blogbuilder.obtaincontent.worker_pool import WorkerPool
+
+
+class PdfExtractionError(Exception):
+    pass
+
+
+def extract_pdf_text(content: bytes, max_pages: Optional[int] = None) -> str:
+    reader = pypdf.PdfReader(io.BytesIO(content))
+    pages = itertools.islice(reader.pages, max_pages) if max_pages else reader.pages
+    return '\n'.join([page.extract_text() for page in pages])
+
+
+def _serve(conn, extract_func: Callable[[bytes, Optional[int]], str]) -> None:
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        content, max_pages = request
+        try:
+            conn.send(('ok', extract_func(content, max_pages)))
+        except Exception as e:
+            conn.send(('error', f'{e.__class__.__name__}: {e}'))
+
+
+class PdfWorker:
+    def __init__(self, context, extract_func: Callable[[bytes, Optional[int]], str]) -> None:
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_serve, args=(child_conn, extract_func), daemon=True,
+                                        name='pdf-worker')
+        self._process.start()
+        child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    def extract(self, content: bytes, max_pages: Optional[int], timeout: float) -> str:
+        try:
+            self._conn.send((content, max_pages))
+            if not self._conn.poll(timeout):
+                raise PdfExtractionError(f'PDF worker did not answer within {timeout}s')
+            status, result = self._conn.recv()
+        except (EOFError, BrokenPipeError, OSError) as e:
+            raise PdfExtractionError(f'PDF worker is gone: {e}')
+        if status == 'error':
+            raise ValueError(f'PDF extraction failed: {result}')
+        return result
+
+    def kill(self) -> None:
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+
+    def close(self) -> None:
+        if self.is_alive():
+            try:
+                self._conn.send(None)
+                self._process.join(timeout=5)
+            except Exception:
+                pass
+        if self.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+
+
+class PdfExtractionPool(WorkerPool[PdfWorker]):
+    # PDF parsing is CPU bound and a single pathological document can take minutes, so it runs in separate
+    # processes with a deadline per document. A worker that misses the deadline is killed and replaced on demand.
+    def __init__(self, size: int, timeout: float = 60.0,
+                 extract_func: Callable[[bytes, Optional[int]], str] = extract_pdf_text) -> None:
+        super().__init__(size, 'PDF worker', PdfExtractionError)
+        self._timeout = timeout
+        self._extract_func = extract_func
+        # spawned, as forking a process running the download and readability threads is not safe
+        self._context = multiprocessing.get_context('spawn')
+
+    def __call__(self, content: bytes, max_pages: Optional[int] = None) -> str:
+        return self._run(lambda worker: worker.extract(content, max_pages, self._timeout))
+
+    def _create_worker(self) -> PdfWorker:
+        return PdfWorker(self._context, self._extract_func)
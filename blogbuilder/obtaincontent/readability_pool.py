@@ -0,0 +1,88 @@
+import itertools
+import json
+import queue
+import threading
+from pathlib import Path
+from subprocess import Popen, PIPE, DEVNULL
+from typing import Optional, List
+
+from blogbuilder.obtaincontent.worker_pool import WorkerPool
+
+
+class ReadabilityWorkerError(Exception):
+    pass
+
+
+class ReadabilityWorker:
+    def __init__(self, command: List[str], cwd: Path) -> None:
+        self._process = Popen(command, cwd=cwd, stdin=PIPE, stdout=PIPE, stderr=DEVNULL,
+                              text=True, encoding='utf-8', bufsize=1)
+        self._responses = queue.Queue()
+        self._ids = itertools.count()
+        self.rss = 0
+        threading.Thread(target=self._read_responses, daemon=True, name='readability-worker-reader').start()
+
+    def _read_responses(self) -> None:
+        for line in self._process.stdout:
+            self._responses.put(line)
+        self._responses.put(None)
+
+    def is_alive(self) -> bool:
+        return self._process.poll() is None
+
+    def extract(self, html: str, url: Optional[str], timeout: float) -> str:
+        request_id = next(self._ids)
+        try:
+            self._process.stdin.write(json.dumps({'id': request_id, 'html': html, 'url': url}) + '\n')
+            self._process.stdin.flush()
+            line = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            raise ReadabilityWorkerError(f'Readability worker did not answer within {timeout}s')
+        except (BrokenPipeError, OSError) as e:
+            raise ReadabilityWorkerError(f'Readability worker is gone: {e}')
+        if line is None:
+            raise ReadabilityWorkerError(f'Readability worker exited with code {self._process.wait()}')
+
+        response = json.loads(line)
+        if response.get('id') != request_id:
+            raise ReadabilityWorkerError(f'Unexpected response id: {response.get("id")}, expected: {request_id}')
+        self.rss = response.get('rss', 0)
+        if 'error' in response:
+            raise ValueError(f'Readability failed: {response["error"]}')
+        return response['content']
+
+    def kill(self) -> None:
+        self._process.kill()
+        self._process.wait()
+
+    def close(self) -> None:
+        if self.is_alive():
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except Exception:
+                self._process.kill()
+                self._process.wait()
+
+
+class ReadabilityWorkerPool(WorkerPool[ReadabilityWorker]):
+    # Long-lived "node extract-article.js --worker" processes, so that Node startup and JSDOM/Readability loading
+    # is paid once per worker instead of once per page. Crashed, hung and over-the-memory-cap workers are replaced
+    # with fresh ones on demand.
+    def __init__(self, size: int, cwd: Path, max_rss_mb: int = 1024, timeout: float = 60.0) -> None:
+        super().__init__(size, 'readability worker', ReadabilityWorkerError)
+        self._cwd = cwd
+        self._max_rss_bytes = max_rss_mb * 1024 * 1024
+        self._timeout = timeout
+
+    def __call__(self, html: str, url: Optional[str] = None) -> str:
+        return self._run(lambda worker: worker.extract(html, url, self._timeout))
+
+    def _create_worker(self) -> ReadabilityWorker:
+        return ReadabilityWorker(['node', 'extract-article.js', '--worker'], cwd=self._cwd)
+
+    def _is_worn_out(self, worker: ReadabilityWorker) -> bool:
+        if worker.rss > self._max_rss_bytes:
+            self._log.info(f'Recycling readability worker using {worker.rss // (1024 * 1024)} MB')
+            return True
+        return False
@@ -0,0 +1,103 @@
+import re
+
+import lxml.html
+from lxml import etree
+
+IGNORED_TAGS = ('script', 'style', 'noscript', 'iframe', 'form', 'nav', 'header', 'footer', 'aside', 'svg',
+                'button', 'select', 'template')
+PARAGRAPH_TAGS = ('p', 'pre', 'td', 'blockquote')
+OUTPUT_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre', 'li', 'blockquote', 'td')
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|post|story|text', re.IGNORECASE)
+NEGATIVE_HINTS = re.compile(
+    r'comment|footer|sidebar|nav|menu|share|social|related|promo|advert|cookie|banner|subscribe|newsletter|'
+    r'breadcrumb|popup|modal|widget', re.IGNORECASE)
+MIN_PARAGRAPH_LENGTH = 25
+
+
+def _normalize_whitespace(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _text_length(element) -> int:
+    return len(_normalize_whitespace(element.text_content()))
+
+
+def _link_density(element) -> float:
+    text_length = _text_length(element)
+    if text_length == 0:
+        return 0.0
+    return sum(_text_length(link) for link in element.iter('a')) / text_length
+
+
+def _class_weight(element) -> int:
+    hints = f'{element.get("class", "")} {element.get("id", "")}'
+    weight = 0
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    return weight
+
+
+def _remove_boilerplate(document) -> None:
+    for element in list(document.iter(etree.Comment, *IGNORED_TAGS)):
+        if element.getparent() is not None:
+            element.drop_tree()
+
+
+def _score_candidates(document) -> dict:
+    # Every paragraph gives points (for its length and commas) to its parent and half of them to its grandparent;
+    # the container collecting most of the points is the main content
+    scores = {}
+    for paragraph in document.iter(*PARAGRAPH_TAGS):
+        text = _normalize_whitespace(paragraph.text_content())
+        if len(text) < MIN_PARAGRAPH_LENGTH:
+            continue
+        points = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        for ancestor, share in ((parent, 1.0), (grandparent, 0.5)):
+            if ancestor is None or not isinstance(ancestor.tag, str):
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = float(_class_weight(ancestor))
+            scores[ancestor] += points * share
+    return {element: score * (1 - _link_density(element)) for element, score in scores.items()}
+
+
+def _has_output_ancestor(element, candidate) -> bool:
+    for ancestor in element.iterancestors():
+        if ancestor is candidate:
+            return False
+        if ancestor.tag in OUTPUT_TAGS:
+            return True
+    return False
+
+
+def _render_text(candidate) -> str:
+    blocks = []
+    for element in candidate.iter(*OUTPUT_TAGS):
+        # nested output tags (i.e. a paragraph in a list item) are rendered by their outermost output ancestor
+        if element is not candidate and _has_output_ancestor(element, candidate):
+            continue
+        text = _normalize_whitespace(element.text_content())
+        if text and (element.tag.startswith('h') or _link_density(element) < 0.5):
+            blocks.append(text)
+    return '\n\n'.join(blocks) if blocks else _normalize_whitespace(candidate.text_content())
+
+
+def extract_article_text(html: str) -> str:
+    if not html or not html.strip():
+        return ''
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        # i.e. strings with an XML encoding declaration have to be parsed as bytes
+        document = lxml.html.document_fromstring(html.encode('utf-8'))
+    _remove_boilerplate(document)
+
+    scores = _score_candidates(document)
+    if not scores:
+        body = document.find('body')
+        return _normalize_whitespace((body if body is not None else document).text_content())
+    return _render_text(max(scores, key=scores.get))
@@ -0,0 +1,101 @@
+import atexit
+import logging
+import queue
+import threading
+from typing import Callable, Generic, Type, TypeVar
+
+W = TypeVar('W')
+R = TypeVar('R')
+
+
+class WorkerPool(Generic[W]):
+    # Up to `size` worker processes started on demand and reused between requests. A worker raising
+    # `worker_error_class` (crashed, hung, missed the deadline) is killed and replaced with a fresh one on demand,
+    # any other error is the document's fault and the worker is reused. Workers have `is_alive`, `kill` and `close`.
+    def __init__(self, size: int, worker_name: str, worker_error_class: Type[Exception]) -> None:
+        self._size = size
+        self._worker_name = worker_name
+        self._worker_error_class = worker_error_class
+        self._idle_workers = queue.Queue()
+        self._workers_count = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._log = logging.getLogger(self.__class__.__name__)
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle_workers.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(worker)
+
+    def _create_worker(self) -> W:
+        raise NotImplementedError()
+
+    def _is_worn_out(self, worker: W) -> bool:
+        return False
+
+    def _run(self, func: Callable[[W], R]) -> R:
+        worker = self._acquire()
+        try:
+            result = func(worker)
+        except self._worker_error_class:
+            self._log.warning(f'{self._worker_name} crashed, hung or missed the deadline, it will be replaced')
+            self._discard(worker, kill=True)
+            raise
+        except:
+            self._release(worker)
+            raise
+        self._release(worker)
+        return result
+
+    def _acquire(self) -> W:
+        while True:
+            try:
+                worker = self._idle_workers.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._closed:
+                        raise self._worker_error_class(f'{self._worker_name} pool is closed')
+                    can_start_worker = self._workers_count < self._size
+                    if can_start_worker:
+                        self._workers_count += 1
+                if can_start_worker:
+                    return self._start_worker()
+                try:
+                    # waiting with a timeout, as the busy workers may get discarded instead of released
+                    worker = self._idle_workers.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+            if worker.is_alive():
+                return worker
+            self._discard(worker)
+
+    def _start_worker(self) -> W:
+        self._log.info(f'Starting a {self._worker_name}')
+        try:
+            return self._create_worker()
+        except:
+            with self._lock:
+                self._workers_count -= 1
+            raise
+
+    def _release(self, worker: W) -> None:
+        if self._closed or not worker.is_alive() or self._is_worn_out(worker):
+            self._discard(worker)
+        else:
+            self._idle_workers.put(worker)
+
+    def _discard(self, worker: W, kill: bool = False) -> None:
+        try:
+            if kill:
+                worker.kill()
+            else:
+                worker.close()
+        finally:
+            with self._lock:
+                self._workers_count -= 1
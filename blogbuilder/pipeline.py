@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Any, Iterable, Optional, List, Dict
+
+from tqdm import tqdm
+
+_END = object()
+
+
+@dataclass
+class PipelineStage:
+    name: str
+    func: Callable[[Any], Optional[Iterable[Any]]]
+    workers: int = 1
+
+
+@dataclass
+class StageStats:
+    received: int = 0
+    emitted: int = 0
+    failed: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class StagedPipeline:
+    # Every stage runs its own pool of worker threads and passes its outputs to the next stage through a bounded
+    # queue, so a slow stage makes the faster ones upstream wait instead of piling up work in memory. A failure of
+    # one item is logged and the item is dropped. On stop() (or Ctrl+C) no new inputs are taken, the items being
+    # processed are finished and the outputs they would pass on are dropped; Ctrl+C is re-raised afterwards.
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 32, show_progress: bool = True) -> None:
+        self._stages = stages
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._stats = {stage.name: StageStats() for stage in stages}
+        self._running_workers = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._show_progress = show_progress
+        self._progress_bars: Dict[str, tqdm] = {}
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    def run(self, inputs: Iterable[Any]) -> Dict[str, StageStats]:
+        self._progress_bars = {
+            stage.name: tqdm(desc=stage.name, position=i, unit='item', disable=not self._show_progress)
+            for i, stage in enumerate(self._stages)
+        }
+        threads = [threading.Thread(target=self._feed, args=(inputs,), daemon=True, name='pipeline-feeder')]
+        for i, stage in enumerate(self._stages):
+            threads += [threading.Thread(target=self._work, args=(i,), daemon=True, name=f'pipeline-{stage.name}-{n}')
+                        for n in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            self._join(threads)
+        except KeyboardInterrupt:
+            self._log.warning('Stopping the pipeline, waiting for the items in progress')
+            self.stop()
+            self._join(threads)
+            raise
+        finally:
+            for progress_bar in self._progress_bars.values():
+                progress_bar.close()
+
+        for name, stats in self._stats.items():
+            self._log.info(f'Stage {name}: received {stats.received}, emitted {stats.emitted}, failed {stats.failed}')
+        return self._stats
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    @staticmethod
+    def _join(threads: List[threading.Thread]) -> None:
+        for thread in threads:
+            # joining with a timeout, as a plain join() does not let KeyboardInterrupt through
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+
+    def _feed(self, inputs: Iterable[Any]) -> None:
+        try:
+            for item in inputs:
+                if not self._put(0, item):
+                    break
+        except Exception:
+            self._log.exception('Pipeline inputs failed')
+        finally:
+            self._end_stage_input(0)
+
+    def _work(self, stage_index: int) -> None:
+        stage = self._stages[stage_index]
+        stats = self._stats[stage.name]
+        while not self._stopping.is_set():
+            try:
+                item = self._queues[stage_index].get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _END:
+                break
+            with stats.lock:
+                stats.received += 1
+            try:
+                for output in stage.func(item) or ():
+                    with stats.lock:
+                        stats.emitted += 1
+                    self._put(stage_index + 1, output)
+            except Exception:
+                self._log.exception(f'Stage {stage.name} failed on: {item}')
+                with stats.lock:
+                    stats.failed += 1
+            self._progress_bars[stage.name].update()
+
+        with self._lock:
+            self._running_workers[stage_index] -= 1
+            last_worker = self._running_workers[stage_index] == 0
+        if last_worker:
+            self._end_stage_input(stage_index + 1)
+
+    def _put(self, stage_index: int, item: Any) -> bool:
+        if stage_index >= len(self._stages):
+            return True
+        while not self._stopping.is_set():
+            try:
+                self._queues[stage_index].put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _end_stage_input(self, stage_index: int) -> None:
+        # one end marker per worker, each of them stops after taking one
+        for _ in range(self._stages[stage_index].workers if stage_index < len(self._stages) else 0):
+            self._put(stage_index, _END)
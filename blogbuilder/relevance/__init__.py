@@ -0,0 +1,5 @@
+from .bm25 import BM25Scorer, tokenize, document_frequencies as relevance_document_frequencies, \
+    save_document_frequencies as relevance_save_document_frequencies, \
+    load_document_frequencies as relevance_load_document_frequencies
+from .prefilter import create_prefilter_func as relevance_create_prefilter_func, \
+    create_snippet_filter_func as relevance_create_snippet_filter_func
@@ -0,0 +1,87 @@
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import List, Iterable, Optional, Dict
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but
+by can could did do does doing down during each few for from further had has have having he her here hers herself
+him himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or
+other our ours ourselves out over own same she should so some such than that the their theirs them themselves then
+there these they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours yourself yourselves
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r'\w+', text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def document_frequencies(texts: Iterable[str]) -> dict:
+    frequencies = Counter()
+    documents_count = 0
+    for text in texts:
+        frequencies.update(set(tokenize(text)))
+        documents_count += 1
+    return {'documents_count': documents_count, 'document_frequencies': dict(frequencies)}
+
+
+def save_document_frequencies(path: Path, frequencies: dict) -> None:
+    with open(path, 'w') as f:
+        json.dump(frequencies, f)
+
+
+def load_document_frequencies(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+class BM25Scorer:
+    # Scores a page against a query using BM25 over fixed-size passages of the page (the best passage wins). The
+    # document frequencies are fixed background statistics (i.e. collected from past runs' pages), so the score of a
+    # page does not depend on which pages were scored before it; without them every query term weighs the same and
+    # the score is the saturated coverage of the query terms. The score is normalized by the maximum score
+    # achievable for the query, so it is always within [0, 1] and comparable between queries.
+    def __init__(self, k1: float = 1.2, b: float = 0.75, passage_length: int = 200,
+                 background: Optional[dict] = None) -> None:
+        self._k1 = k1
+        self._b = b
+        self._passage_length = passage_length
+        self._document_frequencies: Dict[str, int] = (background or {}).get('document_frequencies', {})
+        self._documents_count: int = (background or {}).get('documents_count', 0)
+
+    def idf(self, token: str) -> float:
+        if not self._documents_count:
+            return 1.0
+        df = self._document_frequencies.get(token, 0)
+        return math.log(1.0 + (self._documents_count - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str, text: str) -> float:
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        text_tokens = tokenize(text)
+        if not query_tokens or not text_tokens:
+            return 0.0
+
+        idfs = {token: self.idf(token) for token in query_tokens}
+        max_score = sum(idf * (self._k1 + 1) for idf in idfs.values())
+        passages = self._split_into_passages(text_tokens)
+        average_length = sum(len(passage) for passage in passages) / len(passages)
+        best_score = max(self._score_passage(idfs, passage, average_length) for passage in passages)
+        return best_score / max_score if max_score > 0 else 0.0
+
+    def _split_into_passages(self, tokens: List[str]) -> List[List[str]]:
+        stride = max(1, self._passage_length // 2)
+        return [tokens[i:i + self._passage_length]
+                for i in range(0, max(1, len(tokens) - stride), stride)]
+
+    def _score_passage(self, idfs: dict, passage: List[str], average_length: float) -> float:
+        frequencies = Counter(passage)
+        norm = self._k1 * (1 - self._b + self._b * len(passage) / average_length)
+        score = 0.0
+        for token, idf in idfs.items():
+            tf = frequencies[token]
+            if tf:
+                score += idf * tf * (self._k1 + 1) / (tf + norm)
+        return score
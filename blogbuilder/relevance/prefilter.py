@@ -0,0 +1,55 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from blogbuilder.relevance.bm25 import BM25Scorer
+from blogbuilder.wse.result import SearchResult
+
+
+def _create_score_recorder(scores_log_path: Optional[Path]) -> Callable[[dict], None]:
+    lock = threading.Lock()
+
+    def _record_score(row: dict) -> None:
+        if not scores_log_path:
+            return
+        with lock, open(scores_log_path, 'a') as f:
+            f.write(json.dumps({'timestamp': datetime.utcnow().isoformat()} | row) + '\n')
+
+    return _record_score
+
+
+def create_prefilter_func(scorer: BM25Scorer, min_score: float,
+                          scores_log_path: Optional[Path] = None) -> Callable[[str, str, str], bool]:
+    log = logging.getLogger(__name__)
+    record_score = _create_score_recorder(scores_log_path)
+
+    def _prefilter(query: str, url: str, content: str) -> bool:
+        score = scorer.score(query, content)
+        passed = score >= min_score
+        log.info(f'Lexical relevance score: {score:.3f} (passed: {passed}) for URL-query: {url}-{query}')
+        record_score({'stage': 'content', 'query': query, 'url': url, 'score': score, 'passed': passed})
+        return passed
+
+    return _prefilter
+
+
+def create_snippet_filter_func(scorer: BM25Scorer, min_score: float,
+                               scores_log_path: Optional[Path] = None) -> Callable[[str, SearchResult], bool]:
+    log = logging.getLogger(__name__)
+    record_score = _create_score_recorder(scores_log_path)
+
+    def _snippet_filter(query: str, search_result: SearchResult) -> bool:
+        if not search_result.title and not search_result.snippet:
+            return True
+        score = scorer.score(query, f'{search_result.title or ""}\n{search_result.snippet or ""}')
+        passed = score >= min_score
+        log.info(f'Snippet relevance score: {score:.3f} (passed: {passed}) for URL-query: '
+                 f'{search_result.url}-{query}')
+        record_score({'stage': 'snippet', 'query': query, 'url': search_result.url, 'score': score,
+                      'passed': passed})
+        return passed
+
+    return _snippet_filter
@@ -0,0 +1,184 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from hashlib import md5
+from pathlib import Path
+from typing import List, Optional, Dict, Callable, Set, Tuple, Iterator
+
+from blogbuilder.wse.result import SearchResult, PartialSearchResults
+
+PLAN_FILENAME = 'plan.json'
+JOURNAL_FILENAME = 'journal.jsonl'
+LOCK_FILENAME = 'plan.lock'
+QUERY_LOCKS_DIRNAME = 'locks'
+
+
+@dataclass
+class RunPlanState:
+    created_at: str
+    queries: Optional[List[str]] = None
+    search_results: Dict[str, List[SearchResult]] = field(default_factory=dict)
+    completed_at: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'RunPlanState':
+        return RunPlanState(
+            created_at=d['created_at'],
+            queries=d.get('queries'),
+            search_results={query: [SearchResult.from_dict(result) for result in results]
+                            for query, results in d.get('search_results', {}).items()},
+            completed_at=d.get('completed_at'))
+
+    def to_dict(self) -> dict:
+        return {
+            'created_at': self.created_at,
+            'queries': self.queries,
+            'search_results': {query: [result.to_dict() for result in results]
+                               for query, results in self.search_results.items()},
+            'completed_at': self.completed_at,
+        }
+
+
+class RunPlan:
+    # The queries of a run and the search results for each of them are written down as soon as they are known, and
+    # every query/URL pair which is done (summarized or rejected) is appended to a journal. Resuming an unfinished
+    # plan replays them instead of generating new topics and searching again; a finished plan is replaced by a new one.
+    # A shared plan is used by several workers at once (see WorkClaims): the plan file is reloaded and merged under a
+    # file lock before every change, and a query is searched by one worker while the others wait for its results.
+    def __init__(self, dir_: Path, resume: bool, shared: bool = False) -> None:
+        self._dir = dir_
+        self._shared = shared
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(self.__class__.__name__)
+        os.makedirs(dir_, exist_ok=True)
+
+        self._state = self._load_state() if resume else None
+        if self._state and not self._state.completed_at:
+            self._done = self._load_journal()
+            self._log.info(f'Resuming the run plan from {self._state.created_at}: '
+                           f'{len(self._state.search_results)} queries searched, {len(self._done)} URLs done')
+        else:
+            self._state = RunPlanState(created_at=datetime.utcnow().isoformat())
+            self._done = set()
+            with open(self._dir / JOURNAL_FILENAME, 'w'):
+                pass
+            self._save_state()
+
+    @property
+    def plan_id(self) -> str:
+        return self._state.created_at
+
+    def create_topic_generator_func(self, topic_generator_func: Callable[[], List[str]]) -> Callable[[], List[str]]:
+        def _generate() -> List[str]:
+            # generated while locked, so that the workers sharing the plan do not each generate their own topics
+            with self._locked_state():
+                if self._state.queries is None:
+                    self._state.queries = list(topic_generator_func())
+                    self._save_state()
+                return list(self._state.queries)
+
+        return _generate
+
+    def create_search_func(self, websearch_func: Callable[[str], List[SearchResult]]
+                           ) -> Callable[[str], List[SearchResult]]:
+        def _search(query: str) -> List[SearchResult]:
+            with self._lock:
+                if query in self._state.search_results:
+                    return list(self._state.search_results[query])
+            with self._query_lock(query):
+                with self._locked_state():
+                    if query in self._state.search_results:
+                        return list(self._state.search_results[query])
+                results = websearch_func(query)
+                if isinstance(results, PartialSearchResults):
+                    # not written down, a resumed run searches again
+                    return results
+                with self._locked_state():
+                    self._state.search_results[query] = list(results)
+                    self._save_state()
+            return results
+
+        return _search
+
+    def is_done(self, query: str, url: str) -> bool:
+        with self._lock:
+            return (query, url) in self._done
+
+    def mark_done(self, query: str, url: str) -> None:
+        with self._lock:
+            self._done.add((query, url))
+            with open(self._dir / JOURNAL_FILENAME, 'a') as f:
+                f.write(json.dumps({'query': query, 'url': url, 'timestamp': datetime.utcnow().isoformat()}) + '\n')
+
+    def complete(self) -> None:
+        with self._locked_state():
+            self._state.completed_at = datetime.utcnow().isoformat()
+            self._save_state()
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[None]:
+        with self._lock:
+            if not self._shared:
+                yield
+                return
+            with open(self._dir / LOCK_FILENAME, 'a') as f:
+                fcntl.lockf(f, fcntl.LOCK_EX)
+                try:
+                    stored = self._load_state()
+                    if stored and stored.created_at == self._state.created_at:
+                        if self._state.queries is None:
+                            self._state.queries = stored.queries
+                        self._state.search_results = stored.search_results | self._state.search_results
+                    yield
+                finally:
+                    fcntl.lockf(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _query_lock(self, query: str) -> Iterator[None]:
+        # only between processes: within one, a query is searched once
+        if not self._shared:
+            yield
+            return
+        os.makedirs(self._dir / QUERY_LOCKS_DIRNAME, exist_ok=True)
+        with open(self._dir / QUERY_LOCKS_DIRNAME / (md5(query.encode('utf-8')).hexdigest() + '.lock'), 'a') as f:
+            fcntl.lockf(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(f, fcntl.LOCK_UN)
+
+    def _load_state(self) -> Optional[RunPlanState]:
+        if not (self._dir / PLAN_FILENAME).exists():
+            return None
+        with open(self._dir / PLAN_FILENAME) as f:
+            return RunPlanState.from_dict(json.load(f))
+
+    def _load_journal(self) -> Set[Tuple[str, str]]:
+        done = set()
+        if (self._dir / JOURNAL_FILENAME).exists():
+            with open(self._dir / JOURNAL_FILENAME) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line may be cut short when the run was killed
+                        continue
+                    done.add((entry['query'], entry['url']))
+        return done
+
+    def _save_state(self) -> None:
+        with tempfile.NamedTemporaryFile(delete=False, mode='w', dir=self._dir) as ntf:
+            try:
+                json.dump(self._state.to_dict(), ntf)
+                ntf.flush()
+                shutil.move(ntf.name, self._dir / PLAN_FILENAME)
+            except:
+                os.remove(ntf.name)
+                raise
@@ -0,0 +1,38 @@
+import pytest
+
+from blogbuilder.dedup import SimHashIndex, simhash, hamming_distance
+
+PRESS_RELEASE = ' '.join(
+    f'The regulator fined bank number {i} for repeated failures in its anti money laundering controls, '
+    f'including gaps in customer due diligence and late suspicious activity reports.' for i in range(20))
+OTHER_PAGE = ' '.join(
+    f'Sanctions screening vendor {i} released a new version of its name matching engine with fuzzy '
+    f'transliteration support and lower false positive rates for payment screening.' for i in range(20))
+
+
+def test_near_duplicates_have_close_fingerprints():
+    mirrored = 'Home | News | Contact\n' + PRESS_RELEASE.replace('bank number 7', 'bank no. 7') + '\nShare this'
+
+    assert hamming_distance(simhash(PRESS_RELEASE), simhash(mirrored)) <= 3
+    assert hamming_distance(simhash(PRESS_RELEASE), simhash(OTHER_PAGE)) > 10
+
+
+def test_short_texts_have_no_fingerprint():
+    assert simhash('Page not found') is None
+
+
+@pytest.mark.parametrize('fingerprint, scope, found', [
+    (0b1011 << 40, 'query', True),
+    ((0b1011 << 40) ^ 0b111, 'query', True),
+    ((0b1011 << 40) ^ 0b1111, 'query', False),
+    (0b1011 << 40, 'other query', False),
+])
+def test_index_finds_fingerprints_within_max_distance(tmp_path, fingerprint, scope, found):
+    SimHashIndex(tmp_path / 'index.jsonl', max_distance=3).add(0b1011 << 40, 'https://example.com/a', 'query')
+
+    # reloaded from the file
+    duplicate = SimHashIndex(tmp_path / 'index.jsonl', max_distance=3).find_near_duplicate(fingerprint, scope)
+
+    assert (duplicate is not None) == found
+    if found:
+        assert duplicate['url'] == 'https://example.com/a'
@@ -0,0 +1,51 @@
+import os
+import time
+from datetime import datetime
+
+from blogbuilder.article import Article
+from blogbuilder.article_storage.filesystem_storage import FilesystemStorage
+from blogbuilder.directory_index import DirectoryIndex
+from blogbuilder.generate_raw_articles_use_case import PersistSummaryToFile
+
+
+def test_index_lists_directory_once_and_tracks_added_names(tmp_path):
+    (tmp_path / 'a.json').write_text('{}')
+    index = DirectoryIndex(tmp_path, suffix='.json')
+
+    assert index.contains('a.json')
+    (tmp_path / 'b.json').write_text('{}')
+    assert not index.contains('b.json')
+    index.add('b.json')
+    assert index.contains('b.json')
+
+
+def test_manifest_is_used_until_directory_changes(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'a').write_text('a')
+    manifest_path = tmp_path / 'manifest.txt'
+
+    DirectoryIndex(data_dir, manifest_path).add('b')
+    assert manifest_path.read_text().splitlines() == ['a', 'b']
+    assert DirectoryIndex(data_dir, manifest_path).contains('b')
+
+    time.sleep(0.01)
+    os.remove(data_dir / 'a')
+    os.utime(data_dir, (time.time() + 1, time.time() + 1))
+    reloaded = DirectoryIndex(data_dir, manifest_path)
+    assert not reloaded.contains('a')
+    assert not reloaded.contains('b')
+
+
+def test_persisters_use_the_index(tmp_path):
+    persist_summary = PersistSummaryToFile(str(tmp_path))
+    assert not persist_summary.exists('query', 'https://example.com/')
+    persist_summary.persist('query', 'https://example.com/', 'summary')
+    assert persist_summary.exists('query', 'https://example.com/')
+    assert PersistSummaryToFile(str(tmp_path)).exists('query', 'https://example.com/')
+
+    storage = FilesystemStorage(tmp_path)
+    assert not storage.contains('article')
+    storage.put(Article(id_='article', title='title', content='content', tags=[], generated_at=datetime.utcnow()))
+    assert storage.contains('article')
+    assert FilesystemStorage(tmp_path).contains('article')
@@ -0,0 +1,131 @@
+import pytest
+
+from s8er.domain_health import DomainHealth, DomainSkippedError
+from s8er.fetch_engine import FetchEngine
+
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.requests = 0
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        self.requests += 1
+        return FakeResponse(self.status_code)
+
+    def close(self):
+        pass
+
+
+def test_stats_are_aggregated_per_host(tmp_path):
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3')
+
+    domain_health.record_fetch('https://www.example.com/a', 1.0, 200)
+    domain_health.record_fetch('https://example.com/b', 3.0, 403)
+    domain_health.record_fetch('https://example.com/c', 2.0, None)
+    domain_health.record_extraction('https://example.com/a', 'text')
+    domain_health.record_extraction('https://example.com/b', '  ')
+    domain_health.record_relatedness('https://example.com/a', True)
+
+    stats = domain_health.stats('example.com')
+    assert (stats.requests, stats.successes, stats.blocked, stats.errors) == pytest.approx((3, 1, 1, 1))
+    assert stats.average_latency == pytest.approx(2.0)
+    assert stats.extraction_yield == pytest.approx(0.5)
+    assert stats.relatedness_rate == pytest.approx(1.0)
+    assert [s.host for s in DomainHealth(tmp_path / 'health.sqlite3').all_stats()] == ['example.com']
+
+
+@pytest.mark.parametrize('status_code, extracted, override, skipped', [
+    (200, 'text', None, False),
+    (403, 'text', None, True),
+    (200, '', None, True),
+    (403, 'text', 'allow', False),
+    (200, 'text', 'skip', True),
+])
+def test_should_skip(tmp_path, status_code, extracted, override, skipped):
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3', min_requests=3)
+    for i in range(3):
+        domain_health.record_fetch(f'https://example.com/{i}', 0.1, status_code)
+        domain_health.record_extraction(f'https://example.com/{i}', extracted)
+    domain_health.set_override('example.com', override)
+
+    assert domain_health.should_skip('https://example.com/page') == skipped
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_retries_of_a_failing_url_count_once(tmp_path):
+    clock = FakeClock()
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3', clock=clock)
+    for _ in range(3):
+        domain_health.record_fetch('https://example.com/1', 0.1, None)
+    domain_health.record_fetch('https://example.com/1', 0.1, 200)
+    clock.now += 3600
+    domain_health.record_fetch('https://example.com/1', 0.1, None)
+
+    stats = domain_health.stats('example.com')
+    assert (stats.requests, stats.errors, stats.successes) == pytest.approx((3, 2, 1), rel=1e-2)
+
+
+def test_skipped_host_is_probed_and_recovers_as_failures_decay(tmp_path):
+    clock = FakeClock()
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3', min_requests=3, half_life_seconds=24 * 3600,
+                                 probe_interval_seconds=3600, clock=clock)
+    for i in range(4):
+        domain_health.record_fetch(f'https://example.com/{i}', 0.1, 403)
+    assert domain_health.should_skip('https://example.com/a')
+
+    clock.now += 3600
+    assert not domain_health.should_skip('https://example.com/a')
+    assert not domain_health.should_skip('https://example.com/a')
+    assert domain_health.should_skip('https://example.com/b')
+    domain_health.record_fetch('https://example.com/a', 0.1, 403)
+    assert domain_health.should_skip('https://example.com/a')
+
+    clock.now += 2 * 24 * 3600
+    assert domain_health.stats('example.com').requests == pytest.approx((4 * 0.5 ** (1 / 24) + 1) / 4)
+    assert not domain_health.should_skip('https://example.com/c')
+    assert not domain_health.should_skip('https://example.com/d')
+
+
+def test_priority_prefers_hosts_yielding_related_pages(tmp_path):
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3')
+    for _ in range(3):
+        domain_health.record_relatedness('https://good.com/', True)
+        domain_health.record_relatedness('https://bad.com/', False)
+
+    urls = ['https://bad.com/1', 'https://unknown.com/1', 'https://good.com/1']
+    assert sorted(urls, key=domain_health.priority, reverse=True) == [
+        'https://good.com/1', 'https://unknown.com/1', 'https://bad.com/1']
+
+
+def test_fetch_engine_records_fetches_and_skips_unhealthy_hosts(tmp_path):
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3', min_requests=2)
+    session = FakeSession(429)
+    engine = FetchEngine(politeness_delay=0.0, session=session, domain_health=domain_health)
+
+    engine.get('https://example.com/1', lambda r: r.status_code)
+    engine.get('https://example.com/2', lambda r: r.status_code)
+    with pytest.raises(DomainSkippedError):
+        engine.get('https://example.com/3', lambda r: r.status_code)
+    engine.close()
+
+    assert session.requests == 2
+    assert domain_health.stats('example.com').blocked == pytest.approx(2)
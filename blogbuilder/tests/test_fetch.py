@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from s8er.fetch import CachingFetcher, HttpCacheStore, UnsuitableContentError
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict, content: bytes):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.consumed = 0
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            self.consumed += chunk_size
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error')
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        self.requests.append((url, headers))
+        return self.responses.pop(0)
+
+
+def test_fresh_response_is_served_from_store(tmp_path):
+    session = FakeSession([FakeResponse(200, {'Content-Type': 'text/html; charset=utf-8'}, b'<p>hello</p>')])
+    fetcher = CachingFetcher(HttpCacheStore(tmp_path), session=session)
+
+    first = fetcher.fetch('https://example.com/a')
+    second = fetcher.fetch('https://example.com/a')
+
+    assert len(session.requests) == 1
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.text == '<p>hello</p>'
+    assert second.content_type == 'text/html'
+    assert second.content_hash == first.content_hash
+
+
+def test_stale_response_is_revalidated(tmp_path):
+    session = FakeSession([
+        FakeResponse(200, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}, b'body'),
+        FakeResponse(304, {}, b''),
+    ])
+    fetcher = CachingFetcher(HttpCacheStore(tmp_path), freshness=timedelta(0), session=session)
+
+    fetcher.fetch('https://example.com/a')
+    revalidated = fetcher.fetch('https://example.com/a')
+
+    assert session.requests[1][1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert revalidated.from_cache
+    assert revalidated.content == b'body'
+
+
+def test_changed_response_replaces_stored_one(tmp_path):
+    session = FakeSession([
+        FakeResponse(200, {'ETag': '"v1"'}, b'old'),
+        FakeResponse(200, {'ETag': '"v2"'}, b'new'),
+    ])
+    store = HttpCacheStore(tmp_path)
+    fetcher = CachingFetcher(store, freshness=timedelta(0), session=session)
+
+    fetcher.fetch('https://example.com/a')
+    fetcher.fetch('https://example.com/a')
+
+    assert store.get('https://example.com/a').content == b'new'
+    assert store.get('https://example.com/a').headers['etag'] == '"v2"'
+
+
+def test_text_over_the_byte_cap_is_truncated():
+    session = FakeSession([FakeResponse(200, {'Content-Type': 'text/html'}, b'x' * 200_000)])
+    fetcher = CachingFetcher(None, session=session, max_bytes=100_000)
+
+    response = fetcher.fetch('https://example.com/a')
+
+    assert response.truncated
+    assert len(response.content) == 100_000
+    assert session.responses == []
+
+
+@pytest.mark.parametrize('headers', [
+    {'Content-Type': 'application/pdf', 'Content-Length': '200000'},
+    {'Content-Type': 'application/pdf'},
+])
+def test_binary_content_over_the_byte_cap_is_rejected(headers):
+    response = FakeResponse(200, headers, b'x' * 200_000)
+    fetcher = CachingFetcher(None, session=FakeSession([response]), max_bytes=100_000)
+
+    with pytest.raises(UnsuitableContentError):
+        fetcher.fetch('https://example.com/a.pdf')
+    assert response.consumed <= 100_000 + 64 * 1024
+
+
+def test_unaccepted_content_type_is_rejected_before_download():
+    response = FakeResponse(200, {'Content-Type': 'video/mp4'}, b'x' * 1000)
+    fetcher = CachingFetcher(None, session=FakeSession([response]), accept_content_type=lambda ct: ct == 'text/html')
+
+    with pytest.raises(UnsuitableContentError):
+        fetcher.fetch('https://example.com/a.mp4')
+    assert response.consumed == 0
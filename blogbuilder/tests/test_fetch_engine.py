@@ -0,0 +1,80 @@
+import threading
+import time
+
+from s8er.fetch_engine import FetchEngine
+
+
+class FakeResponse:
+    def __init__(self, url: str, status_code: int = 200):
+        self.url = url
+        self.status_code = status_code
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.max_total_in_flight = 0
+        self.started_at = []
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        host = url.split('/')[2]
+        with self.lock:
+            self.started_at.append((host, time.monotonic()))
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+            self.max_total_in_flight = max(self.max_total_in_flight, sum(self.in_flight.values()))
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight[host] -= 1
+        if 'fail' in url:
+            raise ValueError(url)
+        return FakeResponse(url)
+
+    def close(self):
+        pass
+
+
+def test_concurrency_is_limited_globally_and_per_host():
+    session = FakeSession()
+    engine = FetchEngine(max_concurrency=4, max_per_host=2, politeness_delay=0.0, session=session)
+    urls = [f'https://host{i % 3}.com/{i}' for i in range(18)]
+
+    results = engine.fetch_all(urls, lambda r: r.url)
+    engine.close()
+
+    assert results == urls
+    assert max(session.max_in_flight.values()) == 2
+    assert session.max_total_in_flight <= 4
+
+
+def test_requests_to_the_same_host_are_spaced_by_the_politeness_delay():
+    session = FakeSession(delay=0.0)
+    engine = FetchEngine(max_concurrency=4, max_per_host=4, politeness_delay=0.1, session=session)
+
+    engine.fetch_all([f'https://example.com/{i}' for i in range(3)] + ['https://other.com/'], lambda r: r.url)
+    engine.close()
+
+    example_starts = [started for host, started in session.started_at if host == 'example.com']
+    assert all(b - a >= 0.09 for a, b in zip(example_starts, example_starts[1:]))
+    other_start = [started for host, started in session.started_at if host == 'other.com'][0]
+    assert other_start - session.started_at[0][1] < 0.09
+
+
+def test_failures_are_returned_per_url_and_get_raises():
+    engine = FetchEngine(max_concurrency=2, max_per_host=1, politeness_delay=0.0, session=FakeSession(delay=0.0))
+
+    results = engine.fetch_all(['https://a.com/ok', 'https://b.com/fail'], lambda r: r.url)
+
+    assert results[0] == 'https://a.com/ok'
+    assert isinstance(results[1], ValueError)
+    assert engine.get('https://c.com/ok', lambda r: r.url) == 'https://c.com/ok'
+    engine.close()
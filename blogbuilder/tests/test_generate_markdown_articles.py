@@ -1,6 +1,38 @@
+import os
+import threading
+import time
+
 import pytest
 
-from blogbuilder.generate_markdown_articles import _remove_first_line, _remove_last_line
+from blogbuilder.article_storage.filesystem_storage import FilesystemStorage
+from blogbuilder.generate_markdown_articles import _remove_first_line, _remove_last_line, PendingRawArticles, \
+    GenerateMarkdownArticle
+from blogbuilder.llm import LLM
+
+
+class FakeLLM(LLM):
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.concurrent_calls = 0
+        self.max_concurrent_calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self.lock:
+            self.calls += 1
+            self.concurrent_calls += 1
+            self.max_concurrent_calls = max(self.max_concurrent_calls, self.concurrent_calls)
+        time.sleep(self.delay)
+        with self.lock:
+            self.concurrent_calls -= 1
+        return '{"title": "A title"}' if 'generate a title' in prompt else '# Article'
+
+
+def _write_raw_articles(raw_dir, *filenames):
+    for filename in filenames:
+        with open(raw_dir / filename, 'w') as f:
+            f.write('raw article')
 
 
 @pytest.mark.parametrize("input_text,expected_text", [
@@ -29,3 +61,54 @@ def test_remove_first_line(input_text, expected_text):
 ])
 def test_remove_last_line(input_text, expected_text):
     assert _remove_last_line(input_text) == expected_text
+
+
+def test_pending_raw_articles_skip_existing_and_pick_up_new_files(tmp_path):
+    raw_dir, output_dir = tmp_path / 'raw', tmp_path / 'output'
+    os.makedirs(raw_dir)
+    os.makedirs(output_dir)
+    _write_raw_articles(raw_dir, 'fraud-1', 'fraud-2')
+    storage = FilesystemStorage(output_dir)
+    GenerateMarkdownArticle(str(raw_dir), storage, FakeLLM(), 1, 1, 1000).process_input_file('fraud-1')
+    pending = PendingRawArticles(str(raw_dir), storage)
+
+    assert pending.take() == 'fraud-2'
+    assert pending.take() is None
+
+    _write_raw_articles(raw_dir, 'fraud-3')
+    # the mtime resolution of some file systems is coarse
+    os.utime(raw_dir, ns=(os.stat(raw_dir).st_atime_ns, os.stat(raw_dir).st_mtime_ns + 1))
+    assert pending.take() == 'fraud-3'
+    assert pending.take() is None
+
+
+@pytest.mark.parametrize('max_number_of_articles, workers, expected_count', [
+    (2, 1, 2),
+    (10, 1, 3),
+    (2, 4, 2),
+    (10, 4, 3),
+])
+def test_invoke_generates_up_to_max_number_of_articles(tmp_path, max_number_of_articles, workers, expected_count):
+    raw_dir, output_dir = tmp_path / 'raw', tmp_path / 'output'
+    os.makedirs(raw_dir)
+    os.makedirs(output_dir)
+    _write_raw_articles(raw_dir, 'fraud-1', 'fraud-2', 'sanctions-1')
+    llm = FakeLLM()
+
+    GenerateMarkdownArticle(str(raw_dir), FilesystemStorage(output_dir), llm, max_number_of_articles, 1,
+                            1000, workers=workers).invoke()
+
+    assert len(os.listdir(output_dir)) == expected_count
+    assert llm.calls == 2 * expected_count
+
+
+def test_workers_process_articles_concurrently(tmp_path):
+    raw_dir, output_dir = tmp_path / 'raw', tmp_path / 'output'
+    os.makedirs(raw_dir)
+    os.makedirs(output_dir)
+    _write_raw_articles(raw_dir, *[f'fraud-{i}' for i in range(12)])
+    llm = FakeLLM(delay=0.02)
+    GenerateMarkdownArticle(str(raw_dir), FilesystemStorage(output_dir), llm, 10, 1, 1000, workers=4).invoke()
+
+    assert len(os.listdir(output_dir)) == 10
+    assert llm.max_concurrent_calls == 4
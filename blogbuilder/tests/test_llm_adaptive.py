@@ -0,0 +1,125 @@
+import pytest
+
+from blogbuilder.generate_raw_articles_use_case import GenerateRawArticles2UseCase
+from blogbuilder.llm import LLM
+from blogbuilder.llm.adaptive import AdaptiveConcurrencyLimit, CircuitBreaker, CircuitOpenError, AdaptiveLLM
+from blogbuilder.tests.test_pipeline import InMemoryPersistSummary
+from blogbuilder.wse.result import SearchResult
+from s8er.cache import NoOpCache
+
+
+class _FailingLLM(LLM):
+    def __call__(self, input_str) -> str:
+        raise ConnectionError('overloaded')
+
+
+def _complete_saturated(limit: AdaptiveConcurrencyLimit, count: int, latency: float = 1.0, failed: bool = False):
+    for _ in range(count):
+        while limit.in_flight < limit.limit:
+            limit.acquire()
+        limit.release(latency=latency, failed=failed)
+
+
+def test_concurrency_limit_increases_additively_and_decreases_multiplicatively():
+    limit = AdaptiveConcurrencyLimit(initial_limit=1, max_limit=8, target_latency=10.0)
+    _complete_saturated(limit, 7)
+    assert limit.limit == 4
+
+    _complete_saturated(limit, 1, latency=20.0)
+    assert limit.limit == 2
+
+    _complete_saturated(limit, 1, failed=True)
+    assert limit.limit == 1
+
+
+def test_concurrency_limit_never_exceeds_max_limit():
+    limit = AdaptiveConcurrencyLimit(initial_limit=1, max_limit=2)
+    _complete_saturated(limit, 100)
+    assert limit.limit == 2
+
+
+def test_concurrency_limit_does_not_grow_on_successes_below_the_limit():
+    limit = AdaptiveConcurrencyLimit(initial_limit=2, max_limit=8)
+    for _ in range(100):
+        limit.acquire()
+        limit.release(latency=1.0, failed=False)
+    assert limit.limit == 2
+    assert limit.in_flight == 0
+
+
+def test_circuit_breaker_opens_after_consecutive_failures_and_recovers_after_timeout():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0, clock=lambda: now[0])
+
+    breaker.before_call()
+    breaker.on_failure()
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] = 10.0
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_call()
+    assert e.value.retry_after == 20.0
+
+    now[0] = 31.0
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.on_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_circuit_breaker_reopens_when_trial_request_fails():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=lambda: now[0])
+    breaker.on_failure()
+
+    now[0] = 31.0
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_adaptive_llm_sheds_load_when_circuit_is_open():
+    llm = AdaptiveLLM(_FailingLLM(),
+                      concurrency_limit=AdaptiveConcurrencyLimit(initial_limit=1, max_limit=4),
+                      circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            llm('prompt')
+    with pytest.raises(CircuitOpenError):
+        llm('prompt')
+
+
+class _CircuitOpenOnceLLM(LLM):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input_str) -> str:
+        self.calls += 1
+        if self.calls == 1:
+            raise CircuitOpenError('open', retry_after=0.01)
+        return 'FULLY_RELATED' if 'evaluate how much it is related' in input_str else 'summary'
+
+
+def test_use_case_waits_for_the_circuit_instead_of_skipping_the_rest_of_the_query():
+    persist_summary = InMemoryPersistSummary()
+    llm = _CircuitOpenOnceLLM()
+
+    GenerateRawArticles2UseCase(
+        obtain_content_func=lambda url: 'page',
+        topic_generator_func=lambda: ['query'],
+        llm=llm,
+        persist_summary=persist_summary,
+        websearch_func=lambda query: [SearchResult(f'https://example.com/{i}') for i in range(2)],
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+    ).invoke()
+
+    assert sorted(persist_summary.summaries) == [('query', 'https://example.com/0'), ('query', 'https://example.com/1')]
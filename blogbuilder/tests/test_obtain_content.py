@@ -0,0 +1,95 @@
+from datetime import timedelta, datetime
+from typing import Optional
+
+import pytest
+
+from blogbuilder.obtaincontent import cached_obtain_content_func, obtain_content_from_url_func, EMPTY_CONTENT_MAX_AGE, \
+    FAILED_EXTRACTION_MAX_AGE
+from blogbuilder.obtaincontent.pdf_pool import PdfExtractionError
+from s8er.cache import Cache, Cacheable
+from s8er.fetch import FetchResponse
+
+
+class InMemoryCache(Cache):
+    def __init__(self):
+        super().__init__()
+        self.cacheables = {}
+
+    def _get_if_exists(self, hash_key: str) -> Optional[Cacheable]:
+        return self.cacheables.get(hash_key)
+
+    def _persist(self, cacheable: Cacheable) -> None:
+        self.cacheables[cacheable.metadata.hash_key] = cacheable
+
+    def age(self, delta: timedelta) -> None:
+        for cacheable in self.cacheables.values():
+            cacheable.metadata.created_at -= delta
+
+
+class Pages:
+    def __init__(self, content: str):
+        self.content = content
+        self.obtained = []
+
+    def __call__(self, url: str) -> str:
+        self.obtained.append(url)
+        return self.content
+
+
+def test_content_is_cached_per_extraction():
+    cache, pages = InMemoryCache(), Pages('text')
+    cached_obtain_content_func(pages, cache, extraction_id='readability-pdf')('https://a.com/')
+    cached_obtain_content_func(pages, cache, extraction_id='readability-pdf')('https://a.com/?utm_source=x')
+    assert len(pages.obtained) == 1
+
+    cached_obtain_content_func(pages, cache, extraction_id='text-density-pdf')('https://a.com/')
+    cached_obtain_content_func(pages, cache, extraction_id='readability-pdf20')('https://a.com/')
+    assert len(pages.obtained) == 3
+
+
+def test_empty_content_is_obtained_again_once_old():
+    cache, pages = InMemoryCache(), Pages('')
+    obtain_content = cached_obtain_content_func(pages, cache, extraction_id='readability-pdf')
+
+    assert obtain_content('https://a.com/') == ''
+    assert obtain_content('https://a.com/') == ''
+    assert len(pages.obtained) == 1
+
+    cache.age(EMPTY_CONTENT_MAX_AGE + timedelta(minutes=1))
+    pages.content = 'text'
+    assert obtain_content('https://a.com/') == 'text'
+    assert len(pages.obtained) == 2
+
+    cache.age(EMPTY_CONTENT_MAX_AGE + timedelta(minutes=1))
+    assert obtain_content('https://a.com/') == 'text'
+    assert len(pages.obtained) == 2
+
+
+class FakeFetcher:
+    def fetch(self, url: str) -> FetchResponse:
+        return FetchResponse(url=url, status_code=200, headers={'content-type': 'application/pdf'},
+                             content=b'%PDF', content_hash='hash', fetched_at=datetime.utcnow())
+
+
+def test_failed_extraction_is_not_attempted_again_for_a_while():
+    extracted = []
+
+    def _extract_pdf(content: bytes, max_pages: Optional[int]) -> str:
+        extracted.append(content)
+        raise PdfExtractionError('PDF worker did not answer within 60s')
+
+    cache = InMemoryCache()
+    obtain_content = obtain_content_from_url_func(1, fetcher=FakeFetcher(), extracted_cache=cache,
+                                                  extract_pdf_func=_extract_pdf)
+    with pytest.raises(PdfExtractionError):
+        obtain_content('https://a.com/1.pdf')
+    with pytest.raises(PdfExtractionError, match='failed before'):
+        obtain_content('https://b.com/1.pdf')
+    assert len(extracted) == 1
+
+    cache.age(FAILED_EXTRACTION_MAX_AGE + timedelta(minutes=1))
+    with pytest.raises(PdfExtractionError, match='did not answer'):
+        obtain_content('https://a.com/1.pdf')
+    with pytest.raises(PdfExtractionError, match='failed before'):
+        obtain_content('https://a.com/1.pdf')
+    assert len(extracted) == 2
@@ -0,0 +1,42 @@
+import io
+import time
+
+import pypdf
+import pytest
+
+from blogbuilder.obtaincontent.pdf_pool import PdfExtractionPool, PdfExtractionError, extract_pdf_text
+
+
+def _slow_on_request_extract(content: bytes, max_pages):
+    if content == b'slow':
+        time.sleep(30)
+    if content == b'broken':
+        raise RuntimeError('broken document')
+    return content.decode('utf-8') + f'-{max_pages}'
+
+
+def _pdf_with_pages(count: int) -> bytes:
+    writer = pypdf.PdfWriter()
+    for _ in range(count):
+        writer.add_blank_page(width=100, height=100)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def test_extract_pdf_text_reads_up_to_max_pages():
+    assert extract_pdf_text(_pdf_with_pages(3), max_pages=2) == '\n'
+    assert extract_pdf_text(_pdf_with_pages(3)) == '\n\n'
+
+
+def test_pool_kills_worker_missing_the_deadline_and_recovers():
+    pool = PdfExtractionPool(1, timeout=2.0, extract_func=_slow_on_request_extract)
+    try:
+        assert pool(b'fast', 5) == 'fast-5'
+        with pytest.raises(PdfExtractionError):
+            pool(b'slow')
+        with pytest.raises(ValueError):
+            pool(b'broken')
+        assert pool(b'again') == 'again-None'
+    finally:
+        pool.close()
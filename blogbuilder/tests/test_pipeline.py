@@ -0,0 +1,127 @@
+import threading
+import time
+
+from blogbuilder.generate_raw_articles_use_case import GenerateRawArticles2UseCase, PersistSummary
+from blogbuilder.llm import LLM
+from blogbuilder.llm.budget import WorkBudget, BudgetedLLM
+from blogbuilder.pipeline import StagedPipeline, PipelineStage
+from blogbuilder.wse.result import SearchResult
+from s8er.cache import NoOpCache
+
+
+def test_items_flow_through_all_stages_and_failures_are_dropped():
+    results = []
+    lock = threading.Lock()
+
+    def _split(n: int):
+        return [n * 10 + i for i in range(3)]
+
+    def _fail_on_odd(n: int):
+        if n % 2:
+            raise ValueError(n)
+        return [n]
+
+    def _collect(n: int):
+        with lock:
+            results.append(n)
+
+    stats = StagedPipeline([
+        PipelineStage('split', _split, workers=2),
+        PipelineStage('filter', _fail_on_odd, workers=3),
+        PipelineStage('collect', _collect),
+    ], queue_size=2, show_progress=False).run(range(4))
+
+    assert sorted(results) == [0, 2, 10, 12, 20, 22, 30, 32]
+    assert (stats['split'].received, stats['split'].emitted) == (4, 12)
+    assert (stats['filter'].received, stats['filter'].failed, stats['filter'].emitted) == (12, 4, 8)
+    assert stats['collect'].received == 8
+
+
+def test_slow_stage_applies_backpressure_upstream():
+    produced = []
+
+    def _produce(n: int):
+        produced.append(n)
+        return [n]
+
+    def _slow(n: int):
+        time.sleep(0.05)
+
+    pipeline = StagedPipeline([PipelineStage('produce', _produce), PipelineStage('slow', _slow)], queue_size=2,
+                              show_progress=False)
+    thread = threading.Thread(target=pipeline.run, args=(range(100),))
+    thread.start()
+    time.sleep(0.3)
+    in_flight = len(produced)
+    pipeline.stop()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    # the slow stage processed ~6 items, only the queues' and workers' worth of items may be ahead of it
+    assert in_flight < 20
+
+
+class FakeLLM(LLM):
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self.lock:
+            self.calls.append(prompt)
+        if 'evaluate how much it is related' in prompt:
+            return 'FULLY_RELATED' if 'related page' in prompt else 'UNRELATED'
+        return 'summary'
+
+
+class InMemoryPersistSummary(PersistSummary):
+    def __init__(self):
+        self.summaries = {}
+
+    def persist(self, query: str, url: str, summary: str) -> None:
+        self.summaries[(query, url)] = summary
+
+    def exists(self, query: str, url: str) -> bool:
+        return (query, url) in self.summaries
+
+
+def test_use_case_pipeline_mode_summarizes_related_pages():
+    persist_summary = InMemoryPersistSummary()
+    persist_summary.persist('query 2', 'https://example.com/related/2', 'already there')
+    pages = {f'https://example.com/{kind}/{i}': f'{kind} page {i}' for kind in ('related', 'other') for i in range(3)}
+
+    GenerateRawArticles2UseCase(
+        obtain_content_func=lambda url: pages[url],
+        topic_generator_func=lambda: ['query 1', 'query 2'],
+        llm=FakeLLM(),
+        persist_summary=persist_summary,
+        websearch_func=lambda query: [SearchResult(url) for url in pages],
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+        pipeline_workers={'fetch': 3, 'classify': 2},
+    ).invoke()
+
+    assert sorted(persist_summary.summaries) == sorted(
+        (query, f'https://example.com/related/{i}') for query in ('query 1', 'query 2') for i in range(3))
+
+
+def test_use_case_pipeline_mode_stops_when_the_budget_is_exhausted():
+    budget = WorkBudget(max_llm_calls=4)
+    pages = {f'https://example.com/related/{i}': f'related page {i}' for i in range(20)}
+
+    GenerateRawArticles2UseCase(
+        obtain_content_func=lambda url: pages[url],
+        topic_generator_func=lambda: ['query 1', 'query 2', 'query 3'],
+        llm=BudgetedLLM(FakeLLM(), budget),
+        persist_summary=InMemoryPersistSummary(),
+        websearch_func=lambda query: [SearchResult(url) for url in pages],
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+        pipeline_workers={'fetch': 2},
+        budget=budget,
+    ).invoke()
+
+    # the classify and the summarize stage may each have started a call as the last one within the budget was made
+    assert 4 <= budget.llm_calls <= 5
@@ -0,0 +1,88 @@
+from blogbuilder.generate_raw_articles_use_case import GenerateRawArticles2UseCase
+from blogbuilder.llm import LLM
+from blogbuilder.tests.test_pipeline import InMemoryPersistSummary
+from blogbuilder.wse.result import SearchResult
+from s8er.cache import FilesystemCache
+
+
+class RatingLLM(LLM):
+    def __init__(self, relatedness: str):
+        self.relatedness = relatedness
+        self.prompts = []
+
+    def __call__(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.relatedness if 'evaluate how much it is related' in prompt else 'summary'
+
+
+def _use_case(tmp_path, llm: LLM, cascade_llm: LLM, pages: dict, persist_summary=None):
+    return GenerateRawArticles2UseCase(
+        obtain_content_func=lambda url: pages[url],
+        topic_generator_func=lambda: ['query'],
+        llm=llm,
+        persist_summary=persist_summary or InMemoryPersistSummary(),
+        websearch_func=lambda query: [SearchResult(url) for url in pages],
+        download_timeout=1,
+        check_cache=FilesystemCache(tmp_path),
+        max_llm_payload=1000,
+        cascade_llm=cascade_llm,
+        cascade_min_relatedness='SOMEWHAT_RELATED',
+    )
+
+
+def test_cascade_check_rejects_below_min_relatedness_and_caches_the_rating(tmp_path):
+    llm, cascade_llm = RatingLLM('FULLY_RELATED'), RatingLLM('UNRELATED')
+    use_case = _use_case(tmp_path, llm, cascade_llm, {})
+
+    assert not use_case._passes_cascade_check('query-https://a.com/', 'page', 'query')
+    assert not use_case._passes_cascade_check('query-https://a.com/', 'page', 'query')
+    assert len(cascade_llm.prompts) == 1
+    assert llm.prompts == []
+
+
+def test_cascade_check_passes_at_min_relatedness(tmp_path):
+    cascade_llm = RatingLLM('SOMEWHAT_RELATED')
+
+    assert _use_case(tmp_path, RatingLLM('FULLY_RELATED'), cascade_llm, {})._passes_cascade_check(
+        'query-https://a.com/', 'page', 'query')
+
+
+def test_cascade_check_is_skipped_once_the_page_was_checked_by_the_main_llm(tmp_path):
+    llm, cascade_llm = RatingLLM('FULLY_RELATED'), RatingLLM('SOMEWHAT_RELATED')
+    pages = {'https://a.com/': 'page'}
+    _use_case(tmp_path, llm, cascade_llm, pages).invoke()
+    cascade_llm.relatedness = 'UNRELATED'
+
+    assert _use_case(tmp_path, llm, cascade_llm, pages)._passes_cascade_check('query-https://a.com/', 'page',
+                                                                               'query')
+    assert len(cascade_llm.prompts) == 1
+
+
+class RecordingPages(dict):
+    def __init__(self, pages: dict):
+        super().__init__(pages)
+        self.obtained = []
+
+    def __getitem__(self, url):
+        self.obtained.append(url)
+        return super().__getitem__(url)
+
+
+def test_pages_rated_unrelated_are_not_obtained_again(tmp_path):
+    pages = RecordingPages({'https://a.com/': 'page', 'https://b.com/': 'page'})
+    _use_case(tmp_path, RatingLLM('UNRELATED'), None, pages).invoke()
+    assert sorted(pages.obtained) == ['https://a.com/', 'https://b.com/']
+
+    pages.obtained.clear()
+    _use_case(tmp_path, RatingLLM('FULLY_RELATED'), None, pages).invoke()
+    assert pages.obtained == []
+
+
+def test_check_and_summarize_prompts_start_with_the_same_page_content(tmp_path):
+    llm = RatingLLM('FULLY_RELATED')
+    use_case = _use_case(tmp_path, llm, None, {'https://a.com/': 'page'})
+    use_case.invoke()
+
+    check_prompt, summarize_prompt = llm.prompts
+    prefix = use_case._page_content_prompt_prefix('page')
+    assert check_prompt.startswith(prefix) and summarize_prompt.startswith(prefix)
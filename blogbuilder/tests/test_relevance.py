@@ -0,0 +1,72 @@
+import pytest
+
+from blogbuilder.relevance import BM25Scorer, tokenize, relevance_create_prefilter_func, \
+    relevance_create_snippet_filter_func, relevance_document_frequencies, relevance_save_document_frequencies, \
+    relevance_load_document_frequencies
+from blogbuilder.wse.result import SearchResult
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize('Anti-Money Laundering regulations in FRANCE') == \
+           ['anti', 'money', 'laundering', 'regulations', 'france']
+    assert tokenize('') == []
+
+
+def test_related_page_scores_higher_than_unrelated_page():
+    scorer = BM25Scorer()
+    query = 'anti money laundering regulations in France'
+    related = 'The French regulator published new anti money laundering regulations. ' \
+              'Banks in France must report suspicious transactions related to money laundering.'
+    unrelated = 'We use cookies to improve your experience. Please accept cookies or log in to continue.'
+
+    assert scorer.score(query, related) > 0.3
+    assert scorer.score(query, unrelated) == 0.0
+
+
+def test_score_is_normalized():
+    scorer = BM25Scorer()
+    query = 'money laundering'
+    assert 0.0 < scorer.score(query, ' '.join(['money laundering'] * 500)) <= 1.0
+    assert scorer.score('', 'money laundering') == 0.0
+
+
+def test_score_does_not_depend_on_previously_scored_pages():
+    scorer = BM25Scorer()
+    query = 'money laundering in France'
+    page = 'Money laundering cases in France are growing, says the regulator.'
+
+    score_before = scorer.score(query, page)
+    for i in range(20):
+        scorer.score(query, f'France page {i} about cooking')
+    assert scorer.score(query, page) == score_before
+
+
+def test_background_document_frequencies_weigh_rare_terms_higher(tmp_path):
+    idf_path = tmp_path / 'idf.json'
+    relevance_save_document_frequencies(idf_path, relevance_document_frequencies(
+        [f'News from France, page {i}' for i in range(10)] + ['Money laundering schemes']))
+    scorer = BM25Scorer(background=relevance_load_document_frequencies(idf_path))
+    query = 'money laundering in France'
+
+    assert scorer.score(query, 'Money laundering schemes uncovered') > scorer.score(query, 'France is a country')
+    assert BM25Scorer().score(query, 'Money laundering schemes uncovered') == pytest.approx(
+        2 * BM25Scorer().score(query, 'France is a country'), rel=0.01)
+
+
+def test_prefilter_records_scores(tmp_path):
+    scores_log_path = tmp_path / 'scores.jsonl'
+    prefilter = relevance_create_prefilter_func(BM25Scorer(), min_score=0.1, scores_log_path=scores_log_path)
+
+    assert prefilter('money laundering', 'https://a', 'Money laundering cases are growing.')
+    assert not prefilter('money laundering', 'https://b', 'Please log in.')
+    assert len(scores_log_path.read_text().splitlines()) == 2
+
+
+def test_snippet_filter_passes_results_without_snippets():
+    snippet_filter = relevance_create_snippet_filter_func(BM25Scorer(), min_score=0.2)
+
+    assert snippet_filter('money laundering in France', SearchResult(
+        url='https://a', title='Money laundering in France', snippet='New AML rules for French banks'))
+    assert not snippet_filter('money laundering in France', SearchResult(
+        url='https://b', title='Best pizza recipes', snippet='Cook the perfect pizza at home'))
+    assert snippet_filter('money laundering in France', SearchResult(url='https://c'))
@@ -0,0 +1,105 @@
+import pytest
+
+from blogbuilder.generate_raw_articles_use_case import GenerateRawArticles2UseCase
+from blogbuilder.run_plan import RunPlan
+from blogbuilder.tests.test_pipeline import FakeLLM, InMemoryPersistSummary
+from blogbuilder.wse.result import SearchResult
+from blogbuilder.yield_scheduler import YieldScheduler, TopicYieldStats
+from s8er.cache import NoOpCache
+
+
+class CountingFunc:
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.func(*args)
+
+
+def _plan_funcs(run_plan: RunPlan, topics: CountingFunc, search: CountingFunc):
+    return run_plan.create_topic_generator_func(topics), run_plan.create_search_func(search)
+
+
+def test_resumed_plan_replays_queries_search_results_and_journal(tmp_path):
+    topics = CountingFunc(lambda: ['query 1', 'query 2'])
+    search = CountingFunc(lambda query: [SearchResult(f'https://example.com/{query}', 'title')])
+
+    run_plan = RunPlan(tmp_path, resume=True)
+    generate, search_func = _plan_funcs(run_plan, topics, search)
+    assert generate() == ['query 1', 'query 2']
+    assert search_func('query 1') == [SearchResult('https://example.com/query 1', 'title')]
+    run_plan.mark_done('query 1', 'https://example.com/query 1')
+
+    resumed = RunPlan(tmp_path, resume=True)
+    generate, search_func = _plan_funcs(resumed, topics, search)
+    assert generate() == ['query 1', 'query 2']
+    assert search_func('query 1') == [SearchResult('https://example.com/query 1', 'title')]
+    assert (topics.calls, search.calls) == (1, 1)
+    assert resumed.is_done('query 1', 'https://example.com/query 1')
+    assert not resumed.is_done('query 2', 'https://example.com/query 2')
+
+
+def test_completed_or_not_resumed_plan_is_replaced(tmp_path):
+    topics = CountingFunc(lambda: ['query'])
+    run_plan = RunPlan(tmp_path, resume=False)
+    run_plan.create_topic_generator_func(topics)()
+    run_plan.mark_done('query', 'https://example.com/')
+
+    fresh = RunPlan(tmp_path, resume=False)
+    fresh.create_topic_generator_func(topics)()
+    assert topics.calls == 2
+    assert not fresh.is_done('query', 'https://example.com/')
+
+    fresh.complete()
+    RunPlan(tmp_path, resume=True).create_topic_generator_func(topics)()
+    assert topics.calls == 3
+
+
+def test_workers_sharing_a_plan_search_each_query_once_and_keep_all_results(tmp_path):
+    topics = CountingFunc(lambda: ['query 1', 'query 2'])
+    search = CountingFunc(lambda query: [SearchResult(f'https://example.com/{query}', 'title')])
+    first = RunPlan(tmp_path, resume=False, shared=True)
+    second = RunPlan(tmp_path, resume=True, shared=True)
+    first_generate, first_search = _plan_funcs(first, topics, search)
+    second_generate, second_search = _plan_funcs(second, topics, search)
+
+    assert first_generate() == second_generate() == ['query 1', 'query 2']
+    first_search('query 1')
+    second_search('query 2')
+    assert second_search('query 1') == [SearchResult('https://example.com/query 1', 'title')]
+    assert first_search('query 2') == [SearchResult('https://example.com/query 2', 'title')]
+    assert (topics.calls, search.calls) == (1, 2)
+
+    generate, search_func = _plan_funcs(RunPlan(tmp_path, resume=True), topics, search)
+    assert [search_func(query) for query in generate()] == [
+        [SearchResult(f'https://example.com/{query}', 'title')] for query in ('query 1', 'query 2')]
+    assert (topics.calls, search.calls) == (1, 2)
+
+
+@pytest.mark.parametrize('by_yield', [False, True])
+def test_interrupted_run_stops_and_leaves_the_plan_to_resume(tmp_path, by_yield):
+    def _obtain_content(url: str) -> str:
+        raise KeyboardInterrupt()
+
+    run_plan = RunPlan(tmp_path, resume=True)
+    use_case = GenerateRawArticles2UseCase(
+        obtain_content_func=_obtain_content,
+        topic_generator_func=run_plan.create_topic_generator_func(lambda: ['query']),
+        llm=FakeLLM(),
+        persist_summary=InMemoryPersistSummary(),
+        websearch_func=run_plan.create_search_func(lambda query: [SearchResult('https://example.com/')]),
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+        run_plan=run_plan,
+        yield_scheduler=YieldScheduler(TopicYieldStats(tmp_path / 'yield.sqlite3', lambda query: query))
+        if by_yield else None,
+    )
+    with pytest.raises(KeyboardInterrupt):
+        use_case.invoke()
+
+    search = CountingFunc(lambda query: [])
+    RunPlan(tmp_path, resume=True).create_search_func(search)('query')
+    assert search.calls == 0
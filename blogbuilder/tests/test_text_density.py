@@ -0,0 +1,30 @@
+from blogbuilder.obtaincontent.text_density import extract_article_text
+
+HTML = """<html><head><title>AML</title><style>p { color: red; }</style></head><body>
+<nav><a href="/">Home</a> <a href="/news">News</a></nav>
+<div class="sidebar"><p>Subscribe to our newsletter, get the best news, every day, for free.</p></div>
+<div id="main-content">
+<h1>AML rules in France</h1>
+<p>The French regulator published new anti-money laundering rules, which apply to banks, insurers and payment firms.</p>
+<p>Firms must report suspicious transactions within 24 hours, according to the new guidance published on Monday.</p>
+<script>var tracking = 1;</script>
+</div>
+<footer><p>Copyright 2024, all rights reserved, some company, some street, some city.</p></footer>
+</body></html>"""
+
+
+def test_extract_article_text_keeps_main_content_only():
+    text = extract_article_text(HTML)
+
+    assert text.startswith('AML rules in France\n\nThe French regulator published')
+    assert 'suspicious transactions' in text
+    assert 'newsletter' not in text
+    assert 'Copyright' not in text
+    assert 'tracking' not in text
+    assert 'Home' not in text
+
+
+def test_extract_article_text_handles_empty_and_plain_documents():
+    assert extract_article_text('') == ''
+    assert extract_article_text('just text') == 'just text'
+    assert extract_article_text('<?xml version="1.0" encoding="utf-8"?><html><body>x</body></html>') == 'x'
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from blogbuilder.generate_raw_articles_use_case import GenerateRawArticles2UseCase
+from blogbuilder.tests.test_pipeline import FakeLLM, InMemoryPersistSummary
+from blogbuilder.tracing import Tracer, span, set_outcome, read_traces, profile_report, format_profile_report
+from blogbuilder.wse.result import SearchResult
+from s8er.cache import NoOpCache
+
+
+def test_spans_are_recorded_into_the_current_trace_only(tmp_path):
+    tracer = Tracer(tmp_path / 'trace.jsonl')
+
+    with span('outside'):
+        pass
+    with tracer.trace('fraud', 'https://a.com/'):
+        with span('obtain_content'):
+            with span('download'):
+                pass
+        with pytest.raises(ValueError):
+            with span('summarize'):
+                raise ValueError()
+        set_outcome('summarized')
+
+    rows = list(read_traces(tmp_path / 'trace.jsonl'))
+    assert len(rows) == 1
+    assert (rows[0]['query'], rows[0]['url'], rows[0]['outcome']) == ('fraud', 'https://a.com/', 'summarized')
+    assert [(s['name'], s['depth'], s['outcome']) for s in rows[0]['spans']] == [
+        ('obtain_content', 0, 'ok'), ('download', 1, 'ok'), ('summarize', 0, 'error:ValueError')]
+
+
+def test_profile_report():
+    def _trace(url, spans, end):
+        return {'query': 'fraud', 'url': url, 'start': 0.0, 'end': end, 'outcome': 'summarized',
+                'spans': [{'name': name, 'start': start, 'end': end, 'depth': depth, 'outcome': 'ok'}
+                          for name, start, end, depth in spans]}
+
+    report = profile_report([
+        _trace('https://a.com/1', [('obtain_content', 0, 1, 0), ('download', 0, 1, 1), ('summarize', 1, 9, 0)], 10),
+        _trace('https://a.com/2', [('obtain_content', 0, 6, 0), ('download', 0, 5, 1), ('summarize', 6, 8, 0)], 10),
+        {'query': 'fraud', 'url': None, 'start': 0.0, 'end': 2.0, 'outcome': 'results:2',
+         'spans': [{'name': 'search', 'start': 0.0, 'end': 2.0, 'depth': 0, 'outcome': 'ok'}]},
+    ])
+
+    assert report['urls'] == 2
+    assert report['outcomes'] == {'summarized': 2}
+    assert report['stages']['download'] == {'count': 2, 'total': 6, 'max': 5, 'p50': 1, 'p90': 5, 'p99': 5}
+    assert report['stages']['search']['count'] == 1
+    assert report['critical_path']['summarize'] == {'seconds': 10, 'share': 0.5, 'slowest_in': 1}
+    assert report['critical_path']['obtain_content'] == {'seconds': 7, 'share': 0.35, 'slowest_in': 1}
+    assert report['critical_path']['other']['seconds'] == 3
+    assert 'summarize' in format_profile_report(report)
+
+
+@pytest.mark.parametrize('pipeline_workers', [None, {'fetch': 2}])
+def test_use_case_writes_one_row_per_query_and_url(tmp_path, pipeline_workers):
+    pages = {'https://example.com/related/1': 'related page', 'https://example.com/other/1': 'other page',
+             'https://example.com/empty/1': ''}
+    tracer = Tracer(tmp_path / 'trace.jsonl')
+
+    GenerateRawArticles2UseCase(
+        obtain_content_func=lambda url: pages[url],
+        topic_generator_func=lambda: ['fraud'],
+        llm=FakeLLM(),
+        persist_summary=InMemoryPersistSummary(),
+        websearch_func=tracer.create_search_func(lambda query: [SearchResult(url) for url in pages]),
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+        pipeline_workers=pipeline_workers,
+        tracer=tracer,
+    ).invoke()
+
+    with open(tmp_path / 'trace.jsonl') as f:
+        rows = {row['url']: row for row in map(json.loads, f)}
+    assert {url: row['outcome'] for url, row in rows.items()} == {
+        None: 'results:3',
+        'https://example.com/related/1': 'summarized',
+        'https://example.com/other/1': 'unrelated',
+        'https://example.com/empty/1': 'empty',
+    }
+    assert [s['name'] for s in rows['https://example.com/related/1']['spans']] == [
+        'obtain_content', 'prefilter', 'cascade', 'relatedness', 'summarize']
@@ -1,6 +1,6 @@
 import pytest as pytest
 
-from blogbuilder.generate_raw_articles_use_case import _extract_int_from_llm_output
+from blogbuilder.generate_raw_articles_use_case import _extract_int_from_llm_output, _extract_relatedness_from_llm_output
 
 
 def test_extract_int_from_llm_output_exception_if_empty():
@@ -21,3 +21,13 @@ def test_extract_int_from_llm_output_extract_number_from_the_first_line():
     assert _extract_int_from_llm_output('35\r\n\r\nhello world') == 35
     assert _extract_int_from_llm_output('\n33\n\nhello world') == 33
     assert _extract_int_from_llm_output('\n100. The page is about this\nand about something else') == 100
+
+
+def test_extract_relatedness_from_llm_output():
+    assert _extract_relatedness_from_llm_output('UNRELATED') == 'UNRELATED'
+    assert _extract_relatedness_from_llm_output(' strongly_related\nThe page is about...') == 'STRONGLY_RELATED'
+    assert _extract_relatedness_from_llm_output('Fully Related') == 'FULLY_RELATED'
+    assert _extract_relatedness_from_llm_output('\\_CANNOT\\_PROCESS') == 'CANNOT_PROCESS'
+
+    with pytest.raises(ValueError):
+        _extract_relatedness_from_llm_output('I think it is related')
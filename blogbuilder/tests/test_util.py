@@ -0,0 +1,14 @@
+import pytest
+
+from blogbuilder.util import canonicalize_url
+
+
+@pytest.mark.parametrize("url,expected_url", [
+    ("https://www.Example.com/path/?utm_source=x&b=2&a=1#section", "https://example.com/path?a=1&b=2"),
+    ("https://example.com", "https://example.com/"),
+    ("http://example.com:80//a//b/", "http://example.com/a/b"),
+    ("https://example.com:8443/a?fbclid=abc&gclid=def", "https://example.com:8443/a"),
+    ("https://example.com/a?q=", "https://example.com/a?q="),
+])
+def test_canonicalize_url(url, expected_url):
+    assert canonicalize_url(url) == expected_url
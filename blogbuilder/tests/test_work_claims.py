@@ -0,0 +1,170 @@
+import threading
+
+import pytest
+
+from blogbuilder.generate_raw_articles_use_case import GenerateRawArticles2UseCase
+from blogbuilder.run_plan import RunPlan
+from blogbuilder.tests.test_pipeline import FakeLLM, InMemoryPersistSummary
+from blogbuilder.work_claims import WorkClaims
+from blogbuilder.wse.result import SearchResult
+from s8er.cache import NoOpCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_pair_is_claimed_by_one_worker_only(tmp_path):
+    first = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='first')
+    second = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='second')
+
+    assert first.claim('fraud', 'https://a.com/')
+    assert not second.claim('fraud', 'https://a.com/')
+    assert second.claim('fraud', 'https://b.com/')
+    # claiming again extends the worker's own lease
+    assert first.claim('fraud', 'https://a.com/')
+
+
+def test_done_pairs_are_not_claimed_again(tmp_path):
+    clock = FakeClock()
+    first = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='first', lease_seconds=60, clock=clock)
+    second = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='second', lease_seconds=60, clock=clock)
+
+    first.claim('fraud', 'https://a.com/')
+    first.mark_done('fraud', 'https://a.com/')
+    clock.now += 3600
+
+    assert second.is_done('fraud', 'https://a.com/')
+    assert not second.claim('fraud', 'https://a.com/')
+    assert not first.claim('fraud', 'https://a.com/')
+
+
+def test_expired_and_released_leases_are_claimed_by_others(tmp_path):
+    clock = FakeClock()
+    crashed = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='crashed', lease_seconds=60, clock=clock)
+    failed = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='failed', lease_seconds=60, clock=clock)
+    other = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='other', lease_seconds=60, clock=clock)
+
+    crashed.claim('fraud', 'https://a.com/')
+    failed.claim('fraud', 'https://b.com/')
+    failed.release('fraud', 'https://b.com/')
+    assert not other.claim('fraud', 'https://a.com/')
+    assert other.claim('fraud', 'https://b.com/')
+
+    clock.now += 61
+    assert other.claim('fraud', 'https://a.com/')
+    assert not crashed.claim('fraud', 'https://a.com/')
+
+
+def test_concurrent_workers_split_the_work(tmp_path):
+    urls = [f'https://a.com/{i}' for i in range(50)]
+    claimed = {}
+
+    def _work(worker_id: str) -> None:
+        claims = WorkClaims(tmp_path / 'claims.sqlite3', worker_id=worker_id)
+        claimed[worker_id] = [url for url in urls if claims.claim('fraud', url)]
+
+    WorkClaims(tmp_path / 'claims.sqlite3')
+    threads = [threading.Thread(target=_work, args=(f'worker-{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(url for worker_urls in claimed.values() for url in worker_urls) == sorted(urls)
+
+
+@pytest.mark.parametrize('pipeline_workers', [None, {'fetch': 2}])
+def test_use_case_releases_the_claims_of_failed_pages(tmp_path, pipeline_workers):
+    def _obtain_content(url: str) -> str:
+        if 'broken' in url:
+            raise ValueError('broken page')
+        return 'related page'
+
+    urls = ['https://a.com/ok', 'https://a.com/broken']
+    GenerateRawArticles2UseCase(
+        obtain_content_func=_obtain_content,
+        topic_generator_func=lambda: ['fraud'],
+        llm=FakeLLM(),
+        persist_summary=InMemoryPersistSummary(),
+        websearch_func=lambda query: [SearchResult(url) for url in urls],
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+        pipeline_workers=pipeline_workers,
+        work_claims=WorkClaims(tmp_path / 'claims.sqlite3', worker_id='first'),
+    ).invoke()
+
+    other = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='other')
+    assert other.claim('fraud', 'https://a.com/broken')
+    assert other.is_done('fraud', 'https://a.com/ok')
+
+
+class AdvancingClock(FakeClock):
+    def __call__(self) -> float:
+        self.now += 100
+        return self.now
+
+
+class CompletionRecordingRunPlan(RunPlan):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.done_when_completed = None
+
+    def complete(self) -> None:
+        self.done_when_completed = self._done.copy()
+        super().complete()
+
+
+@pytest.mark.parametrize('pipeline_workers', [None, {'fetch': 2}])
+def test_pairs_of_a_crashed_worker_are_processed_before_the_plan_is_completed(tmp_path, pipeline_workers):
+    clock = AdvancingClock()
+    crashed = WorkClaims(tmp_path / 'claims.sqlite3', worker_id='crashed', lease_seconds=150, clock=clock)
+    crashed.claim('fraud', 'https://a.com/0')
+    run_plan = CompletionRecordingRunPlan(tmp_path, resume=False, shared=True)
+    persist_summary = InMemoryPersistSummary()
+
+    GenerateRawArticles2UseCase(
+        obtain_content_func=lambda url: 'related page',
+        topic_generator_func=lambda: ['fraud'],
+        llm=FakeLLM(),
+        persist_summary=persist_summary,
+        websearch_func=lambda query: [SearchResult(f'https://a.com/{i}') for i in range(3)],
+        download_timeout=1,
+        check_cache=NoOpCache(),
+        max_llm_payload=1000,
+        pipeline_workers=pipeline_workers,
+        run_plan=run_plan,
+        work_claims=WorkClaims(tmp_path / 'claims.sqlite3', worker_id='other', lease_seconds=150, clock=clock),
+    ).invoke()
+
+    assert sorted(persist_summary.summaries) == [('fraud', f'https://a.com/{i}') for i in range(3)]
+    assert run_plan.done_when_completed == {('fraud', f'https://a.com/{i}') for i in range(3)}
+
+
+def test_fresh_plan_processes_again_the_pairs_an_older_plan_completed(tmp_path):
+    def _invoke(run_plan: RunPlan, persist_summary: InMemoryPersistSummary) -> None:
+        GenerateRawArticles2UseCase(
+            obtain_content_func=lambda url: 'related page',
+            topic_generator_func=run_plan.create_topic_generator_func(lambda: ['fraud']),
+            llm=FakeLLM(),
+            persist_summary=persist_summary,
+            websearch_func=run_plan.create_search_func(lambda query: [SearchResult('https://a.com/')]),
+            download_timeout=1,
+            check_cache=NoOpCache(),
+            max_llm_payload=1000,
+            run_plan=run_plan,
+            work_claims=WorkClaims(tmp_path / 'claims.sqlite3', plan_id=run_plan.plan_id, worker_id='worker'),
+        ).invoke()
+
+    _invoke(RunPlan(tmp_path, resume=False, shared=True), InMemoryPersistSummary())
+    persist_summary = InMemoryPersistSummary()
+    fresh = RunPlan(tmp_path, resume=True, shared=True)
+    _invoke(fresh, persist_summary)
+
+    assert list(persist_summary.summaries) == [('fraud', 'https://a.com/')]
+    assert WorkClaims(tmp_path / 'claims.sqlite3', plan_id=fresh.plan_id).is_done('fraud', 'https://a.com/')
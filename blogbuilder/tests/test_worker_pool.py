@@ -0,0 +1,64 @@
+import pytest
+
+from blogbuilder.obtaincontent.worker_pool import WorkerPool
+
+
+class FakeWorkerError(Exception):
+    pass
+
+
+class FakeWorker:
+    def __init__(self):
+        self.alive = True
+        self.uses = 0
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def kill(self) -> None:
+        self.alive = False
+
+    def close(self) -> None:
+        self.alive = False
+
+
+class FakePool(WorkerPool[FakeWorker]):
+    def __init__(self, size: int, max_uses: int):
+        super().__init__(size, 'fake worker', FakeWorkerError)
+        self.max_uses = max_uses
+        self.started = []
+
+    def __call__(self, fail_with=None) -> FakeWorker:
+        def _use(worker: FakeWorker) -> FakeWorker:
+            worker.uses += 1
+            if fail_with:
+                raise fail_with
+            return worker
+
+        return self._run(_use)
+
+    def _create_worker(self) -> FakeWorker:
+        self.started.append(FakeWorker())
+        return self.started[-1]
+
+    def _is_worn_out(self, worker: FakeWorker) -> bool:
+        return worker.uses >= self.max_uses
+
+
+def test_workers_are_reused_until_worn_out_or_failed():
+    pool = FakePool(1, max_uses=3)
+
+    assert pool() is pool()
+    with pytest.raises(ValueError):
+        pool(ValueError())
+    assert len(pool.started) == 1 and not pool.started[0].alive
+
+    with pytest.raises(FakeWorkerError):
+        pool(FakeWorkerError())
+    assert len(pool.started) == 2 and not pool.started[1].alive
+
+    pool()
+    pool.close()
+    assert not pool.started[2].alive
+    with pytest.raises(FakeWorkerError):
+        pool()
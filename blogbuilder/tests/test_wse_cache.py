@@ -0,0 +1,50 @@
+from s8er.cache import FilesystemCache
+
+from blogbuilder.wse.cache import create_cache, migrate_legacy_entries, LEGACY_WEBSEARCH_CACHE_PREFIX
+from blogbuilder.wse.result import SearchResult, PartialSearchResults
+
+
+def test_cache_key_is_normalized_and_engine_aware(tmp_path):
+    cache = FilesystemCache(tmp_path)
+    calls = []
+
+    def _search(query: str):
+        calls.append(query)
+        return [SearchResult(url=f'https://{len(calls)}', title='Title', snippet='Snippet')]
+
+    google = create_cache(_search, cache, engine='google', max_results=10)
+    ddg = create_cache(_search, cache, engine='ddg', max_results=20)
+
+    assert google('AML  in FRANCE') == [SearchResult(url='https://1', title='Title', snippet='Snippet')]
+    assert google(' aml in France ') == [SearchResult(url='https://1', title='Title', snippet='Snippet')]
+    assert ddg('aml in France') == [SearchResult(url='https://2', title='Title', snippet='Snippet')]
+    assert calls == ['AML  in FRANCE', 'aml in France']
+
+
+def test_partial_results_are_not_cached(tmp_path):
+    calls = []
+
+    def _search(query: str):
+        calls.append(query)
+        return PartialSearchResults([SearchResult(url='https://a')]) if len(calls) == 1 else [SearchResult('https://b')]
+
+    search = create_cache(_search, FilesystemCache(tmp_path), engine='merged', max_results=None)
+
+    assert search('aml') == [SearchResult(url='https://a')]
+    assert search('aml') == [SearchResult(url='https://b')]
+    assert search('aml') == [SearchResult(url='https://b')]
+    assert len(calls) == 2
+
+
+def test_migrate_legacy_entries(tmp_path):
+    cache = FilesystemCache(tmp_path)
+    cache.get_raw('AML in FRANCE', lambda: ['https://legacy'], prefix_key=LEGACY_WEBSEARCH_CACHE_PREFIX)
+
+    assert migrate_legacy_entries(cache, engine='google', max_results=10) == 1
+    assert migrate_legacy_entries(cache, engine='google', max_results=10) == 0
+
+    def _search(query: str):
+        raise AssertionError('Migrated entry should be used')
+
+    assert create_cache(_search, cache, engine='google', max_results=10)('aml in france') == \
+           [SearchResult(url='https://legacy')]
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from blogbuilder.wse.merged import merge_results, create_merged_search_func
+from blogbuilder.wse.result import SearchResult, PartialSearchResults
+from blogbuilder.wse.scheduler import TokenBucket, create_rate_limited_func
+
+
+def _results(*urls: str):
+    return [SearchResult(url=url) for url in urls]
+
+
+def test_merge_results_deduplicates_and_ranks_urls_found_by_many_engines_first():
+    merged = merge_results({
+        'google': _results('https://a.com/1', 'https://www.b.com/2/', 'https://c.com/3'),
+        'ddg': [SearchResult(url='https://b.com/2', title='B', snippet='About b'), SearchResult(url='https://d.com/4')],
+    })
+    assert [result.url for result in merged] == \
+           ['https://www.b.com/2/', 'https://a.com/1', 'https://d.com/4', 'https://c.com/3']
+    assert merged[0].snippet == 'About b'
+
+
+def test_merged_search_returns_when_quorum_is_reached():
+    def _slow(query: str):
+        time.sleep(2)
+        return _results('https://slow.com')
+
+    search = create_merged_search_func(
+        {'fast': lambda query: _results('https://fast.com'), 'slow': _slow}, quorum=1, deadline=10.0)
+    start = time.monotonic()
+    assert search('query') == _results('https://fast.com')
+    assert time.monotonic() - start < 1.0
+    assert not isinstance(search('query'), PartialSearchResults)
+
+
+def test_merged_search_ignores_failing_engines_and_fails_if_none_answered():
+    def _failing(query: str):
+        raise ValueError('broken')
+
+    results = create_merged_search_func(
+        {'ok': lambda query: _results('https://ok.com'), 'failing': _failing}, quorum=2, deadline=5.0)('query')
+    assert results == _results('https://ok.com')
+    assert isinstance(results, PartialSearchResults)
+
+    with pytest.raises(RuntimeError):
+        create_merged_search_func({'failing': _failing}, quorum=2, deadline=5.0)('query')
+
+
+def test_searches_left_behind_give_up_waiting_for_the_rate_limiter():
+    bucket = TokenBucket(rate_per_second=1.0, capacity=1)
+    bucket.acquire()
+    searched = []
+
+    def _rate_limited_search(query: str):
+        searched.append(query)
+        return _results('https://limited.com')
+
+    search = create_merged_search_func({
+        'fast': lambda query: _results('https://fast.com'),
+        'limited': create_rate_limited_func(_rate_limited_search, bucket),
+    }, quorum=2, deadline=0.2)
+
+    results = search('query')
+    assert isinstance(results, PartialSearchResults)
+    time.sleep(2.0)
+    # the token refilled in the meantime is still there for the next search
+    assert searched == []
+    assert bucket.acquire(give_up=lambda: False)
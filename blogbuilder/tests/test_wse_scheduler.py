@@ -0,0 +1,70 @@
+import pytest
+import requests
+
+from blogbuilder.wse.scheduler import TokenBucket, create_rate_limited_func, create_fan_out_func
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def _rate_limit_error() -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = 429
+    return requests.HTTPError('429 Client Error: Too Many Requests', response=response)
+
+
+def test_token_bucket_allows_burst_then_waits_for_refill():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate_per_second=0.5, capacity=2, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.now == 0.0
+
+    bucket.acquire()
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_rate_limited_func_backs_off_on_429():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate_per_second=1.0, capacity=1, clock=clock, sleep=clock.sleep)
+    responses = [_rate_limit_error(), ['https://a']]
+
+    def _search(query: str):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    search = create_rate_limited_func(_search, bucket, initial_backoff=10.0)
+    assert search('query') == ['https://a']
+    assert clock.now >= 10.0
+
+
+def test_rate_limited_func_does_not_retry_other_errors():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate_per_second=1.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    def _search(query: str):
+        raise ValueError('broken')
+
+    with pytest.raises(ValueError):
+        create_rate_limited_func(_search, bucket)('query')
+
+
+def test_fan_out_func_yields_all_successful_searches():
+    def _search(query: str):
+        if query == 'bad':
+            raise ValueError('broken')
+        return [f'https://{query}']
+
+    results = dict(create_fan_out_func(_search, max_workers=3)(['a', 'bad', 'b']))
+    assert results == {'a': ['https://a'], 'b': ['https://b']}
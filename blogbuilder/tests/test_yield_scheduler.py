@@ -0,0 +1,98 @@
+import pytest
+
+from blogbuilder.llm import LLM
+from blogbuilder.llm.budget import WorkBudget, BudgetedLLM
+from blogbuilder.topicgenerator import per_region_topic_template
+from blogbuilder.yield_scheduler import TopicYieldStats, YieldScheduler
+from s8er.domain_health import DomainHealth
+
+
+class EchoLLM(LLM):
+    def __call__(self, input_str) -> str:
+        return input_str
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('money laundering in POLAND', 'money laundering'),
+    ('money laundering in Bosnia and Herzegovina', 'money laundering'),
+    ('money laundering', 'money laundering'),
+])
+def test_per_region_topic_template(query, expected):
+    assert per_region_topic_template(query) == expected
+
+
+def test_topic_yield_is_shared_by_the_queries_of_a_template(tmp_path):
+    stats = TopicYieldStats(tmp_path / 'topic-yield.sqlite3', per_region_topic_template)
+    stats.record_relatedness('fraud in POLAND', True)
+    stats.record_relatedness('fraud in FRANCE', True)
+    stats.record_relatedness('sanctions in POLAND', False)
+
+    assert stats.expected_yield('fraud in GERMANY') == pytest.approx(3 / 4)
+    assert stats.expected_yield('sanctions in GERMANY') == pytest.approx(1 / 3)
+    assert stats.expected_yield('unknown topic in GERMANY') == pytest.approx(1 / 2)
+
+
+def test_scheduler_orders_by_topic_and_domain_yield(tmp_path):
+    stats = TopicYieldStats(tmp_path / 'topic-yield.sqlite3', per_region_topic_template)
+    domain_health = DomainHealth(tmp_path / 'health.sqlite3')
+    for _ in range(3):
+        stats.record_relatedness('fraud in POLAND', True)
+        stats.record_relatedness('sanctions in POLAND', False)
+        domain_health.record_relatedness('https://good.com/', True)
+        domain_health.record_relatedness('https://bad.com/', False)
+        domain_health.record_relatedness('https://bad.com/', False)
+    scheduler = YieldScheduler(stats, domain_health=domain_health)
+
+    ordered = list(scheduler.order([
+        ('sanctions in FRANCE', 'https://bad.com/1'),
+        ('fraud in FRANCE', 'https://bad.com/2'),
+        ('sanctions in FRANCE', 'https://good.com/3'),
+        ('fraud in FRANCE', 'https://good.com/4'),
+    ]))
+
+    assert [url for _, url in ordered] == ['https://good.com/4', 'https://good.com/3', 'https://bad.com/2',
+                                           'https://bad.com/1']
+
+
+def test_scheduler_reorders_remaining_work_on_new_evidence(tmp_path):
+    stats = TopicYieldStats(tmp_path / 'topic-yield.sqlite3', per_region_topic_template)
+    scheduler = YieldScheduler(stats)
+
+    taken = []
+    for query, url in scheduler.order([('fraud in POLAND', 'https://a.com/1'), ('fraud in FRANCE', 'https://a.com/2'),
+                                       ('sanctions in POLAND', 'https://a.com/3')]):
+        taken.append(url)
+        scheduler.record_relatedness(query, False)
+
+    assert taken == ['https://a.com/1', 'https://a.com/3', 'https://a.com/2']
+
+
+def test_scheduler_stops_when_the_budget_is_exhausted(tmp_path):
+    budget = WorkBudget(max_llm_calls=2)
+    llm = BudgetedLLM(EchoLLM(), budget)
+    scheduler = YieldScheduler(TopicYieldStats(tmp_path / 'topic-yield.sqlite3', per_region_topic_template),
+                               budget=budget)
+
+    taken = []
+    for query, url in scheduler.order([('fraud', f'https://a.com/{i}') for i in range(5)]):
+        taken.append(url)
+        llm(query)
+
+    assert len(taken) == 2
+    assert budget.llm_calls == 2
+
+
+def test_time_budget():
+    clock = FakeClock()
+    budget = WorkBudget(max_seconds=60, clock=clock)
+    assert not budget.exhausted()
+    clock.now = 60.0
+    assert budget.exhausted()
@@ -1,2 +1,3 @@
 from .llm_topic_generator import create_generate_func as llm_topic_generator_create_func
-from .per_region_topic_generator import create_topic_generator_func as per_region_topic_generator_create_func
\ No newline at end of file
+from .per_region_topic_generator import create_topic_generator_func as per_region_topic_generator_create_func, \
+    topic_template as per_region_topic_template
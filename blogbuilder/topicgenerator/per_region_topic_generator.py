@@ -241,6 +241,14 @@ countries = (
 )
 
 
+def topic_template(query: str) -> str:
+    # "<topic> in <country>" queries of all the countries share the template "<topic>"
+    for _, country in countries:
+        if query.upper().endswith(f' IN {country}'):
+            return query[:-len(f' in {country}')]
+    return query
+
+
 def create_topic_generator_func(inner_topic_generator_func: Callable[[], List[str]],
                                 country_count: int) -> Callable[[], List[str]]:
     def _generate() -> List[str]:
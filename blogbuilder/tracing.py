@@ -0,0 +1,208 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Optional, List, Callable, Iterator, Dict, Iterable
+
+from blogbuilder.wse.result import SearchResult
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: Optional[float] = None
+    depth: int = 0
+    outcome: str = 'ok'
+
+
+@dataclass
+class Trace:
+    query: str
+    url: Optional[str]
+    start: float
+    end: Optional[float] = None
+    outcome: Optional[str] = None
+    spans: List[Span] = field(default_factory=list)
+    depth: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'query': self.query,
+            'url': self.url,
+            'start': self.start,
+            'end': self.end,
+            'outcome': self.outcome,
+            'spans': [asdict(span) for span in self.spans],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+
+@contextmanager
+def activate(trace: Optional[Trace]) -> Iterator[None]:
+    # makes span() calls anywhere down the stack (i.e. in the content extraction) record into the trace
+    token = _current_trace.set(trace)
+    try:
+        yield
+    except BaseException as e:
+        if trace and not trace.outcome:
+            trace.outcome = 'error:' + e.__class__.__name__
+        raise
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    trace = _current_trace.get()
+    if not trace:
+        yield
+        return
+    recorded = Span(name=name, start=time.time(), depth=trace.depth)
+    trace.spans.append(recorded)
+    trace.depth += 1
+    try:
+        yield
+    except BaseException as e:
+        recorded.outcome = 'error:' + e.__class__.__name__
+        raise
+    finally:
+        trace.depth -= 1
+        recorded.end = time.time()
+
+
+def set_outcome(outcome: str) -> None:
+    trace = _current_trace.get()
+    if trace:
+        trace.outcome = outcome
+
+
+class Tracer:
+    # One JSONL row per query/URL pair (and one per search query) with the timings of the stages it went through
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+
+    def start(self, query: str, url: Optional[str]) -> Trace:
+        return Trace(query=query, url=url, start=time.time())
+
+    def finish(self, trace: Trace) -> None:
+        if trace.end is not None:
+            return
+        trace.end = time.time()
+        with self._lock:
+            with open(self._path, 'a') as f:
+                f.write(json.dumps(trace.to_dict()) + '\n')
+
+    @contextmanager
+    def trace(self, query: str, url: Optional[str]) -> Iterator[Trace]:
+        trace = self.start(query, url)
+        try:
+            with activate(trace):
+                yield trace
+        finally:
+            self.finish(trace)
+
+    def create_search_func(self, websearch_func: Callable[[str], List[SearchResult]]
+                           ) -> Callable[[str], List[SearchResult]]:
+        def _search(query: str) -> List[SearchResult]:
+            with self.trace(query, None), span('search'):
+                results = websearch_func(query)
+                set_outcome(f'results:{len(results)}')
+                return results
+
+        return _search
+
+
+def read_traces(path: Path) -> Iterator[dict]:
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # the last line may be cut short when the run was killed
+                continue
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    # nearest-rank
+    return sorted_values[max(0, math.ceil(percentile / 100 * len(sorted_values)) - 1)]
+
+
+def profile_report(traces: Iterable[dict]) -> dict:
+    # Stage percentiles cover every span, nested ones (i.e. download within obtain_content) included. The critical
+    # path breakdown only uses the top level spans of the query/URL rows, as those run one after another: it tells
+    # which share of the per-URL time went to each stage and how often each stage was the slowest one of a URL.
+    durations: Dict[str, List[float]] = {}
+    critical_path_seconds: Dict[str, float] = {}
+    slowest_counts: Dict[str, int] = {}
+    outcomes: Dict[str, int] = {}
+    url_count = 0
+    url_seconds = 0.0
+    first_start, last_end = None, None
+    for trace in traces:
+        if trace.get('end') is None:
+            continue
+        first_start = min(first_start, trace['start']) if first_start is not None else trace['start']
+        last_end = max(last_end, trace['end']) if last_end is not None else trace['end']
+        for s in trace['spans']:
+            if s.get('end') is not None:
+                durations.setdefault(s['name'], []).append(s['end'] - s['start'])
+        if trace['url'] is None:
+            continue
+
+        url_count += 1
+        url_seconds += trace['end'] - trace['start']
+        outcome = trace.get('outcome') or 'unknown'
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        top_level = [s for s in trace['spans'] if s.get('depth', 0) == 0 and s.get('end') is not None]
+        for s in top_level:
+            critical_path_seconds[s['name']] = critical_path_seconds.get(s['name'], 0.0) + s['end'] - s['start']
+        if top_level:
+            slowest = max(top_level, key=lambda s: s['end'] - s['start'])['name']
+            slowest_counts[slowest] = slowest_counts.get(slowest, 0) + 1
+    # whatever is not covered by the spans (cache lookups, prefilters, waiting for the LLM concurrency limit, ...)
+    critical_path_seconds['other'] = max(0.0, url_seconds - sum(critical_path_seconds.values()))
+
+    stages = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        stages[name] = {'count': len(values), 'total': sum(values), 'max': values[-1]} | {
+            f'p{p}': _percentile(values, p) for p in PERCENTILES}
+    return {
+        'wall_time': (last_end - first_start) if first_start is not None else 0.0,
+        'urls': url_count,
+        'outcomes': outcomes,
+        'stages': stages,
+        'critical_path': {
+            name: {
+                'seconds': seconds,
+                'share': seconds / url_seconds if url_seconds else 0.0,
+                'slowest_in': slowest_counts.get(name, 0),
+            }
+            for name, seconds in sorted(critical_path_seconds.items(), key=lambda item: -item[1])
+        },
+    }
+
+
+def format_profile_report(report: dict) -> str:
+    lines = [f'Wall time: {report["wall_time"]:.1f}s, URLs: {report["urls"]}',
+             'Outcomes: ' + ', '.join(f'{outcome}={count}' for outcome, count in sorted(report['outcomes'].items())),
+             '',
+             f'{"stage":<20}{"count":>8}{"total s":>10}' + ''.join(f'{f"p{p} s":>9}' for p in PERCENTILES) +
+             f'{"max s":>9}']
+    for name, stage in report['stages'].items():
+        lines.append(f'{name:<20}{stage["count"]:>8}{stage["total"]:>10.1f}' +
+                     ''.join(f'{stage[f"p{p}"]:>9.2f}' for p in PERCENTILES) + f'{stage["max"]:>9.2f}')
+    lines += ['', 'Critical path per URL:', f'{"stage":<20}{"seconds":>10}{"share":>8}{"slowest in":>12}']
+    for name, entry in report['critical_path'].items():
+        lines.append(f'{name:<20}{entry["seconds"]:>10.1f}{entry["share"]:>8.1%}{entry["slowest_in"]:>12}')
+    return '\n'.join(lines)
@@ -1,4 +1,5 @@
 import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 
 def sanitize_to_slug(text: str) -> str:
@@ -16,3 +17,25 @@ def sanitize_to_slug(text: str) -> str:
 def extract_timestamp_from_article_id(article_id: str) -> str:
     last_str = article_id.split('-')[-1]
     return last_str.replace('.', '')
+
+
+TRACKING_QUERY_PARAMS = frozenset([
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'ref_src',
+    'spm', 'cmpid', 's_cid', 'trk', 'srsltid',
+])
+
+
+def canonicalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'http'
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        netloc += f':{parts.port}'
+    path = re.sub(r'/+', '/', parts.path).rstrip('/') or '/'
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith('utm_') and name.lower() not in TRACKING_QUERY_PARAMS))
+    return urlunsplit((scheme, netloc, path, query, ''))
@@ -0,0 +1,89 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Callable
+
+CLAIMS_DB_FILENAME = 'claims.sqlite3'
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class WorkClaims:
+    # Lets several workers share one run plan: a query/URL pair is processed only by the worker holding its lease.
+    # Leases expire, so the pairs of a crashed worker are picked up by the others once the lease runs out; a lease
+    # should therefore be longer than processing of a single page takes. The database is opened without WAL, as that
+    # does not work on network file systems, which is where the file lives when the workers run on several nodes.
+    # Claims belong to a plan: those of the previous plans are dropped once a worker of a new one starts.
+    def __init__(self, db_path: Path, plan_id: str = '', worker_id: Optional[str] = None, lease_seconds: float = 1800,
+                 clock: Callable[[], float] = time.time) -> None:
+        self._plan_id = plan_id
+        self._worker_id = worker_id or default_worker_id()
+        self._lease_seconds = lease_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False, isolation_level=None)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(work_claims)')]
+        if columns and 'plan' not in columns:
+            # written before the claims were kept per plan, so they are of a previous plan anyway
+            self._conn.execute('DROP TABLE work_claims')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS work_claims (
+                plan TEXT NOT NULL,
+                query TEXT NOT NULL,
+                url TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                done_at REAL,
+                PRIMARY KEY (plan, query, url)
+            )''')
+        self._conn.execute('DELETE FROM work_claims WHERE plan != ?', (plan_id,))
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    def claim(self, query: str, url: str) -> bool:
+        # a single statement, so taking over an expired lease cannot race with another worker doing the same
+        now = self._clock()
+        with self._lock:
+            claimed = self._conn.execute(
+                'INSERT INTO work_claims (plan, query, url, worker, expires_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (plan, query, url) '
+                'DO UPDATE SET worker = excluded.worker, expires_at = excluded.expires_at '
+                'WHERE work_claims.done_at IS NULL AND '
+                '(work_claims.expires_at < ? OR work_claims.worker = excluded.worker)',
+                (self._plan_id, query, url, self._worker_id, now + self._lease_seconds, now)).rowcount == 1
+        if not claimed:
+            self._log.info(f'URL-query claimed by another worker or done: {url}-{query}')
+        return claimed
+
+    def release(self, query: str, url: str) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM work_claims '
+                               'WHERE plan = ? AND query = ? AND url = ? AND worker = ? AND done_at IS NULL',
+                               (self._plan_id, query, url, self._worker_id))
+
+    def mark_done(self, query: str, url: str) -> None:
+        now = self._clock()
+        with self._lock:
+            self._conn.execute('INSERT INTO work_claims (plan, query, url, worker, expires_at, done_at) '
+                               'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (plan, query, url) '
+                               'DO UPDATE SET worker = excluded.worker, done_at = excluded.done_at',
+                               (self._plan_id, query, url, self._worker_id, now, now))
+
+    def is_done(self, query: str, url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute('SELECT done_at FROM work_claims WHERE plan = ? AND query = ? AND url = ?',
+                                     (self._plan_id, query, url)).fetchone()
+        return row is not None and row[0] is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
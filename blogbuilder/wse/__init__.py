@@ -1,3 +1,7 @@
-from .cache import create_cache as wse_create_cache
-from .google import invoke as wse_google
+from .result import SearchResult
+from .cache import create_cache as wse_create_cache, migrate_legacy_entries as wse_migrate_legacy_cache_entries
+from .google import invoke as wse_google, create_search_func as wse_google_create_func
 from .duckduckgo import create_search_func as wse_ddgs_create_func
+from .scheduler import create_rate_limited_func as wse_create_rate_limited_func, \
+    create_fan_out_func as wse_create_fan_out_func, engine_bucket as wse_engine_bucket
+from .merged import create_merged_search_func as wse_create_merged_search_func
@@ -1,11 +1,52 @@
-from typing import Callable, List
+import json
+import logging
+from typing import Callable, List, Optional
 
+from blogbuilder.wse.result import SearchResult, PartialSearchResults
 from s8er.cache import Cache
 
+WEBSEARCH_CACHE_PREFIX = 'WEBSEARCH2-'
+LEGACY_WEBSEARCH_CACHE_PREFIX = 'WEBSEARCH-'
 
-def create_cache(websearch_func: Callable[[str], List[str]],
-                 cache: Cache[List[str]]) -> Callable[[], List[str]]:
-    def _cache(query: str) -> List[str]:
-        return cache.get_raw(query, lambda: websearch_func(query), prefix_key='WEBSEARCH-')
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.split()).casefold()
+
+
+def websearch_cache_key(query: str, engine: str, max_results: Optional[int]) -> str:
+    return json.dumps({'engine': engine, 'max-results': max_results, 'query': normalize_query(query)},
+                      sort_keys=True)
+
+
+def create_cache(websearch_func: Callable[[str], List[SearchResult]], cache: Cache[list], engine: str,
+                 max_results: Optional[int]) -> Callable[[str], List[SearchResult]]:
+    log = logging.getLogger(__name__)
+
+    def _cache(query: str) -> List[SearchResult]:
+        key = websearch_cache_key(query, engine, max_results)
+        if cache.exists(key, WEBSEARCH_CACHE_PREFIX):
+            return [SearchResult.from_dict(result)
+                    for result in cache.get_raw(key, lambda: [], prefix_key=WEBSEARCH_CACHE_PREFIX)]
+        results = websearch_func(query)
+        if isinstance(results, PartialSearchResults):
+            log.info(f'Not caching partial search results for query: {query}')
+        else:
+            cache.get(key, lambda: [result.to_dict() for result in results], prefix_key=WEBSEARCH_CACHE_PREFIX)
+        return results
 
     return _cache
+
+
+def migrate_legacy_entries(cache: Cache[list], engine: str, max_results: Optional[int]) -> int:
+    # Entries cached under the raw query only are re-keyed as results of the given engine; entries already
+    # present under the new key win
+    log = logging.getLogger(__name__)
+    migrated_count = 0
+    for cacheable in cache.get_all(prefix_key=LEGACY_WEBSEARCH_CACHE_PREFIX):
+        key = websearch_cache_key(cacheable.metadata.key, engine, max_results)
+        if cache.exists(key, WEBSEARCH_CACHE_PREFIX):
+            continue
+        cache.get(key, lambda: cacheable.payload, prefix_key=WEBSEARCH_CACHE_PREFIX)
+        migrated_count += 1
+    log.info(f'Migrated {migrated_count} web search cache entries as results of {engine}')
+    return migrated_count
@@ -2,10 +2,13 @@ from typing import List, Callable
 
 from duckduckgo_search import DDGS
 
+from blogbuilder.wse.result import SearchResult
 
-def create_search_func(max_results: int) -> Callable[[str], List[str]]:
-    def _search(query: str) -> List[str]:
+
+def create_search_func(max_results: int) -> Callable[[str], List[SearchResult]]:
+    def _search(query: str) -> List[SearchResult]:
         results = DDGS().text(query, max_results=max_results)
-        return [result['href'] for result in results]
+        return [SearchResult(url=result['href'], title=result.get('title'), snippet=result.get('body'))
+                for result in results]
 
     return _search
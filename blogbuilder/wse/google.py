@@ -1,7 +1,18 @@
-from typing import List
+from typing import List, Callable
 
 from googlesearch import search
 
+from blogbuilder.wse.result import SearchResult
 
-def invoke(query: str) -> List[str]:
-    return list(search(query))
+
+def invoke(query: str) -> List[SearchResult]:
+    return [SearchResult(url=result.url, title=result.title, snippet=result.description)
+            for result in search(query, advanced=True)]
+
+
+def create_search_func(max_results: int) -> Callable[[str], List[SearchResult]]:
+    def _search(query: str) -> List[SearchResult]:
+        return [SearchResult(url=result.url, title=result.title, snippet=result.description)
+                for result in search(query, num_results=max_results, advanced=True)]
+
+    return _search
@@ -0,0 +1,72 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from timeit import default_timer as timer
+from typing import Callable, Dict, List
+
+from blogbuilder.util import canonicalize_url
+from blogbuilder.wse.result import SearchResult, PartialSearchResults
+from blogbuilder.wse.scheduler import run_abandonable
+
+_log = logging.getLogger(__name__)
+
+# Reciprocal rank fusion constant: https://plg.uwaterloo.ca/~gvcormac/cormacksigir09-rrf.pdf
+RRF_K = 60
+
+
+def merge_results(results_by_engine: Dict[str, List[SearchResult]]) -> List[SearchResult]:
+    scores = {}
+    first_seen_results = {}
+    for engine, results in results_by_engine.items():
+        for rank, result in enumerate(results):
+            key = canonicalize_url(result.url)
+            first_seen_result = first_seen_results.setdefault(key, result)
+            if not first_seen_result.snippet and result.snippet:
+                first_seen_results[key] = SearchResult(
+                    url=first_seen_result.url, title=result.title, snippet=result.snippet)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return [first_seen_results[key] for key in sorted(scores, key=lambda k: scores[k], reverse=True)]
+
+
+def create_merged_search_func(engines: Dict[str, Callable[[str], List[SearchResult]]], quorum: int,
+                              deadline: float) -> Callable[[str], List[SearchResult]]:
+    # All the engines are queried in parallel; results are merged as soon as "quorum" engines answered and
+    # whatever has not finished by the deadline is left behind. When the quorum was not reached or an engine failed,
+    # the results are marked partial, so that they are not cached.
+    executor = ThreadPoolExecutor(max_workers=len(engines) * 2, thread_name_prefix='merged-websearch')
+
+    def _search(query: str) -> List[SearchResult]:
+        start = timer()
+        abandoned = threading.Event()
+        futures = {executor.submit(run_abandonable, search_func, query, abandoned): engine
+                   for engine, search_func in engines.items()}
+        results_by_engine = {}
+        failed = False
+        pending = set(futures)
+        while pending and len(results_by_engine) < quorum:
+            remaining = deadline - (timer() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                engine = futures[future]
+                try:
+                    results_by_engine[engine] = future.result()
+                except Exception:
+                    _log.exception(f'Search engine {engine} failed for query: {query}')
+                    failed = True
+        # the searches still running are not waited for, those not having a rate limiter token yet give up
+        abandoned.set()
+        for future in pending:
+            future.cancel()
+
+        if not results_by_engine:
+            raise RuntimeError(f'No search engine answered for query: {query}')
+        _log.info(f'Merging results of {sorted(results_by_engine)} for query: {query}')
+        merged = merge_results(results_by_engine)
+        if failed or len(results_by_engine) < quorum:
+            _log.warning(f'Partial search results ({len(results_by_engine)} engines answered) for query: {query}')
+            return PartialSearchResults(merged)
+        return merged
+
+    return _search
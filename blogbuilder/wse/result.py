@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from typing import Optional, Union, List
+
+
+@dataclass
+class SearchResult:
+    url: str
+    title: Optional[str] = None
+    snippet: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, d: Union[dict, str]) -> 'SearchResult':
+        # results cached before titles and snippets were kept are plain URLs
+        if isinstance(d, str):
+            return SearchResult(url=d)
+        return SearchResult(url=d['url'], title=d.get('title'), snippet=d.get('snippet'))
+
+    def to_dict(self) -> dict:
+        return {'url': self.url, 'title': self.title, 'snippet': self.snippet}
+
+
+class PartialSearchResults(List[SearchResult]):
+    # Results of a search some of whose engines failed or missed the deadline: good enough for the current run, but
+    # not to be cached, so that the next run asks the engines again
+    pass
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import ContextVar
+from timeit import default_timer as timer
+from typing import Callable, List, Iterable, Tuple, TypeVar, Dict, Optional
+
+R = TypeVar('R')
+
+_log = logging.getLogger(__name__)
+
+# waiting for a token is done in slices, so that an abandoned search notices it soon
+MAX_SLEEP_SLICE = 1.0
+
+
+class SearchAbandonedError(Exception):
+    pass
+
+
+_search_abandoned: ContextVar[Optional[threading.Event]] = ContextVar('search_abandoned', default=None)
+
+
+def is_search_abandoned() -> bool:
+    abandoned = _search_abandoned.get()
+    return abandoned is not None and abandoned.is_set()
+
+
+def run_abandonable(websearch_func: Callable[[str], R], query: str, abandoned: threading.Event) -> R:
+    # once the event is set, rate limited searches (see below) give up instead of waiting for and using a token
+    token = _search_abandoned.set(abandoned)
+    try:
+        return websearch_func(query)
+    finally:
+        _search_abandoned.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int,
+                 clock: Callable[[], float] = timer, sleep: Callable[[float], None] = time.sleep) -> None:
+        self._rate_per_second = rate_per_second
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, give_up: Callable[[], bool] = lambda: False) -> bool:
+        while not give_up():
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = max(self._blocked_until - now, (1.0 - self._tokens) / self._rate_per_second)
+            self._sleep(min(wait, MAX_SLEEP_SLICE))
+        return False
+
+    def block_for(self, seconds: float) -> None:
+        with self._lock:
+            now = self._clock()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated_at = max(now, self._blocked_until)
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated_at:
+            self._tokens = min(float(self._capacity),
+                               self._tokens + (now - self._updated_at) * self._rate_per_second)
+            self._updated_at = now
+
+
+_engine_buckets: Dict[str, TokenBucket] = {}
+_engine_buckets_lock = threading.Lock()
+
+
+def engine_bucket(engine: str, queries_per_minute: float, burst: int) -> TokenBucket:
+    with _engine_buckets_lock:
+        if engine not in _engine_buckets:
+            _engine_buckets[engine] = TokenBucket(rate_per_second=queries_per_minute / 60.0, capacity=burst)
+        return _engine_buckets[engine]
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    response = getattr(e, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return 'ratelimit' in type(e).__name__.lower() or '429' in str(e)
+
+
+def create_rate_limited_func(websearch_func: Callable[[str], R], bucket: TokenBucket,
+                             max_tries: int = 5, initial_backoff: float = 30.0) -> Callable[[str], R]:
+    def _search(query: str) -> R:
+        backoff_seconds = initial_backoff
+        for attempt in range(1, max_tries + 1):
+            if not bucket.acquire(give_up=is_search_abandoned):
+                raise SearchAbandonedError(f'Search abandoned while waiting for the rate limit: {query}')
+            try:
+                return websearch_func(query)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_tries:
+                    raise
+                _log.warning(f'Search engine rate limit hit, backing off for {backoff_seconds}s: {query}')
+                bucket.block_for(backoff_seconds)
+                backoff_seconds *= 2
+
+    return _search
+
+
+def create_fan_out_func(websearch_func: Callable[[str], R],
+                        max_workers: int) -> Callable[[List[str]], Iterable[Tuple[str, R]]]:
+    # Results are yielded in the order the searches complete, so that the caller can start processing the first
+    # result lists while the remaining searches are still running
+    def _search_all(queries: List[str]) -> Iterable[Tuple[str, R]]:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='websearch') as executor:
+            futures = {executor.submit(websearch_func, query): query for query in queries}
+            try:
+                for future in as_completed(futures):
+                    query = futures[future]
+                    try:
+                        yield query, future.result()
+                    except Exception:
+                        _log.exception(f'Search failed for query: {query}')
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    return _search_all
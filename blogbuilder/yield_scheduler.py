@@ -0,0 +1,69 @@
+import heapq
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Callable, List, Tuple, Iterator
+
+from blogbuilder.llm.budget import WorkBudget
+from s8er.domain_health import DomainHealth
+
+
+class TopicYieldStats:
+    # How often the pages found for a topic template pass the relatedness check
+    def __init__(self, db_path: Path, topic_template_func: Callable[[str], str]) -> None:
+        self._topic_template_func = topic_template_func
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS topic_yield ('
+                           'template TEXT PRIMARY KEY, checks INTEGER NOT NULL, related INTEGER NOT NULL)')
+
+    def record_relatedness(self, query: str, related: bool) -> None:
+        with self._lock:
+            self._conn.execute('INSERT INTO topic_yield (template, checks, related) VALUES (?, 1, ?) '
+                               'ON CONFLICT (template) DO UPDATE SET checks = checks + 1, '
+                               'related = related + excluded.related',
+                               (self._topic_template_func(query), int(related)))
+
+    def expected_yield(self, query: str) -> float:
+        with self._lock:
+            row = self._conn.execute('SELECT checks, related FROM topic_yield WHERE template = ?',
+                                     (self._topic_template_func(query),)).fetchone()
+        checks, related = row or (0, 0)
+        # smoothed, so that unknown templates sit in the middle instead of at either end
+        return (related + 1) / (checks + 2)
+
+
+class YieldScheduler:
+    # Orders query/URL pairs by the expected chance of yielding a related page: the topic template's relatedness rate
+    # times the domain's health priority. Scores are re-evaluated lazily when a pair is about to be taken, so what is
+    # learned while processing (i.e. a domain going bad) reorders the remaining work. Stops once the budget is spent.
+    def __init__(self, topic_yield_stats: TopicYieldStats, domain_health: Optional[DomainHealth] = None,
+                 budget: Optional[WorkBudget] = None) -> None:
+        self._topic_yield_stats = topic_yield_stats
+        self._domain_health = domain_health
+        self._budget = budget
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    def expected_yield(self, query: str, url: str) -> float:
+        domain_yield = self._domain_health.priority(url) if self._domain_health else 0.5
+        return self._topic_yield_stats.expected_yield(query) * domain_yield
+
+    def record_relatedness(self, query: str, related: bool) -> None:
+        self._topic_yield_stats.record_relatedness(query, related)
+
+    def order(self, units: List[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        # heapq is a min-heap, hence the negated scores; the index keeps the search engine order among equal scores
+        heap = [(-self.expected_yield(query, url), i, query, url) for i, (query, url) in enumerate(units)]
+        heapq.heapify(heap)
+        while heap:
+            if self._budget and self._budget.exhausted():
+                self._log.info(f'Budget exhausted with {len(heap)} query/URL pairs left')
+                return
+            negated_score, i, query, url = heapq.heappop(heap)
+            current_score = self.expected_yield(query, url)
+            if heap and current_score < -heap[0][0]:
+                heapq.heappush(heap, (-current_score, i, query, url))
+                continue
+            self._log.info(f'Expected yield {current_score:.3f} for URL-query: {url}-{query}')
+            yield query, url
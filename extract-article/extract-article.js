@@ -1,16 +1,59 @@
-const { JSDOM } = require("jsdom");
+const { JSDOM, VirtualConsole } = require("jsdom");
 const { Readability } = require("@mozilla/readability");
 const axios = require('axios');
 const fs = require('fs');
+const readline = require('readline');
 const yargs = require('yargs/yargs');
 const { hideBin } = require('yargs/helpers');
 
+function extractArticleText(htmlContent, url) {
+    // JSDOM errors (i.e. unparseable stylesheets) must not end up on stdout, which is used by the worker protocol
+    const options = { virtualConsole: new VirtualConsole() };
+    if (url) {
+        options.url = url;
+    }
+    const dom = new JSDOM(htmlContent, options);
+    try {
+        const article = new Readability(dom.window.document).parse();
+        return article ? article.textContent : null;
+    } finally {
+        dom.window.close();
+    }
+}
+
+// Line-delimited JSON protocol: each stdin line is {"id": ..., "html": ..., "url": ...}, each stdout line is
+// {"id": ..., "content": ..., "rss": ...} or {"id": ..., "error": ..., "rss": ...}
+function runWorker() {
+    const lines = readline.createInterface({ input: process.stdin, terminal: false });
+    lines.on('line', (line) => {
+        let response;
+        let request = {};
+        try {
+            request = JSON.parse(line);
+            response = { id: request.id, content: extractArticleText(request.html, request.url) || '' };
+        } catch (error) {
+            response = { id: request.id, error: String(error) };
+        }
+        response.rss = process.memoryUsage().rss;
+        process.stdout.write(JSON.stringify(response) + '\n');
+    });
+    lines.on('close', () => process.exit(0));
+}
+
 async function main() {
     const argv = yargs(hideBin(process.argv)).option('url', {
         describe: 'URL or file path of the HTML document',
-        type: 'string',
-        demandOption: true
-    }).argv;
+        type: 'string'
+    }).option('worker', {
+        describe: 'Process HTML documents sent as JSON lines on stdin',
+        type: 'boolean',
+        default: false
+    }).check((argv) => argv.worker || argv.url ? true : 'Either --url or --worker is required').argv;
+
+    if (argv.worker) {
+        runWorker();
+        return;
+    }
 
     let htmlContent;
     if (argv.url.startsWith('http://') || argv.url.startsWith('https://')) {
@@ -30,12 +73,10 @@ async function main() {
         }
     }
 
-    const dom = new JSDOM(htmlContent);
-    const reader = new Readability(dom.window.document);
-    const article = reader.parse();
+    const articleText = extractArticleText(htmlContent);
 
-    if (article) {
-        console.log(article.textContent);
+    if (articleText !== null) {
+        console.log(articleText);
     } else {
         console.error("Failed to extract the article from the provided HTML.");
     }
@@ -6,10 +6,10 @@ import shutil
 import string
 import tempfile
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import StringIO
 from pathlib import Path
-from typing import Callable, Optional, TypeVar, Generic
+from typing import Callable, Optional, TypeVar, Generic, Iterable
 
 from structlog.stdlib import get_logger as get_raw_logger
 
@@ -59,15 +59,19 @@ class Cache(Generic[T]):
     def hash_key(key: str) -> str:
         return hashlib.md5(key.encode('utf-8')).hexdigest()
 
-    def exists(self, key: str) -> bool:
-        return self._get_if_exists(Cache.hash_key(key)) is not None
+    def exists(self, key: str, prefix_key='') -> bool:
+        return self._get_if_exists(prefix_key + Cache.hash_key(key)) is not None
 
-    def get_raw(self, key: str, supplier: Callable[[], T], prefix_key='') -> T:
-        return self.get(key, supplier, prefix_key).payload
+    def get_raw(self, key: str, supplier: Callable[[], T], prefix_key='', max_age: Optional[timedelta] = None) -> T:
+        return self.get(key, supplier, prefix_key, max_age).payload
 
-    def get(self, key: str, supplier: Callable[[], T], prefix_key='') -> Cacheable[T]:
+    def get(self, key: str, supplier: Callable[[], T], prefix_key='',
+            max_age: Optional[timedelta] = None) -> Cacheable[T]:
         hash_key = prefix_key + Cache.hash_key(key)
         cacheable = self._get_if_exists(hash_key)
+        if cacheable and max_age is not None and datetime.utcnow() - cacheable.metadata.created_at > max_age:
+            self._log.debug(f'Object "{hash_key}" found in cache is too old')
+            cacheable = None
         if cacheable:
             self._log.debug(f'Found object in cache: "{hash_key}"')
             logger.info(
@@ -87,6 +91,9 @@ class Cache(Generic[T]):
             self._persist(cacheable)
         return cacheable
 
+    def get_all(self, prefix_key='') -> Iterable[Cacheable[T]]:
+        raise NotImplementedError()
+
     def _get_if_exists(self, hash_key: str) -> Optional[Cacheable[T]]:
         raise NotImplementedError()
 
@@ -105,6 +112,9 @@ class NoOpCache(Cache):
     def _persist(self, cacheable: Cacheable) -> None:
         pass
 
+    def get_all(self, prefix_key='') -> Iterable[Cacheable]:
+        return []
+
 
 class FilesystemCache(Cache):
     def __init__(self, dir_: Path) -> None:
@@ -141,6 +151,14 @@ class FilesystemCache(Cache):
         encoded_name = FilesystemCache._encode_name(key) + '.json'
         return self._dir / encoded_name
 
+    def get_all(self, prefix_key='') -> Iterable[Cacheable]:
+        self._ensure_dir_exists()
+        encoded_prefix = FilesystemCache._encode_name(prefix_key) if prefix_key else ''
+        for filename in os.listdir(self._dir):
+            if filename.startswith(encoded_prefix) and filename.endswith('.json'):
+                with open(self._dir / filename) as f:
+                    yield Cacheable.from_dict(json.load(f))
+
     def _ensure_dir_exists(self) -> None:
         if not os.path.isdir(self._dir):
             raise FileNotFoundError(f'I could not find a directory for a local cache: {self._dir}')
@@ -0,0 +1,227 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Callable, Dict, Tuple
+from urllib.parse import urlparse
+
+OVERRIDE_SKIP = 'skip'
+OVERRIDE_ALLOW = 'allow'
+OVERRIDES = (OVERRIDE_SKIP, OVERRIDE_ALLOW)
+BLOCKING_STATUS_CODES = (401, 403, 429)
+COUNT_FIELDS = ('requests', 'successes', 'blocked', 'errors', 'total_latency', 'extractions', 'empty_extractions',
+                'checks', 'related')
+# failures of the same URL within the window are the backoff retries of one attempt
+RETRY_WINDOW_SECONDS = 600
+
+
+class DomainSkippedError(Exception):
+    pass
+
+
+def normalize_host(host: str) -> str:
+    host = host.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def host_of(url: str) -> str:
+    return normalize_host(urlparse(url).netloc)
+
+
+def _to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _to_timestamp(iso: str) -> float:
+    return datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+
+
+@dataclass
+class DomainStats:
+    host: str
+    requests: float = 0
+    successes: float = 0
+    blocked: float = 0
+    errors: float = 0
+    total_latency: float = 0.0
+    extractions: float = 0
+    empty_extractions: float = 0
+    checks: float = 0
+    related: float = 0
+    override: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        return self.successes / self.requests if self.requests else None
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        return self.total_latency / self.requests if self.requests else None
+
+    @property
+    def extraction_yield(self) -> Optional[float]:
+        return (self.extractions - self.empty_extractions) / self.extractions if self.extractions else None
+
+    @property
+    def relatedness_rate(self) -> Optional[float]:
+        return self.related / self.checks if self.checks else None
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {
+            'success_rate': self.success_rate,
+            'average_latency': self.average_latency,
+            'extraction_yield': self.extraction_yield,
+            'relatedness_rate': self.relatedness_rate,
+        }
+
+
+class DomainHealth:
+    # Per-host outcomes of downloads, extraction and relatedness checks. Hosts that keep failing (i.e. answer 403/429
+    # or time out) or keep yielding nothing are skipped once there is enough evidence, the rest gets ordered by the
+    # chance of producing a related page. Operators can pin a host to "skip" or "allow" regardless of the numbers.
+    # The counts decay with the given half-life, so a host recovers once its failures get old, and a skipped host
+    # still gets a probe request through once per probe interval, so that its numbers can change at all.
+    def __init__(self, db_path: Path, min_requests: int = 5, min_success_rate: float = 0.2,
+                 min_extraction_yield: float = 0.2, half_life_seconds: float = 7 * 24 * 3600,
+                 probe_interval_seconds: float = 3600, clock: Callable[[], float] = time.time) -> None:
+        self._min_requests = min_requests
+        self._min_success_rate = min_success_rate
+        self._min_extraction_yield = min_extraction_yield
+        self._half_life_seconds = half_life_seconds
+        self._probe_interval_seconds = probe_interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._probes: Dict[str, Tuple[str, float]] = {}
+        self._failed_urls: OrderedDict[str, float] = OrderedDict()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.create_function('decay', 1, self._decay)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS domain_health (
+                host TEXT PRIMARY KEY,
+                requests INTEGER NOT NULL DEFAULT 0,
+                successes INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                total_latency REAL NOT NULL DEFAULT 0,
+                extractions INTEGER NOT NULL DEFAULT 0,
+                empty_extractions INTEGER NOT NULL DEFAULT 0,
+                checks INTEGER NOT NULL DEFAULT 0,
+                related INTEGER NOT NULL DEFAULT 0,
+                override TEXT,
+                updated_at TEXT
+            )''')
+
+    def record_fetch(self, url: str, latency: float, status_code: Optional[int] = None) -> None:
+        # status_code is None when no response was received at all (timeouts, connection errors)
+        success = status_code is not None and status_code < 400
+        blocked = status_code in BLOCKING_STATUS_CODES
+        if not success and self._is_retried_failure(url):
+            return
+        with self._lock:
+            self._probes.pop(host_of(url), None)
+        self._increment(host_of(url), requests=1, successes=int(success), blocked=int(blocked),
+                        errors=int(not success and not blocked), total_latency=latency)
+
+    def record_extraction(self, url: str, content: Optional[str]) -> None:
+        self._increment(host_of(url), extractions=1, empty_extractions=int(not content or not content.strip()))
+
+    def record_relatedness(self, url: str, related: bool) -> None:
+        self._increment(host_of(url), checks=1, related=int(related))
+
+    def stats(self, host: str) -> DomainStats:
+        with self._lock:
+            row = self._conn.execute(f'SELECT {self._columns()} FROM domain_health WHERE host = ?',
+                                     (host,)).fetchone()
+        return self._decayed(DomainStats(*row)) if row else DomainStats(host=host)
+
+    def all_stats(self) -> List[DomainStats]:
+        with self._lock:
+            rows = self._conn.execute(f'SELECT {self._columns()} FROM domain_health ORDER BY host').fetchall()
+        return [self._decayed(DomainStats(*row)) for row in rows]
+
+    def set_override(self, host: str, override: Optional[str]) -> None:
+        if override is not None and override not in OVERRIDES:
+            raise ValueError(f'Unknown override: {override}')
+        with self._lock:
+            # updated_at stays, as it is when the counts were last decayed
+            self._conn.execute('INSERT INTO domain_health (host, override, updated_at) VALUES (?, ?, ?) '
+                               'ON CONFLICT (host) DO UPDATE SET override = excluded.override',
+                               (host, override, _to_iso(self._clock())))
+
+    def should_skip(self, url: str) -> bool:
+        stats = self.stats(host_of(url))
+        if stats.override:
+            return stats.override == OVERRIDE_SKIP
+        if stats.requests >= self._min_requests and stats.success_rate < self._min_success_rate:
+            return not self._is_probe(url, stats)
+        if stats.extractions >= self._min_requests and stats.extraction_yield < self._min_extraction_yield:
+            return not self._is_probe(url, stats)
+        return False
+
+    def priority(self, url: str) -> float:
+        # smoothed, so that unknown hosts sit in the middle instead of at either end
+        stats = self.stats(host_of(url))
+        success_rate = (stats.successes + 1) / (stats.requests + 2)
+        extraction_yield = (stats.extractions - stats.empty_extractions + 1) / (stats.extractions + 2)
+        relatedness_rate = (stats.related + 1) / (stats.checks + 2)
+        return success_rate * extraction_yield * relatedness_rate
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _columns() -> str:
+        return ', '.join(DomainStats.__dataclass_fields__.keys())
+
+    def _decay(self, updated_at: Optional[str]) -> float:
+        if updated_at is None:
+            return 1.0
+        return 0.5 ** (max(0.0, self._clock() - _to_timestamp(updated_at)) / self._half_life_seconds)
+
+    def _decayed(self, stats: DomainStats) -> DomainStats:
+        # rounded, so that what was recorded a moment ago still reaches the thresholds
+        decay = self._decay(stats.updated_at)
+        return replace(stats, **{name: round(getattr(stats, name) * decay, 6) for name in COUNT_FIELDS})
+
+    def _is_probe(self, url: str, stats: DomainStats) -> bool:
+        # the URL let through stays let through until its fetch is recorded, as a URL is checked both before it is
+        # scheduled and when it is downloaded
+        now = self._clock()
+        last_recorded_at = _to_timestamp(stats.updated_at) if stats.updated_at else 0.0
+        with self._lock:
+            probe_url, probed_at = self._probes.get(stats.host, (None, 0.0))
+            if probe_url == url:
+                return True
+            if now - max(last_recorded_at, probed_at) < self._probe_interval_seconds:
+                return False
+            self._probes[stats.host] = (url, now)
+        return True
+
+    def _is_retried_failure(self, url: str) -> bool:
+        now = self._clock()
+        with self._lock:
+            while self._failed_urls and next(iter(self._failed_urls.values())) < now - RETRY_WINDOW_SECONDS:
+                self._failed_urls.popitem(last=False)
+            retried = url in self._failed_urls
+            self._failed_urls[url] = now
+            self._failed_urls.move_to_end(url)
+        return retried
+
+    def _increment(self, host: str, **increments) -> None:
+        # the stored counts are decayed up to now before adding, as updated_at moves to now
+        columns = ', '.join(increments.keys())
+        placeholders = ', '.join('?' for _ in increments)
+        updates = ', '.join(f'{column} = {column} * decay(domain_health.updated_at) + excluded.{column}'
+                            if column in increments else f'{column} = {column} * decay(domain_health.updated_at)'
+                            for column in COUNT_FIELDS)
+        with self._lock:
+            self._conn.execute(f'INSERT INTO domain_health (host, {columns}, updated_at) '
+                               f'VALUES (?, {placeholders}, ?) '
+                               f'ON CONFLICT (host) DO UPDATE SET {updates}, updated_at = excluded.updated_at',
+                               (host, *increments.values(), _to_iso(self._clock())))
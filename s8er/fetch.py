@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Callable, Tuple, List
+
+import requests
+from requests.utils import get_encoding_from_headers
+from structlog.stdlib import get_logger as get_raw_logger
+
+from s8er.fetch_engine import FetchEngine
+
+logger = get_raw_logger(os.path.basename(__file__))
+
+STORED_HEADERS = ('content-type', 'content-length', 'etag', 'last-modified')
+# prefixes of these are still usable, everything else (i.e. PDFs) is rejected once it is over the byte cap
+TRUNCATABLE_CONTENT_TYPES = ('text/', 'application/xhtml+xml', 'application/xml', 'application/json')
+CHUNK_SIZE = 64 * 1024
+
+
+class UnsuitableContentError(Exception):
+    pass
+
+
+def parse_content_type(content_type: Optional[str]) -> Optional[str]:
+    return content_type.split(';')[0].strip().lower() if content_type else None
+
+
+def is_truncatable_content_type(content_type: Optional[str]) -> bool:
+    return content_type is None or content_type.startswith(TRUNCATABLE_CONTENT_TYPES)
+
+
+def read_capped_content(r: requests.Response, max_bytes: Optional[int]) -> Tuple[bytes, bool]:
+    content_type = parse_content_type(r.headers.get('content-type'))
+    if max_bytes is None:
+        return r.content, False
+    content_length = r.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes and \
+            not is_truncatable_content_type(content_type):
+        raise UnsuitableContentError(f'Content too large: {content_length} bytes of {content_type}, '
+                                     f'limit: {max_bytes} bytes')
+
+    chunks = []
+    size = 0
+    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            if not is_truncatable_content_type(content_type):
+                raise UnsuitableContentError(f'Content too large: over {max_bytes} bytes of {content_type}')
+            return b''.join(chunks)[:max_bytes], True
+    return b''.join(chunks), False
+
+
+def read_capped_text(r: requests.Response, max_bytes: Optional[int]) -> str:
+    r.raise_for_status()
+    content, _ = read_capped_content(r, max_bytes)
+    return content.decode(r.encoding or 'utf-8', errors='replace')
+
+
+@dataclass
+class FetchResponse:
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    content_hash: str
+    fetched_at: datetime
+    from_cache: bool = False
+    truncated: bool = False
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return parse_content_type(self.headers.get('content-type'))
+
+    @property
+    def text(self) -> str:
+        encoding = get_encoding_from_headers(self.headers) or 'utf-8'
+        try:
+            return self.content.decode(encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+    def metadata_dict(self) -> dict:
+        return {
+            'url': self.url,
+            'status_code': self.status_code,
+            'headers': self.headers,
+            'content_hash': self.content_hash,
+            'fetched_at': self.fetched_at.isoformat(),
+            'truncated': self.truncated,
+        }
+
+    @classmethod
+    def from_metadata_dict(cls, d: dict, content: bytes) -> 'FetchResponse':
+        return FetchResponse(
+            url=d['url'],
+            status_code=d['status_code'],
+            headers=d['headers'],
+            content=content,
+            content_hash=d['content_hash'],
+            fetched_at=datetime.fromisoformat(d['fetched_at']),
+            from_cache=True,
+            truncated=d.get('truncated', False),
+        )
+
+
+class HttpCacheStore:
+    # Raw response bodies are kept as they are next to a JSON file with the response metadata and validators
+    def __init__(self, dir_: Path) -> None:
+        self._dir = dir_
+        os.makedirs(self._dir, exist_ok=True)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+    def get(self, url: str) -> Optional[FetchResponse]:
+        key = HttpCacheStore._key(url)
+        metadata_path = self._dir / (key + '.json')
+        body_path = self._dir / (key + '.body')
+        if not metadata_path.exists() or not body_path.exists():
+            return None
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        with open(body_path, 'rb') as f:
+            content = f.read()
+        return FetchResponse.from_metadata_dict(metadata, content)
+
+    def put(self, response: FetchResponse, write_body: bool = True) -> None:
+        key = HttpCacheStore._key(response.url)
+        if write_body:
+            self._write_atomically(self._dir / (key + '.body'), response.content, binary=True)
+        self._write_atomically(self._dir / (key + '.json'), json.dumps(response.metadata_dict()), binary=False)
+
+    def _write_atomically(self, path: Path, data, binary: bool) -> None:
+        with tempfile.NamedTemporaryFile(delete=False, mode='wb' if binary else 'w', dir=self._dir) as ntf:
+            try:
+                ntf.write(data)
+                ntf.flush()
+                shutil.move(ntf.name, path)
+            except:
+                os.remove(ntf.name)
+                raise
+
+
+class CachingFetcher:
+    # Responses are served from the store within the freshness window and revalidated with conditional requests
+    # (If-None-Match / If-Modified-Since) afterwards, so that a known, unchanged page costs a 304 at most.
+    # Bodies are streamed: text is cut at max_bytes, anything else over max_bytes (or with a content type rejected by
+    # accept_content_type) is aborted before it is downloaded, if the headers tell enough. With an engine, requests go
+    # through its concurrency limits and politeness delays, otherwise through the session.
+    def __init__(self, store: Optional[HttpCacheStore], timeout: Optional[float] = None,
+                 freshness: timedelta = timedelta(days=7), session: Optional[requests.Session] = None,
+                 max_bytes: Optional[int] = None,
+                 accept_content_type: Optional[Callable[[Optional[str]], bool]] = None,
+                 engine: Optional[FetchEngine] = None) -> None:
+        self._store = store
+        self._timeout = timeout
+        self._freshness = freshness
+        self._session = session or requests.Session()
+        self._max_bytes = max_bytes
+        self._accept_content_type = accept_content_type
+        self._engine = engine
+
+    def fetch(self, url: str) -> FetchResponse:
+        cached = self._store.get(url) if self._store else None
+        now = datetime.utcnow()
+        if cached and now - cached.fetched_at < self._freshness:
+            logger.debug("Fresh HTTP response served from cache", url=url)
+            return cached
+
+        headers = self._conditional_headers(cached)
+        if self._engine:
+            return self._engine.get(url, lambda r: self._handle_response(url, r, cached, now),
+                                    timeout=self._timeout, headers=headers)
+        with self._session.get(url, timeout=self._timeout, headers=headers, stream=True) as r:
+            return self._handle_response(url, r, cached, now)
+
+    def prefetch(self, urls: List[str], workers: int) -> None:
+        # warms the store, so that the following fetch() calls are served from it; failures are left for them
+        def _fetch_quietly(url: str) -> None:
+            try:
+                self.fetch(url)
+            except Exception as e:
+                logger.info("Prefetching failed", url=url, error=str(e))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch') as executor:
+            list(executor.map(_fetch_quietly, urls))
+
+    def _handle_response(self, url: str, r: requests.Response, cached: Optional[FetchResponse],
+                         now: datetime) -> FetchResponse:
+        if cached and r.status_code == 304:
+            logger.info("HTTP response revalidated", url=url)
+            cached.fetched_at = now
+            self._store.put(cached, write_body=False)
+            return cached
+
+        r.raise_for_status()
+        content_type = parse_content_type(r.headers.get('content-type'))
+        if self._accept_content_type and not self._accept_content_type(content_type):
+            raise UnsuitableContentError(f'Unsupported content type: {content_type}')
+        content, truncated = read_capped_content(r, self._max_bytes)
+        if truncated:
+            logger.info("HTTP response truncated", url=url, max_bytes=self._max_bytes)
+
+        response = FetchResponse(
+            url=url,
+            status_code=r.status_code,
+            headers={name: r.headers[name] for name in STORED_HEADERS if name in r.headers},
+            content=content,
+            content_hash=hashlib.md5(content).hexdigest(),
+            fetched_at=now,
+            truncated=truncated,
+        )
+        if self._store:
+            self._store.put(response)
+        return response
+
+    @staticmethod
+    def _conditional_headers(cached: Optional[FetchResponse]) -> Dict[str, str]:
+        headers = {}
+        if cached:
+            if cached.headers.get('etag'):
+                headers['If-None-Match'] = cached.headers['etag']
+            if cached.headers.get('last-modified'):
+                headers['If-Modified-Since'] = cached.headers['last-modified']
+        return headers
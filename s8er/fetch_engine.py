@@ -0,0 +1,137 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Callable, TypeVar, List, Iterable, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from structlog.stdlib import get_logger as get_raw_logger
+
+from s8er.domain_health import DomainHealth, DomainSkippedError, host_of
+
+logger = get_raw_logger(os.path.basename(__file__))
+
+T = TypeVar('T')
+
+
+class FetchEngine:
+    # Downloads are scheduled on an event loop running in a background thread: a global semaphore caps the number of
+    # requests in flight, per-host semaphores and a minimal delay between requests to the same host keep us polite.
+    # The blocking requests calls themselves run on a thread pool sharing one Session, so connections are reused.
+    # Synchronous callers use get() and fetch_all(); both are safe to call from many threads at once.
+    def __init__(self, max_concurrency: int = 16, max_per_host: int = 2, politeness_delay: float = 1.0,
+                 session: Optional[requests.Session] = None, domain_health: Optional[DomainHealth] = None) -> None:
+        self._max_concurrency = max_concurrency
+        self._max_per_host = max_per_host
+        self._politeness_delay = politeness_delay
+        self._session = session or self._create_session(max_concurrency, max_per_host)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='fetch-engine')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_request_at: Dict[str, float] = {}
+        self._domain_health = domain_health
+
+    @staticmethod
+    def _create_session(max_concurrency: int, max_per_host: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency * 4, pool_maxsize=max_per_host)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    async def request(self, url: str, handle: Callable[[requests.Response], T], timeout: Optional[float] = None,
+                      headers: Optional[Dict[str, str]] = None) -> T:
+        # the response is handled (i.e. its body is streamed) while the slots are still held
+        if self._domain_health and self._domain_health.should_skip(url):
+            raise DomainSkippedError(f'Host skipped based on its health: {host_of(url)}')
+        host = urlparse(url).netloc.lower()
+        async with self._global_semaphore, self._host_semaphore(host):
+            await self._wait_for_politeness_delay(host)
+            return await self._loop.run_in_executor(
+                self._executor, self._request_blocking, url, handle, timeout, headers)
+
+    def get(self, url: str, handle: Callable[[requests.Response], T], timeout: Optional[float] = None,
+            headers: Optional[Dict[str, str]] = None) -> T:
+        return self._run(self.request(url, handle, timeout=timeout, headers=headers))
+
+    def fetch_all(self, urls: Iterable[str], handle: Callable[[requests.Response], T],
+                  timeout: Optional[float] = None) -> List[Union[T, Exception]]:
+        async def _fetch_all() -> list:
+            return await asyncio.gather(*[self.request(url, handle, timeout=timeout) for url in urls],
+                                        return_exceptions=True)
+
+        return self._run(_fetch_all())
+
+    def close(self) -> None:
+        with self._loop_lock:
+            if self._loop:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+    def _request_blocking(self, url: str, handle: Callable[[requests.Response], T], timeout: Optional[float],
+                          headers: Optional[Dict[str, str]]) -> T:
+        start = time.monotonic()
+        try:
+            r = self._session.get(url, timeout=timeout, headers=headers, stream=True)
+        except requests.RequestException:
+            self._record_fetch(url, time.monotonic() - start, None)
+            raise
+        self._record_fetch(url, time.monotonic() - start, r.status_code)
+        with r:
+            return handle(r)
+
+    def _record_fetch(self, url: str, latency: float, status_code: Optional[int]) -> None:
+        if self._domain_health:
+            self._domain_health.record_fetch(url, latency, status_code)
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self._max_per_host)
+        return self._host_semaphores[host]
+
+    async def _wait_for_politeness_delay(self, host: str) -> None:
+        # all coroutines run on the single loop thread, so reserving the next slot needs no lock
+        now = time.monotonic()
+        request_at = max(now, self._host_next_request_at.get(host, now))
+        self._host_next_request_at[host] = request_at + self._politeness_delay
+        if request_at > now:
+            logger.debug("Waiting before the next request to the host", host=host, delay=request_at - now)
+            await asyncio.sleep(request_at - now)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if not self._loop:
+                loop = asyncio.new_event_loop()
+                self._global_semaphore = asyncio.Semaphore(self._max_concurrency)
+                self._host_semaphores = {}
+                threading.Thread(target=loop.run_forever, daemon=True, name='fetch-engine-loop').start()
+                self._loop = loop
+            return self._loop
+
+
+_default_engine: Optional[FetchEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine() -> FetchEngine:
+    global _default_engine
+    with _default_engine_lock:
+        if not _default_engine:
+            _default_engine = FetchEngine()
+        return _default_engine
+
+
+def set_default_engine(engine: FetchEngine) -> None:
+    global _default_engine
+    with _default_engine_lock:
+        _default_engine = engine
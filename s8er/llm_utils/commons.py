@@ -1,5 +1,4 @@
 from typing import Dict, Any
-import requests
 import signal
 from duckduckgo_search import DDGS
 from googlesearch import search as google_search
@@ -9,6 +8,8 @@ from structlog.stdlib import get_logger as get_raw_logger
 import re
 from itertools import chain, product
 
+from s8er.fetch import read_capped_text
+from s8er.fetch_engine import get_default_engine
 from s8er.llm import CachedOpenAI
 
 
@@ -63,10 +64,11 @@ def ask_chat(
     return chat_completion
 
 
+MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
+
+
 def get_url(url: str) -> str:
-    r = requests.get(url)
-    r.raise_for_status()
-    return r.text
+    return get_default_engine().get(url, lambda r: read_capped_text(r, MAX_DOWNLOAD_BYTES))
 
 
 def is_answer_available(chat_response: Dict[str, Any]) -> bool:
@@ -12,6 +12,8 @@ from bs4 import BeautifulSoup
 from openai import OpenAI
 
 from s8er.cache import FilesystemCache
+from s8er.fetch import read_capped_text
+from s8er.fetch_engine import get_default_engine
 from s8er.llm import CachedOpenAI
 from s8pwa.util.logging import basic_logging_config
 
@@ -38,9 +40,7 @@ def query_google_raw(input_str: str) -> str:
 
 
 def get_url(url: str) -> str:
-    r = requests.get(url)
-    r.raise_for_status()
-    return r.text
+    return get_default_engine().get(url, lambda r: read_capped_text(r, None))
 
 
 def query_1() -> str: